@@ -5,6 +5,9 @@ from pydantic import ValidationError
 from uuid import UUID
 
 from .config import settings
+from .cache import TTLCache
+from . import metrics
+from . import tracing
 from ..models.user import User
 
 
@@ -16,16 +19,50 @@ credentials_exception = HTTPException(
     headers={"WWW-Authenticate": "Bearer"},
 )
 
-def get_current_active_user(token: str = Depends(oauth2_scheme), request: Request = None):
+# Authenticated users by id, so most requests skip the users collection.
+user_cache = TTLCache(max_size=settings.USER_CACHE_MAX_SIZE, ttl_seconds=settings.USER_CACHE_TTL_SECONDS)
+metrics.register_source("user_cache", user_cache.stats)
+
+def invalidate_cached_user(user_id: UUID):
+    """Must be called whenever a user's stored account data changes."""
+    user_cache.invalidate(user_id)
+
+def build_token_claims(user_doc: dict) -> dict:
+    """
+    The claims put into an access token. Besides the user id they carry the
+    profile fields needed to rebuild the `User` when AUTH_TRUST_TOKEN_CLAIMS is on.
+    """
+    return {
+        "sub": str(user_doc["_id"]),
+        "role": user_doc.get("role", "user"),
+        "name": user_doc["full_name"],
+        "email": user_doc["email"],
+        "gym": user_doc["gym_registration_number"],
+    }
+
+def _user_from_claims(user_id: UUID, payload: dict):
+    if not all(claim in payload for claim in ("role", "name", "email", "gym")):
+        return None
+    return User(
+        _id=user_id,
+        full_name=payload["name"],
+        email=payload["email"],
+        gym_registration_number=payload["gym"],
+        role=payload["role"],
+    )
+
+async def get_current_active_user(token: str = Depends(oauth2_scheme), request: Request = None):
     """
     Dependency to get the current active user.
     1. Decodes the JWT token.
-    2. Fetches the user from the database.
+    2. Builds the user from the token claims if they are trusted, or
+       takes it from the user cache, or fetches it from the database.
     3. Returns the user object.
     """
     try:
         # Decode the JWT
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        with tracing.span("auth.jwt_decode"):
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         
         # The 'sub' claim should be our user's ID
         user_id_str: str = payload.get("sub")
@@ -39,11 +76,35 @@ def get_current_active_user(token: str = Depends(oauth2_scheme), request: Reques
         # If the token is invalid or the payload is malformed
         raise credentials_exception
     
-    db = request.app.database
-    user = db.users.find_one({"_id": user_id})
+    with tracing.span("auth.user_lookup") as lookup_span:
+        if settings.AUTH_TRUST_TOKEN_CLAIMS:
+            claimed_user = _user_from_claims(user_id, payload)
+            if claimed_user is not None:
+                lookup_span.set_attribute("source", "claims")
+                return claimed_user
 
-    if user is None:
-        raise credentials_exception
-        
-    # Pydantic will automatically map the '_id' from the DB to 'id' in the model
-    return User(**user)
\ No newline at end of file
+        cached_user = user_cache.get(user_id)
+        if cached_user is not None:
+            lookup_span.set_attribute("source", "cache")
+            return cached_user
+
+        lookup_span.set_attribute("source", "db")
+        db = request.app.database
+        user = await db.users.find_one({"_id": user_id})
+
+        if user is None:
+            raise credentials_exception
+            
+        # Pydantic will automatically map the '_id' from the DB to 'id' in the model
+        current_user = User(**user)
+        user_cache.set(user_id, current_user)
+        return current_user
+
+async def get_current_coach(current_user: User = Depends(get_current_active_user)):
+    """Dependency for coach-only endpoints: the current user, who must be a coach."""
+    if current_user.role != "coach":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only coaches can access this resource.",
+        )
+    return current_user
@@ -9,7 +9,85 @@ class Settings(BaseSettings):
     AI_SERVICE_URL: str
     OPENAI_API_KEY: str
 
+    # Password hashing. Requests are rejected with 429 once
+    # PASSWORD_HASH_MAX_PENDING hashes are running or waiting.
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
+    # Cache of authenticated users. With AUTH_TRUST_TOKEN_CLAIMS the user is
+    # rebuilt from the token alone, so profile changes only show up on re-login.
+    USER_CACHE_MAX_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: float = 60.0
+    AUTH_TRUST_TOKEN_CLAIMS: bool = False
+
+    # Shared HTTP client for calls to the AI service
+    AI_SERVICE_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    AI_SERVICE_READ_TIMEOUT_SECONDS: float = 240.0
+    AI_SERVICE_MAX_CONNECTIONS: int = 100
+    AI_SERVICE_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    AI_SERVICE_HTTP2: bool = True
+    AI_SERVICE_MAX_RETRIES: int = 3
+    AI_SERVICE_RETRY_BACKOFF_SECONDS: float = 0.5
+    # How long a plan job waits when the AI service answers 503 (busy)
+    # without a usable Retry-After header, and the most it will wait with one.
+    AI_SERVICE_BUSY_RETRY_SECONDS: float = 10.0
+    AI_SERVICE_BUSY_MAX_RETRY_SECONDS: float = 120.0
+
+    # Background plan generation queue
+    PLAN_WORKER_COUNT: int = 4
+    PLAN_JOB_POLL_INTERVAL_SECONDS: float = 2.0
+    # Workers renew a job's lease every third of PLAN_JOB_LEASE_SECONDS while
+    # it runs. One attempt, including time queued in the AI service, may take
+    # up to PLAN_JOB_TIMEOUT_SECONDS.
+    PLAN_JOB_LEASE_SECONDS: int = 300
+    PLAN_JOB_TIMEOUT_SECONDS: float = 900.0
+    PLAN_JOB_MAX_ATTEMPTS: int = 2
+    PLAN_JOB_EVENTS_POLL_INTERVAL_SECONDS: float = 1.0
+    # Approved plans offered to the AI service as templates for similar
+    # requests. Distance is in units of 10 years of age and 3 BMI points.
+    PLAN_TEMPLATES_ENABLED: bool = True
+    PLAN_TEMPLATE_MAX_DISTANCE: float = 1.0
+    PLAN_TEMPLATE_MAX_PER_BUCKET: int = 200
+    PLAN_TEMPLATE_LOAD_LIMIT: int = 5000
+
+    # FitBot chat. Streams beyond CHAT_MAX_CONCURRENT_STREAMS_PER_USER are
+    # rejected with 429.
+    CHAT_MODEL: str = "gpt-4o-mini"
+    CHAT_MAX_TOKENS: int = 200
+    CHAT_MAX_CONCURRENT_STREAMS_PER_USER: int = 2
+    # Chat sessions: the most recent messages that fit in the token budget are
+    # sent with each turn.
+    CHAT_HISTORY_TOKEN_BUDGET: int = 2000
+    CHAT_HISTORY_MAX_MESSAGES: int = 50
+    # Opt-in cache of answers to standalone FitBot questions. With
+    # CHAT_ANSWER_CACHE_SEMANTIC, questions are also matched by embedding similarity.
+    CHAT_ANSWER_CACHE_ENABLED: bool = False
+    CHAT_ANSWER_CACHE_MAX_SIZE: int = 1000
+    CHAT_ANSWER_CACHE_TTL_SECONDS: float = 86400.0
+    CHAT_ANSWER_CACHE_SEMANTIC: bool = False
+    CHAT_ANSWER_CACHE_SIMILARITY_THRESHOLD: float = 0.92
+    CHAT_EMBEDDING_MODEL: str = "text-embedding-3-small"
+    OPENAI_TIMEOUT_SECONDS: float = 60.0
+    OPENAI_MAX_CONNECTIONS: int = 100
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    # Record/replay of OpenAI calls for offline benchmarks (see
+    # fitsync_common/llm_cassette.py). LLM_CASSETTE_MODE is "off", "record" or "replay".
+    LLM_CASSETTE_MODE: str = "off"
+    LLM_CASSETTE_DIR: str = "cassettes"
+    LLM_REPLAY_LATENCY_SECONDS: float = 0.0
+    LLM_REPLAY_LATENCY_SCALE: float = 0.0
+
+    # Tracing. Sampled spans are appended as JSON lines to TRACE_EXPORT_PATH,
+    # which is rotated past TRACE_EXPORT_MAX_BYTES; the sampling decision is
+    # passed on to the AI service with the trace.
+    TRACING_ENABLED: bool = True
+    TRACE_SAMPLE_RATIO: float = 0.01
+    TRACE_EXPORT_PATH: str = "traces/spans.jsonl"
+    TRACE_EXPORT_MAX_BYTES: int = 50 * 1024 * 1024
+    TRACE_EXPORT_BACKUP_COUNT: int = 3
+
     class Config:
         env_file = ".env"
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
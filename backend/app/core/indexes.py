@@ -0,0 +1,184 @@
+"""
+Declarative registry of the MongoDB indexes the API relies on.
+
+The indexes are reconciled at startup. To check them by hand, run from the
+backend/ directory:
+
+    python -m app.core.indexes            # reconcile and print the result
+    python -m app.core.indexes --explain  # also explain the hot queries
+"""
+import asyncio
+import sys
+from datetime import datetime
+from typing import List, Tuple, Dict, Any, Optional
+from uuid import uuid4
+
+from pydantic import BaseModel
+from pymongo import ASCENDING, DESCENDING
+
+
+class IndexSpec(BaseModel):
+    collection: str
+    name: str
+    keys: List[Tuple[str, int]]
+    unique: bool = False
+
+
+INDEXES = [
+    IndexSpec(collection="users", name="email_unique_idx", keys=[("email", ASCENDING)], unique=True),
+    IndexSpec(collection="users", name="gym_reg_unique_idx", keys=[("gym_registration_number", ASCENDING)], unique=True),
+    # Coach review queue and the plan job queue: filter on status, page/claim by age.
+    IndexSpec(
+        collection="workout_requests", name="status_created_idx",
+        keys=[("status", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)],
+    ),
+    # A user's own request history, newest first.
+    IndexSpec(
+        collection="workout_requests", name="user_created_idx",
+        keys=[("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+    ),
+    # A user's chat sessions, newest first.
+    IndexSpec(
+        collection="chat_sessions", name="user_created_idx",
+        keys=[("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+    ),
+    # Message log of a session; history pages and prompt trimming read it by seq.
+    IndexSpec(
+        collection="chat_messages", name="session_seq_unique_idx",
+        keys=[("session_id", ASCENDING), ("seq", ASCENDING)], unique=True,
+    ),
+]
+
+
+def _hot_queries() -> List[Dict[str, Any]]:
+    """The queries behind the busiest endpoints, with placeholder values."""
+    user_id = uuid4()
+    return [
+        {
+            "name": "coach pending requests",
+            "collection": "workout_requests",
+            "filter": {"status": "pending_review"},
+            "sort": [("created_at", ASCENDING), ("_id", ASCENDING)],
+        },
+        {
+            "name": "user request history",
+            "collection": "workout_requests",
+            "filter": {"user_id": user_id},
+            "sort": [("created_at", DESCENDING), ("_id", DESCENDING)],
+        },
+        {
+            "name": "single request for user",
+            "collection": "workout_requests",
+            "filter": {"_id": uuid4(), "user_id": user_id},
+            "sort": None,
+        },
+        {
+            "name": "chat history page",
+            "collection": "chat_messages",
+            "filter": {"session_id": uuid4()},
+            "sort": [("seq", DESCENDING)],
+        },
+        {
+            "name": "plan job claim",
+            "collection": "workout_requests",
+            "filter": {"status": "queued", "not_before": {"$not": {"$gt": datetime.utcnow()}}},
+            "sort": [("created_at", ASCENDING)],
+        },
+    ]
+
+
+async def reconcile_indexes(database, apply: bool = True) -> List[Dict[str, Any]]:
+    """
+    Makes the live indexes match INDEXES. Missing indexes are created and
+    indexes whose definition changed are rebuilt; indexes that are not in the
+    registry are reported but left alone. Safe to run repeatedly.
+    With `apply=False` the differences are only reported.
+    """
+    report = []
+    existing_by_collection: Dict[str, Dict[str, Any]] = {}
+
+    for spec in INDEXES:
+        collection = database[spec.collection]
+        if spec.collection not in existing_by_collection:
+            existing_by_collection[spec.collection] = await collection.index_information()
+        existing = existing_by_collection[spec.collection].get(spec.name)
+
+        if existing is None:
+            action = "created" if apply else "missing"
+        elif [tuple(key) for key in existing["key"]] == [tuple(key) for key in spec.keys] \
+                and existing.get("unique", False) == spec.unique:
+            action = "ok"
+        else:
+            action = "rebuilt" if apply else "outdated"
+            if apply:
+                await collection.drop_index(spec.name)
+
+        if apply and action != "ok":
+            await collection.create_index(spec.keys, name=spec.name, unique=spec.unique)
+        report.append({"collection": spec.collection, "name": spec.name, "action": action})
+
+    managed = {(spec.collection, spec.name) for spec in INDEXES}
+    for collection_name, existing in existing_by_collection.items():
+        for name in existing:
+            if name != "_id_" and (collection_name, name) not in managed:
+                report.append({"collection": collection_name, "name": name, "action": "unmanaged"})
+
+    return report
+
+
+def _summarize_plan(plan: Dict[str, Any]) -> Tuple[List[str], Optional[str]]:
+    """Collects the stage names of a winning plan and the index it uses, if any."""
+    stages, index_name = [], None
+    while plan:
+        stages.append(plan.get("stage"))
+        index_name = index_name or plan.get("indexName")
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0]
+    return stages, index_name
+
+
+async def explain_hot_queries(database) -> List[Dict[str, Any]]:
+    results = []
+    for query in _hot_queries():
+        cursor = database[query["collection"]].find(query["filter"]).limit(20)
+        if query["sort"]:
+            cursor = cursor.sort(query["sort"])
+        explanation = await cursor.explain()
+
+        winning_plan = explanation.get("queryPlanner", {}).get("winningPlan", {})
+        # Newer servers wrap the classic plan in a query shape section.
+        winning_plan = winning_plan.get("queryPlan", winning_plan)
+        stages, index_name = _summarize_plan(winning_plan)
+        execution = explanation.get("executionStats", {})
+        results.append({
+            "name": query["name"],
+            "stages": stages,
+            "index": index_name,
+            "collection_scan": "COLLSCAN" in stages,
+            "in_memory_sort": "SORT" in stages,
+            "keys_examined": execution.get("totalKeysExamined"),
+            "docs_examined": execution.get("totalDocsExamined"),
+        })
+    return results
+
+
+async def _main(explain: bool):
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from .config import settings
+
+    client = AsyncIOMotorClient(settings.DATABASE_URL, uuidRepresentation='standard')
+    database = client[settings.DATABASE_NAME]
+    try:
+        for entry in await reconcile_indexes(database):
+            print(f"{entry['collection']}.{entry['name']}: {entry['action']}")
+        if explain:
+            for result in await explain_hot_queries(database):
+                print(
+                    f"{result['name']}: {' <- '.join(result['stages'])}"
+                    f" (index: {result['index'] or 'none'})"
+                )
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main("--explain" in sys.argv[1:]))
@@ -0,0 +1,117 @@
+import time
+from typing import Callable, Dict, Any
+
+from prometheus_client import Counter, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+
+from fitsync_common.metrics import LLM_LATENCY_BUCKETS, LLM_TOKEN_BUCKETS
+
+
+# Prometheus metrics, exposed at /metrics. Names, labels and buckets of the
+# LLM metrics match the AI service's, so they can be summed across both.
+PROMETHEUS_CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+REQUEST_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+JOB_LATENCY_BUCKETS = (1, 5, 10, 20, 30, 45, 60, 90, 120, 180, 240, 300, 600)
+OPERATION_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "fitsync_http_request_seconds", "Time until the response starts, by route template.",
+    ["method", "route", "status"], buckets=REQUEST_LATENCY_BUCKETS,
+)
+LLM_CALL_SECONDS = Histogram(
+    "fitsync_llm_call_seconds", "Duration of one LLM call, by the agent that made it.",
+    ["agent", "model"], buckets=LLM_LATENCY_BUCKETS,
+)
+LLM_CALL_TOKENS = Histogram(
+    "fitsync_llm_call_tokens", "Tokens used by one LLM call, by the agent that made it.",
+    ["agent", "kind"], buckets=LLM_TOKEN_BUCKETS,
+)
+PLAN_JOB_WAIT_SECONDS = Histogram(
+    "fitsync_plan_job_wait_seconds", "Time a plan job waited in the queue before a worker took it.",
+    buckets=JOB_LATENCY_BUCKETS,
+)
+PLAN_JOB_SECONDS = Histogram(
+    "fitsync_plan_job_seconds", "Time to generate and store the plan of one job attempt.",
+    ["outcome"], buckets=JOB_LATENCY_BUCKETS,
+)
+
+OPERATION_SECONDS = Histogram(
+    "fitsync_operation_seconds", "Duration of an instrumented operation, e.g. chat.completion.",
+    ["operation", "outcome"], buckets=OPERATION_LATENCY_BUCKETS,
+)
+
+PLAN_TEMPLATE_LOOKUPS = Counter(
+    "fitsync_plan_template_lookups", "Approved-plan template lookups for new plan jobs.", ["result"],
+)
+
+
+def record_llm_call(agent: str, model: str, seconds: float, usage) -> None:
+    """Records one LLM call; `usage` is the OpenAI usage object, if the API returned one."""
+    LLM_CALL_SECONDS.labels(agent, model).observe(seconds)
+    if usage is not None:
+        LLM_CALL_TOKENS.labels(agent, "prompt").observe(usage.prompt_tokens)
+        LLM_CALL_TOKENS.labels(agent, "completion").observe(usage.completion_tokens)
+
+class _Operation:
+    """Records the durations of one named operation into OPERATION_SECONDS."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def observe(self, seconds: float, error: bool = False):
+        OPERATION_SECONDS.labels(self.name, "error" if error else "ok").observe(seconds)
+
+    def time(self):
+        """Context manager that records the duration of its block."""
+        return _Timer(self)
+
+
+class _Timer:
+    def __init__(self, operation: _Operation):
+        self.operation = operation
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.operation.observe(time.perf_counter() - self.started, error=exc_type is not None)
+        return False
+
+
+def latency(name: str) -> _Operation:
+    """Returns the latency recorder of the operation `name`."""
+    return _Operation(name)
+
+
+class _SourceCollector:
+    """
+    Exposes the stats dicts of registered components (caches, stream slots)
+    as gauges named fitsync_<source>_<key>, read at scrape time.
+    """
+
+    def __init__(self):
+        self._sources: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def register(self, name: str, collect: Callable[[], Dict[str, Any]]):
+        self._sources[name] = collect
+
+    def collect(self):
+        for source, collect in sorted(self._sources.items()):
+            for key, value in sorted(collect().items()):
+                # Numbers and flags only; descriptive values such as a backend name are skipped.
+                if isinstance(value, (bool, int, float)):
+                    yield GaugeMetricFamily(f"fitsync_{source}_{key}", f"{key} of the {source} component.", value=float(value))
+
+
+_source_collector = _SourceCollector()
+REGISTRY.register(_source_collector)
+
+
+def register_source(name: str, collect: Callable[[], Dict[str, Any]]):
+    """Registers a callable whose dict is exported as gauges on every scrape."""
+    _source_collector.register(name, collect)
+
+def prometheus_exposition() -> bytes:
+    return generate_latest()
@@ -0,0 +1,58 @@
+import base64
+from datetime import datetime
+from typing import Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from pymongo import ASCENDING, DESCENDING
+
+
+def encode_cursor(created_at: datetime, doc_id: UUID) -> str:
+    raw = f"{created_at.isoformat()}|{doc_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        created_at, doc_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+        return datetime.fromisoformat(created_at), UUID(doc_id)
+    except (ValueError, UnicodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor."
+        )
+
+async def fetch_page(
+    collection, query: dict, projection: Optional[dict], limit: int,
+    cursor: Optional[str] = None, newest_first: bool = True
+) -> dict:
+    """
+    Keyset pagination over `(created_at, _id)`. Returns the page of documents
+    and the cursor for the next page, which is None on the last page.
+    """
+    if cursor:
+        created_at, doc_id = decode_cursor(cursor)
+        after = "$lt" if newest_first else "$gt"
+        query = {
+            "$and": [
+                query,
+                {"$or": [
+                    {"created_at": {after: created_at}},
+                    {"created_at": created_at, "_id": {after: doc_id}},
+                ]},
+            ]
+        }
+
+    direction = DESCENDING if newest_first else ASCENDING
+    # Fetch one extra document to find out whether another page follows.
+    documents = await collection.find(query, projection) \
+        .sort([("created_at", direction), ("_id", direction)]) \
+        .limit(limit + 1) \
+        .to_list(length=limit + 1)
+
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        last = documents[-1]
+        next_cursor = encode_cursor(last["created_at"], last["_id"])
+
+    return {"items": documents, "next_cursor": next_cursor}
@@ -0,0 +1,68 @@
+"""
+Responses serialized by pydantic-core directly from a validated model.
+
+Returning a model or raw document from an endpoint with `response_model`
+makes FastAPI validate it again, dump it to Python objects and only then
+encode those as JSON. The helpers here validate raw documents once and write
+JSON bytes in one step, with native UUID and datetime support. Endpoints keep
+`response_model` for the OpenAPI schema.
+"""
+from functools import lru_cache
+from typing import Type, get_args
+
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, TypeAdapter
+
+JSON_MEDIA_TYPE = "application/json"
+
+# Pages with more items (list endpoints allow up to 100) are streamed, a
+# chunk of items at a time, so a large page is never held in memory as one
+# serialized body.
+STREAM_MIN_ITEMS = 50
+STREAM_CHUNK_ITEMS = 25
+
+
+def model_response(instance: BaseModel, status_code: int = 200) -> Response:
+    """A JSON response of an already validated model."""
+    return Response(
+        instance.model_dump_json(by_alias=True), status_code=status_code, media_type=JSON_MEDIA_TYPE
+    )
+
+def document_response(model: Type[BaseModel], document: dict, status_code: int = 200) -> Response:
+    """A JSON response of a raw Mongo document, validated once into `model`."""
+    return model_response(model.model_validate(document), status_code)
+
+
+@lru_cache(maxsize=None)
+def _item_adapter(page_model: Type[BaseModel]) -> TypeAdapter:
+    (item_type,) = get_args(page_model.model_fields["items"].annotation)
+    return TypeAdapter(item_type)
+
+def page_response(page_model: Type[BaseModel], page: dict) -> Response:
+    """
+    A JSON response of a page of raw documents (see fetch_page) in the shape
+    of `page_model`: `items` plus plain fields such as the next cursor.
+    Streamed pages have the same body as buffered ones.
+    """
+    items = page["items"]
+    if len(items) <= STREAM_MIN_ITEMS:
+        return document_response(page_model, page)
+
+    adapter = _item_adapter(page_model)
+    # The page without items, split where the items go.
+    skeleton = page_model.model_validate({**page, "items": []}).model_dump_json(by_alias=True).encode()
+    split = skeleton.index(b'"items":[]') + len(b'"items":[')
+    head, tail = skeleton[:split], skeleton[split:]
+
+    def chunks():
+        yield head
+        for start in range(0, len(items), STREAM_CHUNK_ITEMS):
+            chunk = b",".join(
+                adapter.dump_json(adapter.validate_python(item), by_alias=True)
+                for item in items[start:start + STREAM_CHUNK_ITEMS]
+            )
+            yield chunk if start == 0 else b"," + chunk
+        yield tail
+
+    return StreamingResponse(chunks(), media_type=JSON_MEDIA_TYPE)
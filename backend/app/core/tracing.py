@@ -0,0 +1,21 @@
+"""
+Tracing for the backend, on the shared tracer in fitsync_common.tracing.
+
+The trace context is passed on to the AI service in the `traceparent`
+header, and stored with queued plan jobs so the worker that runs a job
+continues the trace of the request that queued it.
+"""
+from fitsync_common.tracing import Tracer, current_span, current_traceparent, parse_traceparent  # noqa: F401
+
+from .config import settings
+
+tracer = Tracer(
+    "backend",
+    enabled=settings.TRACING_ENABLED,
+    sample_ratio=settings.TRACE_SAMPLE_RATIO,
+    export_path=settings.TRACE_EXPORT_PATH,
+    max_bytes=settings.TRACE_EXPORT_MAX_BYTES,
+    backup_count=settings.TRACE_EXPORT_BACKUP_COUNT,
+)
+span = tracer.span
+start_span = tracer.start_span
@@ -2,26 +2,28 @@
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI
-from pymongo import MongoClient, ASCENDING
+import time
+
+from fastapi import FastAPI, Request, Response
+from motor.motor_asyncio import AsyncIOMotorClient
 from .core.config import settings
-from .routes import auth, workouts, users, coach, chat
+from .core.indexes import reconcile_indexes
+from .core import metrics, tracing
+from .routes import auth, workouts, users, coach, chat, diagnostics
+from .services.ai_service_client import start_ai_service_client, close_ai_service_client
+from .services.openai_client import start_openai_client, close_openai_client
+from .services.plan_queue import PlanJobQueue
+from .services.plan_templates import PlanTemplateIndex, load_plan_templates
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from bson.binary import UuidRepresentation
-from uuid import UUID
-import json
-
-class UUIDEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, UUID):
-            return str(obj)
-        return json.JSONEncoder.default(self, obj)
 
+# orjson encodes UUIDs and datetimes natively.
 app = FastAPI(
     title="FitSync Pro Backend",
     description="API for user management and workout plan requests.",
     version="1.0.0",
-    json_encoder=UUIDEncoder
+    default_response_class=ORJSONResponse
 )
 
 # This list contains the origins that are allowed to make requests to our API.
@@ -38,25 +40,90 @@ app.add_middleware(
     allow_headers=["*"], 
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # Labelled by route template so path parameters do not create new series.
+    route = request.scope.get("route")
+    metrics.HTTP_REQUEST_SECONDS.labels(
+        request.method, route.path if route is not None else "unmatched", response.status_code
+    ).observe(time.perf_counter() - started)
+    return response
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    if request.url.path == "/metrics":
+        return await call_next(request)
+    # Every request is the root span of its trace, unless the caller sent a traceparent.
+    with tracing.span(
+        f"{request.method} {request.url.path}", traceparent=request.headers.get("traceparent")
+    ) as server_span:
+        response = await call_next(request)
+        server_span.set_attribute("http.status_code", response.status_code)
+        response.headers["traceparent"] = server_span.traceparent
+        return response
+
 # Database connection handling
 @app.on_event("startup")
-def startup_db_client():
-    app.mongodb_client = MongoClient(
+async def startup_db_client():
+    app.mongodb_client = AsyncIOMotorClient(
         settings.DATABASE_URL,
         uuidRepresentation='standard' 
     )
     app.database = app.mongodb_client[settings.DATABASE_NAME]
 
     try:
-        print("Creating database indexes...")
-        app.database.users.create_index([("email", ASCENDING)], unique=True, name="email_unique_idx")
-        app.database.users.create_index([("gym_registration_number", ASCENDING)], unique=True, name="gym_reg_unique_idx")
-        print("Indexes created successfully.")
+        print("Reconciling database indexes...")
+        for entry in await reconcile_indexes(app.database):
+            if entry["action"] != "ok":
+                print(f"Index {entry['collection']}.{entry['name']}: {entry['action']}")
+        print("Indexes are up to date.")
     except Exception as e:
-        print(f"An error occurred while creating indexes: {e}")
+        print(f"An error occurred while reconciling indexes: {e}")
         
     print(f"Connected to MongoDB database: {settings.DATABASE_NAME}")
-    print(f"Using UUID Representation: {app.mongodb_client.uuid_representation}")
+    print(f"Using UUID Representation: {app.mongodb_client.codec_options.uuid_representation}")
+
+
+@app.on_event("startup")
+async def start_http_clients():
+    await start_ai_service_client()
+    await start_openai_client()
+
+
+@app.on_event("startup")
+async def load_plan_template_index():
+    app.plan_templates = None
+    if not settings.PLAN_TEMPLATES_ENABLED:
+        return
+    app.plan_templates = PlanTemplateIndex(
+        settings.PLAN_TEMPLATE_MAX_PER_BUCKET, settings.PLAN_TEMPLATE_MAX_DISTANCE
+    )
+    metrics.register_source("plan_templates", app.plan_templates.stats)
+    try:
+        loaded = await load_plan_templates(app.database, app.plan_templates)
+        print(f"Plan template index loaded from {loaded} approved plans.")
+    except Exception as e:
+        print(f"An error occurred while loading plan templates: {e}")
+
+
+@app.on_event("startup")
+async def start_plan_queue():
+    # Workers pick up any jobs left queued or half-finished by a previous run.
+    app.plan_queue = PlanJobQueue(app.database, app.plan_templates)
+    await app.plan_queue.start()
+
+
+@app.on_event("shutdown")
+async def stop_plan_queue():
+    await app.plan_queue.stop()
+
+
+@app.on_event("shutdown")
+async def stop_http_clients():
+    await close_ai_service_client()
+    await close_openai_client()
 
 
 @app.on_event("shutdown")
@@ -70,6 +137,11 @@ app.include_router(workouts.router, tags=["Workouts"], prefix="/workouts")
 app.include_router(users.router, tags=["Users"], prefix="/users")
 app.include_router(coach.router, tags=["Coach"], prefix="/coach")
 app.include_router(chat.router, tags=["Chatbot"], prefix="/chat")
+app.include_router(diagnostics.router, tags=["Diagnostics"], prefix="/diagnostics")
+
+@app.get("/metrics", include_in_schema=False)
+def read_prometheus_metrics():
+    return Response(metrics.prometheus_exposition(), media_type=metrics.PROMETHEUS_CONTENT_TYPE)
 
 @app.get("/")
 def read_root():
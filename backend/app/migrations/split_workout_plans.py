@@ -0,0 +1,82 @@
+"""
+Moves the plan sections embedded in `workout_requests` documents into the
+`workout_plans` collection, leaving only request metadata behind.
+
+The API reads both layouts, so this can run while the backend is up. It is
+safe to interrupt and run again. From the backend/ directory:
+
+    python -m app.migrations.split_workout_plans --dry-run
+    python -m app.migrations.split_workout_plans --batch-size 500
+"""
+import argparse
+import asyncio
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+from ..models.workout import PLAN_DETAIL_FIELDS
+
+EMBEDDED_PLAN_QUERY = {"$or": [{field: {"$exists": True}} for field in PLAN_DETAIL_FIELDS]}
+
+
+async def migrate(database, batch_size: int, dry_run: bool = False) -> int:
+    remaining = await database.workout_requests.count_documents(EMBEDDED_PLAN_QUERY)
+    print(f"{remaining} workout requests still embed their plan.")
+    if dry_run or not remaining:
+        return 0
+
+    migrated = 0
+    last_id = None
+    projection = {field: 1 for field in PLAN_DETAIL_FIELDS}
+    while True:
+        query = EMBEDDED_PLAN_QUERY if last_id is None else {"$and": [EMBEDDED_PLAN_QUERY, {"_id": {"$gt": last_id}}]}
+        batch = await database.workout_requests.find(query, projection) \
+            .sort("_id", 1) \
+            .limit(batch_size) \
+            .to_list(length=batch_size)
+        if not batch:
+            break
+
+        now = datetime.utcnow()
+        # Copy first, then strip: an interrupted batch is simply copied again.
+        # A plan already in workout_plans is newer than the embedded copy (an
+        # approval stores it before stripping the request), so it is kept.
+        complete = [doc for doc in batch if all(doc.get(field) for field in PLAN_DETAIL_FIELDS)]
+        if complete:
+            await database.workout_plans.bulk_write([
+                UpdateOne(
+                    {"_id": doc["_id"]},
+                    {"$setOnInsert": {**{field: doc[field] for field in PLAN_DETAIL_FIELDS}, "updated_at": now}},
+                    upsert=True,
+                )
+                for doc in complete
+            ], ordered=False)
+        await database.workout_requests.bulk_write([
+            UpdateOne({"_id": doc["_id"]}, {"$unset": {field: "" for field in PLAN_DETAIL_FIELDS}})
+            for doc in batch
+        ], ordered=False)
+
+        migrated += len(batch)
+        last_id = batch[-1]["_id"]
+        print(f"Migrated {migrated}/{remaining} workout requests.")
+
+    return migrated
+
+
+async def _main(batch_size: int, dry_run: bool):
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from ..core.config import settings
+
+    client = AsyncIOMotorClient(settings.DATABASE_URL, uuidRepresentation='standard')
+    try:
+        await migrate(client[settings.DATABASE_NAME], batch_size, dry_run)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Split plan bodies out of workout_requests.")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="Only count the requests to migrate.")
+    args = parser.parse_args()
+    asyncio.run(_main(args.batch_size, args.dry_run))
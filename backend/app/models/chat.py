@@ -0,0 +1,46 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from uuid import UUID, uuid4
+from datetime import datetime
+
+class MongoBaseModel(BaseModel):
+    id: UUID = Field(default_factory=uuid4, alias="_id")
+
+ROLE_USER = "user"
+ROLE_ASSISTANT = "assistant"
+
+
+class ChatSessionCreate(BaseModel):
+    title: Optional[str] = None
+    # Give FitBot the user's latest approved workout plan as context.
+    include_plan: bool = False
+
+class ChatSessionInDB(MongoBaseModel):
+    user_id: UUID
+    title: Optional[str] = None
+    include_plan: bool = False
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    # Sequence number of the last message appended to the session.
+    last_seq: int = 0
+
+class ChatSessionPage(BaseModel):
+    items: List[ChatSessionInDB]
+    next_cursor: Optional[str] = None
+
+class ChatMessageInDB(MongoBaseModel):
+    """One message of a session. Messages are only ever appended, never edited."""
+    session_id: UUID
+    user_id: UUID
+    seq: int
+    role: str
+    content: str
+    # Approximate prompt tokens, stored so history can be trimmed without
+    # re-measuring every message on each turn.
+    tokens: int
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class ChatMessagePage(BaseModel):
+    items: List[ChatMessageInDB]
+    # Pass back as `before_seq` to load the next (older) page.
+    next_before_seq: Optional[int] = None
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, AliasChoices
 from typing import List, Dict, Optional
 from uuid import UUID, uuid4
 from datetime import datetime
@@ -43,23 +43,80 @@ class NutritionAdvice(BaseModel):
     meal_timing_suggestion: str
 
 
+# Lifecycle of a workout request document. A request is created as a queued
+# generation job and becomes reviewable once the AI service has produced a plan.
+STATUS_QUEUED = "queued"
+STATUS_GENERATING = "generating"
+STATUS_FAILED = "failed"
+STATUS_PENDING_REVIEW = "pending_review"
+STATUS_APPROVED = "approved"
+
+JOB_TERMINAL_STATUSES = {STATUS_FAILED, STATUS_PENDING_REVIEW, STATUS_APPROVED}
+
+
 class WorkoutRequestInDB(MongoBaseModel):
     id: UUID = Field(default_factory=uuid4, alias="_id")
     user_id: UUID
     created_at: datetime = Field(default_factory=datetime.utcnow) # <-- ADD THIS LINE
     
-    status: str = Field(default="pending_review")
+    status: str = Field(default=STATUS_PENDING_REVIEW)
     coach_notes: Optional[str] = ""
     user_summary: UserSummary
-    body_analysis: MetricsAnalysis
+    # The plan sections are only filled in once generation has finished.
+    body_analysis: Optional[MetricsAnalysis] = None
+    workout_plan: Optional[WorkoutPlan] = None
+    nutrition_guidelines: Optional[NutritionAdvice] = None
+    # Incremented on every write to the plan, so a coach's update can be made
+    # conditional on the version they reviewed.
+    version: int = 0
+    # The approved request whose plan the AI service adapted, if any.
+    template_request_id: Optional[UUID] = None
+
+class WorkoutRequestSummary(MongoBaseModel):
+    """
+    The lightweight view of a workout request used by list endpoints.
+    The plan sections themselves are only returned by single-item endpoints.
+    """
+    user_id: UUID
+    created_at: datetime
+    status: str
+    coach_notes: Optional[str] = ""
+    user_summary: UserSummary
+    body_analysis: Optional[MetricsAnalysis] = None
+    version: int = 0
+
+# The plan sections are stored in the `workout_plans` collection under the
+# request's id and only loaded when a single request is opened. Requests
+# written before the split may still embed them.
+PLAN_DETAIL_FIELDS = ("workout_plan", "nutrition_guidelines")
+
+class WorkoutPlanDetail(BaseModel):
+    request_id: UUID = Field(..., alias="_id")
     workout_plan: WorkoutPlan
     nutrition_guidelines: NutritionAdvice
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+# Mongo projection for reading a single request: leaves out the job fields.
+WORKOUT_REQUEST_PROJECTION = {
+    "request_payload": 0,
+    "progress": 0,
+}
+
+# Mongo projection matching WorkoutRequestSummary, leaving out the large fields.
+WORKOUT_REQUEST_SUMMARY_PROJECTION = {
+    **WORKOUT_REQUEST_PROJECTION,
+    **{field: 0 for field in PLAN_DETAIL_FIELDS},
+}
+
+class WorkoutRequestPage(BaseModel):
+    items: List[WorkoutRequestSummary]
+    next_cursor: Optional[str] = None
 
 class WorkoutRequestCreate(BaseModel):
     age: int = Field(..., example=28)
     gender: str = Field(..., example="male")
-    weight: float = Field(..., example=69)
-    height: float = Field(..., example=181)
+    weight: float = Field(..., example=69, gt=0)
+    height: float = Field(..., example=181, gt=0)
     neck: Optional[float] = Field(None, example=40.0)
     waist: Optional[float] = Field(None, example=90.0)
     hip: Optional[float] = Field(None, example=100.0)
@@ -67,9 +124,72 @@ class WorkoutRequestCreate(BaseModel):
     days_per_week: int = Field(..., example=3, ge=1, le=7)
     injuries: str = Field(..., example="none")
 
+class PlanProgressEvent(BaseModel):
+    event: str
+    at: datetime
+    data: Optional[Dict] = None
+
+class PlanJob(WorkoutRequestInDB):
+    """
+    A workout request as stored while it moves through the generation queue.
+    """
+    status: str = Field(default=STATUS_QUEUED)
+    request_payload: WorkoutRequestCreate
+    attempts: int = 0
+    error: Optional[str] = None
+    progress: List[PlanProgressEvent] = []
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    lease_expires_at: Optional[datetime] = None
+    # Set anew on every claim; writes by a worker that lost the lease match nothing.
+    lease_owner: Optional[UUID] = None
+    # traceparent of the request that queued the job, continued by the worker.
+    trace_parent: Optional[str] = None
+    # Times the job was put back because the AI service was busy; it is not
+    # claimed again before not_before.
+    deferrals: int = 0
+    not_before: Optional[datetime] = None
+
+class PlanJobStatus(BaseModel):
+    job_id: UUID = Field(..., validation_alias=AliasChoices("_id", "job_id"))
+    status: str
+    attempts: int = 0
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
 class WorkoutRequestUpdate(BaseModel):
     user_summary: UserSummary
     body_analysis: MetricsAnalysis
     workout_plan: WorkoutPlan
     nutrition_guidelines: NutritionAdvice
-    coach_notes: str
\ No newline at end of file
+    coach_notes: str
+    # The version the coach reviewed. When given, the update is rejected if
+    # the request has changed since.
+    version: Optional[int] = None
+
+class BulkApprovalItem(BaseModel):
+    request_id: UUID
+    version: int
+    # Replaces the plan before approving; None approves the plan as generated.
+    update: Optional[WorkoutRequestUpdate] = None
+
+class BulkApprovalRequest(BaseModel):
+    items: List[BulkApprovalItem] = Field(..., min_length=1, max_length=500)
+
+# Outcome of one bulk approval item.
+APPROVAL_APPROVED = "approved"
+APPROVAL_CONFLICT = "conflict"
+APPROVAL_NOT_FOUND = "not_found"
+APPROVAL_NOT_REVIEWABLE = "not_reviewable"
+APPROVAL_ERROR = "error"
+
+class BulkApprovalResult(BaseModel):
+    request_id: UUID
+    result: str
+    # The request's version after the approval, or its current version on a conflict.
+    version: Optional[int] = None
+    detail: Optional[str] = None
+
+class BulkApprovalResponse(BaseModel):
+    approved: int
+    results: List[BulkApprovalResult]
\ No newline at end of file
@@ -3,20 +3,21 @@
 from fastapi import APIRouter, Request, HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordRequestForm
 from ..models.user import UserCreate, User, UserInDB, Token
-from ..core.security import get_password_hash, verify_password, create_access_token
+from ..core.security import get_password_hash_async, verify_and_update_password_async, create_access_token
 from ..core.config import settings
+from ..core.auth import build_token_claims
 from datetime import timedelta
 
 router = APIRouter()
 
 @router.post("/register", response_model=User, status_code=status.HTTP_201_CREATED)
-def register_user(user: UserCreate, request: Request):
+async def register_user(user: UserCreate, request: Request):
     """
     Registers a new user.
     """
     db = request.app.database
 
-    existing_user = db.users.find_one({
+    existing_user = await db.users.find_one({
         "$or": [
             {"email": user.email},
             {"gym_registration_number": user.gym_registration_number}
@@ -39,25 +40,37 @@ def register_user(user: UserCreate, request: Request):
     if user.gym_registration_number.startswith("COACH-"):
         user_role = "coach"
     
+    hashed_password = await get_password_hash_async(user.password)
+
     user_in_db = UserInDB(
         full_name=user.full_name,
         email=user.email,
         gym_registration_number=user.gym_registration_number,
-        hashed_password=get_password_hash(user.password),
+        hashed_password=hashed_password,
         role=user_role
     )
 
     user_doc = user_in_db.model_dump(by_alias=True)
-    db.users.insert_one(user_doc)
+    await db.users.insert_one(user_doc)
 
     return user_doc
 
+async def _verify_login(db, user_doc: dict, password: str) -> bool:
+    """
+    Checks the password and transparently upgrades the stored hash when it
+    was created with an older scheme or work factor.
+    """
+    is_valid, new_hash = await verify_and_update_password_async(password, user_doc["hashed_password"])
+    if is_valid and new_hash:
+        await db.users.update_one({"_id": user_doc["_id"]}, {"$set": {"hashed_password": new_hash}})
+    return is_valid
+
 @router.post("/login/user", response_model=Token)
-def login_user(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+async def login_user(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
     db = request.app.database
-    user_doc = db.users.find_one({"email": form_data.username})
+    user_doc = await db.users.find_one({"email": form_data.username})
     
-    if not user_doc or not verify_password(form_data.password, user_doc["hashed_password"]) or user_doc.get("role") != "user":
+    if not user_doc or not await _verify_login(db, user_doc, form_data.password) or user_doc.get("role") != "user":
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password, or not a valid user account",
@@ -65,7 +78,7 @@ def login_user(request: Request, form_data: OAuth2PasswordRequestForm = Depends(
         
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": str(user_doc["_id"])}, expires_delta=access_token_expires
+        data=build_token_claims(user_doc), expires_delta=access_token_expires
     )
     
     return {
@@ -75,11 +88,11 @@ def login_user(request: Request, form_data: OAuth2PasswordRequestForm = Depends(
     }
 
 @router.post("/login/coach", response_model=Token)
-def login_coach(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+async def login_coach(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
     db = request.app.database
-    user_doc = db.users.find_one({"email": form_data.username})
+    user_doc = await db.users.find_one({"email": form_data.username})
     
-    if not user_doc or not verify_password(form_data.password, user_doc["hashed_password"]) or user_doc.get("role") != "coach":
+    if not user_doc or not await _verify_login(db, user_doc, form_data.password) or user_doc.get("role") != "coach":
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password, or not a valid coach account",
@@ -87,7 +100,7 @@ def login_coach(request: Request, form_data: OAuth2PasswordRequestForm = Depends
         
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": str(user_doc["_id"])}, expires_delta=access_token_expires
+        data=build_token_claims(user_doc), expires_delta=access_token_expires
     )
     
     return {
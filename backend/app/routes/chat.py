@@ -1,13 +1,27 @@
-from fastapi import APIRouter, Depends, Request, HTTPException
+import json
+import time
+from collections import defaultdict
+from typing import Optional, Callable, Awaitable
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Request, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from openai import OpenAI
 
+from ..core import metrics
 from ..core.auth import get_current_active_user
 from ..models.user import User
 from ..core.config import settings
+from ..core.pagination import fetch_page
+from ..core.responses import page_response
+from ..models.chat import (
+    ChatSessionCreate, ChatSessionInDB, ChatSessionPage, ChatMessagePage
+)
+from ..services import chat_history
+from ..services.chat_answer_cache import ChatAnswerCache
+from ..services.openai_client import get_openai_client
 
 router = APIRouter()
-client = OpenAI(api_key=settings.OPENAI_API_KEY) 
 
 class ChatMessage(BaseModel):
     message: str
@@ -15,6 +29,9 @@ class ChatMessage(BaseModel):
 class ChatResponse(BaseModel):
     response: str
 
+# Agent label of FitBot's LLM calls in the Prometheus metrics.
+METRICS_AGENT = "FitBot"
+
 SYSTEM_PROMPT = """
 You are FitBot, a friendly, encouraging, and knowledgeable gym assistant for the FitSync Pro application.
 Your primary role is to answer user questions about fitness, exercises, basic nutrition, and motivation.
@@ -28,8 +45,51 @@ Your primary role is to answer user questions about fitness, exercises, basic nu
 6.  **Do not answer non-fitness related questions.** If the user asks about something outside of fitness, gently steer the conversation back. For example: "I'm best at helping with fitness questions. Do you have one about your workout?"
 """
 
+# Only the stateless endpoints use the cache: a session turn depends on its history.
+answer_cache = None
+if settings.CHAT_ANSWER_CACHE_ENABLED:
+    answer_cache = ChatAnswerCache(
+        SYSTEM_PROMPT,
+        max_size=settings.CHAT_ANSWER_CACHE_MAX_SIZE,
+        ttl_seconds=settings.CHAT_ANSWER_CACHE_TTL_SECONDS,
+        semantic=settings.CHAT_ANSWER_CACHE_SEMANTIC,
+        similarity_threshold=settings.CHAT_ANSWER_CACHE_SIMILARITY_THRESHOLD,
+    )
+    metrics.register_source("chat_answer_cache", answer_cache.stats)
+
+async def _cached_answer(chat_message: ChatMessage):
+    """The cache lookup for a standalone question, or None if it must not be cached."""
+    if answer_cache is None or not answer_cache.cacheable(chat_message.message):
+        return None
+    return await answer_cache.lookup(chat_message.message)
+
+def _chat_messages(chat_message: ChatMessage) -> list:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": chat_message.message}
+    ]
+
+async def _complete(messages: list) -> str:
+    try:
+        started = time.perf_counter()
+        with metrics.latency("chat.completion").time():
+            completion = await get_openai_client().chat.completions.create(
+                model=settings.CHAT_MODEL,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=settings.CHAT_MAX_TOKENS
+            )
+        metrics.record_llm_call(
+            METRICS_AGENT, settings.CHAT_MODEL, time.perf_counter() - started, completion.usage
+        )
+        return completion.choices[0].message.content
+
+    except Exception as e:
+        print(f"An error occurred with OpenAI API: {e}")
+        raise HTTPException(status_code=503, detail="The chatbot service is currently unavailable.")
+
 @router.post("/conversation", response_model=ChatResponse)
-def handle_chat(
+async def handle_chat(
     chat_message: ChatMessage,
     request: Request,
     current_user: User = Depends(get_current_active_user)
@@ -37,20 +97,263 @@ def handle_chat(
     """
     Handles a single turn in a conversation with the FitBot.
     """
+    lookup = await _cached_answer(chat_message)
+    if lookup is not None and lookup.answer is not None:
+        return ChatResponse(response=lookup.answer)
+
+    started = time.perf_counter()
+    ai_response = await _complete(_chat_messages(chat_message))
+    if lookup is not None:
+        await answer_cache.store(lookup, chat_message.message, ai_response, time.perf_counter() - started)
+    return ChatResponse(response=ai_response)
+
+
+class _StreamSlot:
+    """One open stream of a user; releasing it more than once has no effect."""
+
+    def __init__(self, slots: "_StreamSlots", user_id: UUID):
+        self._slots = slots
+        self.user_id = user_id
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._slots._release(self.user_id)
+
+
+class _StreamSlots:
+    """Counts the chat streams each user has open. Only used on the event loop."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._open = defaultdict(int)
+        self.rejected = 0
+
+    def acquire(self, user_id: UUID) -> _StreamSlot:
+        if self._open[user_id] >= self.limit:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="You already have a FitBot reply in progress. Please wait for it to finish."
+            )
+        self._open[user_id] += 1
+        return _StreamSlot(self, user_id)
+
+    def _release(self, user_id: UUID):
+        self._open[user_id] -= 1
+        if self._open[user_id] <= 0:
+            del self._open[user_id]
+
+    def stats(self) -> dict:
+        return {
+            "open_streams": sum(self._open.values()),
+            "users_streaming": len(self._open),
+            "rejected_streams": self.rejected,
+        }
+
+
+stream_slots = _StreamSlots(settings.CHAT_MAX_CONCURRENT_STREAMS_PER_USER)
+metrics.register_source("chat", stream_slots.stats)
+
+
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+class _SlotStreamingResponse(StreamingResponse):
+    """
+    Releases the stream slot when the response is over. The body generator
+    releases it as soon as it finishes, but a body that is never iterated
+    (the client left before it started) never runs its finally.
+    """
+
+    def __init__(self, content, slot: _StreamSlot, **kwargs):
+        super().__init__(content, **kwargs)
+        self._slot = slot
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self._slot.release()
+
+
+def _stream_reply(
+    messages: list, slot: _StreamSlot,
+    on_complete: Optional[Callable[[str], Awaitable[dict]]] = None
+) -> StreamingResponse:
+    """
+    Streams the model's reply as Server-Sent Events: a `token` event per
+    generated chunk, then `done`, or `error` if the model fails. `on_complete`
+    is awaited with the full reply and its result is sent with `done`; if it
+    fails, `error` is sent instead. The stream holds `slot` until it ends.
+    """
+    async def event_stream():
+        started = time.perf_counter()
+        first_token_at = None
+        chunks = []
+        usage = None
+        try:
+            try:
+                stream = await get_openai_client().chat.completions.create(
+                    model=settings.CHAT_MODEL,
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=settings.CHAT_MAX_TOKENS,
+                    stream=True,
+                    # The last chunk then carries the token usage of the reply.
+                    stream_options={"include_usage": True}
+                )
+                async for chunk in stream:
+                    if chunk.usage is not None:
+                        usage = chunk.usage
+                    if not chunk.choices or not chunk.choices[0].delta.content:
+                        continue
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                        metrics.latency("chat.time_to_first_token").observe(first_token_at - started)
+                    chunks.append(chunk.choices[0].delta.content)
+                    yield _sse_event("token", {"text": chunks[-1]})
+            except Exception as e:
+                print(f"An error occurred with OpenAI API: {e}")
+                metrics.latency("chat.stream_completion").observe(time.perf_counter() - started, error=True)
+                yield _sse_event("error", {"detail": "The chatbot service is currently unavailable."})
+                return
+
+            metrics.latency("chat.stream_completion").observe(time.perf_counter() - started)
+            metrics.record_llm_call(METRICS_AGENT, settings.CHAT_MODEL, time.perf_counter() - started, usage)
+            try:
+                done = await on_complete("".join(chunks)) if on_complete is not None else {}
+            except Exception as e:
+                print(f"Could not store the FitBot reply: {e!r}")
+                yield _sse_event("error", {"detail": "The reply could not be saved. Please try again."})
+                return
+            yield _sse_event("done", done)
+        finally:
+            slot.release()
+
     try:
-        completion = client.chat.completions.create(
-            model="gpt-4o-mini", 
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": chat_message.message}
-            ],
-            temperature=0.7,
-            max_tokens=200
-        )
-        
-        ai_response = completion.choices[0].message.content
-        return ChatResponse(response=ai_response)
+        return _SlotStreamingResponse(event_stream(), slot, media_type="text/event-stream")
+    except BaseException:
+        slot.release()
+        raise
 
-    except Exception as e:
-        print(f"An error occurred with OpenAI API: {e}")
-        raise HTTPException(status_code=503, detail="The chatbot service is currently unavailable.")
\ No newline at end of file
+@router.post("/conversation/stream")
+async def handle_chat_stream(
+    chat_message: ChatMessage,
+    request: Request,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Like /conversation, but streams the reply as Server-Sent Events.
+    A cached answer is sent as a single `token` event.
+    """
+    lookup = await _cached_answer(chat_message)
+    if lookup is not None and lookup.answer is not None:
+        async def cached_stream():
+            yield _sse_event("token", {"text": lookup.answer})
+            yield _sse_event("done", {"cached": True})
+        return StreamingResponse(cached_stream(), media_type="text/event-stream")
+
+    on_complete = None
+    if lookup is not None:
+        started = time.perf_counter()
+
+        async def on_complete(reply: str) -> dict:
+            await answer_cache.store(lookup, chat_message.message, reply, time.perf_counter() - started)
+            return {}
+
+    return _stream_reply(_chat_messages(chat_message), stream_slots.acquire(current_user.id), on_complete=on_complete)
+
+
+@router.post(
+    "/sessions",
+    response_model=ChatSessionInDB,
+    status_code=status.HTTP_201_CREATED
+)
+async def create_chat_session(
+    session_data: ChatSessionCreate,
+    request: Request,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Starts a chat session. FitBot remembers earlier turns of a session, and with
+    `include_plan` also knows the user's latest approved workout plan.
+    """
+    return await chat_history.create_session(request.app.database, current_user.id, session_data)
+
+@router.get("/sessions", response_model=ChatSessionPage)
+async def list_chat_sessions(
+    request: Request,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Lists the user's chat sessions, newest first."""
+    return page_response(ChatSessionPage, await fetch_page(
+        request.app.database.chat_sessions,
+        {"user_id": current_user.id},
+        None,
+        limit=limit,
+        cursor=cursor,
+    ))
+
+@router.get("/sessions/{session_id}/messages", response_model=ChatMessagePage)
+async def get_chat_messages(
+    session_id: UUID,
+    request: Request,
+    limit: int = Query(50, ge=1, le=200),
+    before_seq: Optional[int] = None,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Pages through a session's history, newest first. Pass `next_before_seq`
+    back as `before_seq` for older messages.
+    """
+    db = request.app.database
+    await chat_history.get_user_session(db, session_id, current_user.id)
+    return page_response(ChatMessagePage, await chat_history.fetch_messages_page(db, session_id, limit, before_seq))
+
+@router.post("/sessions/{session_id}/messages", response_model=ChatResponse)
+async def send_chat_session_message(
+    session_id: UUID,
+    chat_message: ChatMessage,
+    request: Request,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Sends a message in the session and returns FitBot's reply. Both are
+    stored once the reply exists; a failed turn leaves the history unchanged.
+    """
+    db = request.app.database
+    session = await chat_history.get_user_session(db, session_id, current_user.id)
+    reply = await _complete(await chat_history.build_prompt(db, session, SYSTEM_PROMPT, chat_message.message))
+    await chat_history.append_turn(db, session, chat_message.message, reply)
+    return ChatResponse(response=reply)
+
+@router.post("/sessions/{session_id}/messages/stream")
+async def stream_chat_session_message(
+    session_id: UUID,
+    chat_message: ChatMessage,
+    request: Request,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Like /sessions/{session_id}/messages, but streams the reply. The user's
+    message and the reply are stored once the reply is complete; the `done`
+    event carries the stored reply's sequence number.
+    """
+    db = request.app.database
+    session = await chat_history.get_user_session(db, session_id, current_user.id)
+    slot = stream_slots.acquire(current_user.id)
+    try:
+        prompt = await chat_history.build_prompt(db, session, SYSTEM_PROMPT, chat_message.message)
+    except BaseException:
+        slot.release()
+        raise
+
+    async def store_reply(reply: str) -> dict:
+        message = await chat_history.append_turn(db, session, chat_message.message, reply)
+        return {"seq": message["seq"]}
+
+    return _stream_reply(prompt, slot, on_complete=store_reply)
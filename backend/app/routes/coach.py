@@ -1,70 +1,250 @@
-from fastapi import APIRouter, Depends, Request, HTTPException, status
-from typing import List
-from uuid import UUID
-from ..core.auth import get_current_active_user
+from fastapi import APIRouter, Depends, Request, HTTPException, status, Query
+from typing import Optional
+from uuid import UUID, uuid4
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from ..core.auth import get_current_coach
+from ..core.pagination import fetch_page
+from ..core.responses import model_response, document_response, page_response
 from ..models.user import User
-from ..models.workout import WorkoutRequestInDB, WorkoutRequestUpdate
+from ..services.plan_store import attach_plan_detail, save_plan_detail, plan_detail_upsert
+from ..services.plan_templates import add_approved_plans
+from ..models.workout import (
+    WorkoutRequestInDB, WorkoutRequestUpdate, WorkoutRequestPage,
+    WORKOUT_REQUEST_SUMMARY_PROJECTION, WORKOUT_REQUEST_PROJECTION, PLAN_DETAIL_FIELDS,
+    STATUS_PENDING_REVIEW, STATUS_APPROVED,
+    BulkApprovalRequest, BulkApprovalResponse, BulkApprovalResult,
+    APPROVAL_APPROVED, APPROVAL_CONFLICT, APPROVAL_NOT_FOUND, APPROVAL_NOT_REVIEWABLE, APPROVAL_ERROR
+)
 
 router = APIRouter()
 
+# Requests a coach may approve: generated plans awaiting review, or already
+# approved plans being edited again.
+REVIEWABLE_STATUSES = [STATUS_PENDING_REVIEW, STATUS_APPROVED]
+
+
+# Drops plan sections still embedded in requests written before the split.
+# Only applied once the new plan is stored in `workout_plans`, so a failed
+# plan write never loses the embedded copy.
+_EMBEDDED_PLAN_UNSET = {field: "" for field in PLAN_DETAIL_FIELDS}
+_EMBEDDED_PLAN_QUERY = {"$or": [{field: {"$exists": True}} for field in PLAN_DETAIL_FIELDS]}
+
+
+def _version_filter(version: int) -> dict:
+    # Requests stored before versioning have no version field; they count as 0.
+    if version == 0:
+        return {"version": {"$in": [0, None]}}
+    return {"version": version}
+
 @router.get(
     "/pending-requests",
-    response_model=List[WorkoutRequestInDB]
+    response_model=WorkoutRequestPage
+)
+async def get_pending_workout_requests(
+    request: Request,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_coach)
+):
+    """
+    Retrieves workout plan requests that are pending review, oldest first.
+    This is intended for the coach's dashboard and returns summaries only;
+    the full plan is available from /coach/requests/{request_id}.
+    """
+    db = request.app.database
+
+    return page_response(WorkoutRequestPage, await fetch_page(
+        db.workout_requests,
+        {"status": "pending_review"},
+        WORKOUT_REQUEST_SUMMARY_PROJECTION,
+        limit=limit,
+        cursor=cursor,
+        newest_first=False,
+    ))
+
+@router.get(
+    "/requests/{request_id}",
+    response_model=WorkoutRequestInDB
 )
-def get_pending_workout_requests(
+async def get_workout_request_for_review(
+    request_id: UUID,
     request: Request,
-    # For now, we protect it so only logged-in users can see it.
-    # In a real app, this would be Depends(get_current_coach).
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_coach)
 ):
     """
-    Retrieves all workout plan requests that are pending review.
-    This is intended for the coach's dashboard.
+    Retrieves the full workout request, including the plan, for review.
     """
     db = request.app.database
-    
-    pending_requests_cursor = db.workout_requests.find({"status": "pending_review"})
 
-    return list(pending_requests_cursor)
+    workout_request = await db.workout_requests.find_one({"_id": request_id}, WORKOUT_REQUEST_PROJECTION)
+    if workout_request is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Workout request with ID {request_id} not found."
+        )
+
+    return document_response(WorkoutRequestInDB, await attach_plan_detail(db, workout_request))
 
 @router.put(
     "/requests/{request_id}/approve",
     response_model=WorkoutRequestInDB
 )
-def approve_workout_request(
+async def approve_workout_request(
     request_id: UUID, 
     update_data: WorkoutRequestUpdate,
     request: Request,
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_coach)
 ):
     """
     Allows a coach to update and approve a specific workout request.
-    - Finds the request by its ID.
+    - Finds the request by its ID; it must have a generated plan to approve.
     - Updates the plan details and coach's notes.
     - Changes the status to "approved".
     """
     db = request.app.database
-    
-    update_doc = update_data.model_dump()
-    
-    update_doc["status"] = "approved"
-
-    # Use find_one_and_update to update the document and get the new version back
-    # The '$set' operator tells MongoDB to update the fields in update_doc
-    # The 'return_document=ReturnDocument.AFTER' option ensures we get the
-    # document *after* the update has been applied.
-    from pymongo import ReturnDocument
-    
-    updated_request = db.workout_requests.find_one_and_update(
-        {"_id": request_id},
-        {"$set": update_doc},
+
+    update_doc = update_data.model_dump(exclude={"version", *PLAN_DETAIL_FIELDS})
+    update_doc["status"] = STATUS_APPROVED
+
+    query = {"_id": request_id, "status": {"$in": REVIEWABLE_STATUSES}}
+    if update_data.version is not None:
+        query.update(_version_filter(update_data.version))
+
+    # The version check happens on the request document, so the plan body is
+    # only written once this coach's update has won.
+    updated_request = await db.workout_requests.find_one_and_update(
+        query,
+        {"$set": update_doc, "$inc": {"version": 1}},
+        projection=WORKOUT_REQUEST_PROJECTION,
         return_document=ReturnDocument.AFTER
     )
 
     if updated_request is None:
+        current = await db.workout_requests.find_one({"_id": request_id}, {"status": 1})
+        if current is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Workout request with ID {request_id} not found."
+            )
+        if current.get("status") not in REVIEWABLE_STATUSES:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"The request is {current.get('status')} and has no plan to approve yet."
+            )
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Workout request with ID {request_id} not found."
+            status_code=status.HTTP_409_CONFLICT,
+            detail="This workout request was changed by someone else. Reload it and try again."
+        )
+
+    await save_plan_detail(db, request_id, update_data.workout_plan, update_data.nutrition_guidelines)
+    if any(field in updated_request for field in PLAN_DETAIL_FIELDS):
+        await db.workout_requests.update_one({"_id": request_id}, {"$unset": _EMBEDDED_PLAN_UNSET})
+    await add_approved_plans(db, request.app.plan_templates, {request_id: update_data.workout_plan.model_dump()})
+    # The plan sections are already validated models; only the stored metadata needs validating.
+    return model_response(WorkoutRequestInDB.model_validate({
+        **updated_request,
+        **{field: getattr(update_data, field) for field in PLAN_DETAIL_FIELDS},
+    }))
+
+@router.post(
+    "/requests/approve",
+    response_model=BulkApprovalResponse
+)
+async def bulk_approve_workout_requests(
+    approval: BulkApprovalRequest,
+    request: Request,
+    current_user: User = Depends(get_current_coach)
+):
+    """
+    Approves many workout requests in one call, each either as generated or
+    with an updated plan. Every item carries the version the coach reviewed;
+    an item whose request has changed since is reported as a conflict and left
+    untouched. All items are written with a single unordered bulk write, so
+    one failing item does not hold up the others.
+    """
+    db = request.app.database
+
+    request_ids = [item.request_id for item in approval.items]
+    if len(set(request_ids)) != len(request_ids):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Each workout request may appear only once per batch."
+        )
+
+    # Each write stamps its own id on the document, which tells us afterwards
+    # which items matched; the bulk write result only has totals.
+    write_ids = [uuid4() for _ in approval.items]
+    operations = []
+    for item, write_id in zip(approval.items, write_ids):
+        update = {"$inc": {"version": 1}}
+        update_doc = {}
+        if item.update is not None:
+            update_doc = item.update.model_dump(exclude={"version", *PLAN_DETAIL_FIELDS})
+        update_doc.update({"status": STATUS_APPROVED, "approval_write_id": write_id})
+        update["$set"] = update_doc
+        operations.append(UpdateOne(
+            {"_id": item.request_id, "status": {"$in": REVIEWABLE_STATUSES}, **_version_filter(item.version)},
+            update,
+        ))
+
+    write_errors = {}
+    try:
+        await db.workout_requests.bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        write_errors = {error["index"]: error.get("errmsg") for error in e.details.get("writeErrors", [])}
+
+    current = {
+        doc["_id"]: doc
+        async for doc in db.workout_requests.find(
+            {"_id": {"$in": request_ids}},
+            {"status": 1, "version": 1, "approval_write_id": 1}
+        )
+    }
+
+    results = []
+    for index, (item, write_id) in enumerate(zip(approval.items, write_ids)):
+        doc = current.get(item.request_id)
+        if index in write_errors:
+            result = BulkApprovalResult(request_id=item.request_id, result=APPROVAL_ERROR, detail=write_errors[index])
+        elif doc is None:
+            result = BulkApprovalResult(request_id=item.request_id, result=APPROVAL_NOT_FOUND)
+        elif doc.get("approval_write_id") == write_id:
+            result = BulkApprovalResult(request_id=item.request_id, result=APPROVAL_APPROVED, version=item.version + 1)
+        elif doc.get("status") not in REVIEWABLE_STATUSES:
+            result = BulkApprovalResult(
+                request_id=item.request_id, result=APPROVAL_NOT_REVIEWABLE, version=doc.get("version", 0),
+                detail=f"The request is {doc.get('status')} and has no plan to approve yet."
+            )
+        else:
+            result = BulkApprovalResult(
+                request_id=item.request_id, result=APPROVAL_CONFLICT, version=doc.get("version", 0),
+                detail="The request was changed by someone else since this version was reviewed."
+            )
+        results.append(result)
+
+    # Plan bodies of the edited items that won their version check.
+    edited = [
+        item for item, result in zip(approval.items, results)
+        if item.update is not None and result.result == APPROVAL_APPROVED
+    ]
+    if edited:
+        await db.workout_plans.bulk_write([
+            plan_detail_upsert(item.request_id, item.update.workout_plan, item.update.nutrition_guidelines)
+            for item in edited
+        ], ordered=False)
+        await db.workout_requests.update_many(
+            {"_id": {"$in": [item.request_id for item in edited]}, **_EMBEDDED_PLAN_QUERY},
+            {"$unset": _EMBEDDED_PLAN_UNSET}
         )
+    # Items approved as generated have their plan read back from the store.
+    await add_approved_plans(db, request.app.plan_templates, {
+        item.request_id: item.update.workout_plan.model_dump() if item.update is not None else None
+        for item, result in zip(approval.items, results)
+        if result.result == APPROVAL_APPROVED
+    })
 
-    return updated_request
\ No newline at end of file
+    return model_response(BulkApprovalResponse(
+        approved=sum(result.result == APPROVAL_APPROVED for result in results),
+        results=results,
+    ))
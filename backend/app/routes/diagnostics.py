@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends, Request
+from ..core.auth import get_current_coach
+from ..core.indexes import reconcile_indexes, explain_hot_queries
+
+# Internal stats and query plans of production collections: coaches only.
+router = APIRouter(dependencies=[Depends(get_current_coach)])
+
+@router.get("/indexes")
+async def read_index_diagnostics(request: Request):
+    """
+    Compares the live indexes with the registry and returns the query plans
+    chosen for the hot workout request queries.
+    """
+    db = request.app.database
+    return {
+        "indexes": await reconcile_indexes(db, apply=False),
+        "hot_queries": await explain_hot_queries(db),
+    }
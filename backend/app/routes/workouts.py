@@ -1,104 +1,161 @@
-from typing import List
+import asyncio
+from typing import Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, Request, HTTPException, status
-import json 
+from fastapi import APIRouter, Depends, Request, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
 from ..core.auth import get_current_active_user
+from ..core.config import settings
+from ..core.pagination import fetch_page
+from ..core.responses import model_response, document_response, page_response
+from ..core import tracing
 from ..models.user import User
 from ..models.workout import (
-    WorkoutRequestCreate, WorkoutRequestInDB, UserSummary, MetricsAnalysis,
-    WorkoutPlan, NutritionAdvice
+    WorkoutRequestCreate, WorkoutRequestInDB, UserSummary, PlanJob, PlanJobStatus,
+    PlanProgressEvent, WorkoutRequestPage, WORKOUT_REQUEST_SUMMARY_PROJECTION, WORKOUT_REQUEST_PROJECTION,
+    PLAN_DETAIL_FIELDS, JOB_TERMINAL_STATUSES
 )
-from ..services.ai_service_client import generate_plan_from_ai_service
+from ..services.plan_store import attach_plan_detail
 
 router = APIRouter()
 
 @router.post(
     "/request-plan",
-    response_model=WorkoutRequestInDB,
-    status_code=status.HTTP_201_CREATED
+    response_model=PlanJobStatus,
+    status_code=status.HTTP_202_ACCEPTED
 )
 async def request_workout_plan(
     request_data: WorkoutRequestCreate,
     request: Request,
     current_user: User = Depends(get_current_active_user)
 ):
+    """
+    Queues a new workout plan for generation and returns the job right away.
+    Progress can be followed via /workouts/jobs/{job_id} or its /events stream.
+    """
     db = request.app.database
-    ai_service_payload = request_data.model_dump()
 
-    try:
-        print("--- DEBUG STEP 1: Sending request to AI service ---")
-        generated_plan_dict = await generate_plan_from_ai_service(ai_service_payload)
-        
-        print("\n--- DEBUG STEP 2: RAW DICTIONARY RECEIVED FROM AI SERVICE ---")
-        print(json.dumps(generated_plan_dict, indent=2))
-        print("----------------------------------------------------------\n")
+    plan_job = PlanJob(
+        user_id=current_user.id,
+        user_summary=UserSummary(
+            fitness_goal=request_data.fitness_goal,
+            days_per_week=request_data.days_per_week
+        ),
+        request_payload=request_data,
+        trace_parent=tracing.current_traceparent()
+    )
+    # The plan sections are stored in workout_plans once generated.
+    job_doc = plan_job.model_dump(by_alias=True, exclude=set(PLAN_DETAIL_FIELDS))
+    with tracing.span("mongo.insert workout_requests"):
+        await db.workout_requests.insert_one(job_doc)
 
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_502_BAD_GATEWAY,
-            detail=f"The AI service failed to generate a plan: {e}"
-        )
+    request.app.plan_queue.notify()
 
-    try:
-        print("\n--- DEBUG STEP 3: CREATING WorkoutRequestInDB OBJECT ---")
-        workout_request_doc = WorkoutRequestInDB(
-            user_id=current_user.id,
-            status=generated_plan_dict.get("status", "pending_review"),
-            coach_notes=generated_plan_dict.get("coach_notes", ""),
-            user_summary=UserSummary(**generated_plan_dict["user_summary"]),
-            body_analysis=MetricsAnalysis(**generated_plan_dict["body_analysis"]),
-            workout_plan=WorkoutPlan(**generated_plan_dict["workout_plan"]),
-            nutrition_guidelines=NutritionAdvice(**generated_plan_dict["nutrition_guidelines"])
-        )
-        print("\n--- Pydantic object created successfully. Contents: ---")
-        # .model_dump_json() is a great way to see the true state of the object
-        print(workout_request_doc.model_dump_json(indent=2))
-        print("----------------------------------------------------------\n")
-        
-    except Exception as e:
-        print(f"\n--- ERROR AT STEP 3: FAILED TO CREATE PYDANTIC OBJECT ---")
-        print(f"Error: {e}")
-        print("----------------------------------------------------------\n")
+    # Built from the job already validated above rather than validated again.
+    return model_response(PlanJobStatus.model_construct(
+        job_id=plan_job.id,
+        status=plan_job.status,
+        attempts=plan_job.attempts,
+        error=plan_job.error,
+        created_at=plan_job.created_at,
+        updated_at=plan_job.updated_at,
+    ), status_code=status.HTTP_202_ACCEPTED)
+
+async def _find_user_job(db, job_id: UUID, user_id: UUID, progress_from: Optional[int] = None) -> dict:
+    projection = {"status": 1, "attempts": 1, "error": 1, "created_at": 1, "updated_at": 1}
+    if progress_from is not None:
+        projection["progress"] = {"$slice": [progress_from, 100]}
+    job = await db.workout_requests.find_one({"_id": job_id, "user_id": user_id}, projection)
+    if job is None:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to process data from AI service. Error: {e}"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Plan job not found or you do not have permission to view it."
         )
+    return job
+
+@router.get(
+    "/jobs/{job_id}",
+    response_model=PlanJobStatus
+)
+async def get_plan_job_status(
+    job_id: UUID,
+    request: Request,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Returns the current generation status of one of the user's plan jobs.
+    """
+    return document_response(PlanJobStatus, await _find_user_job(request.app.database, job_id, current_user.id))
+
+@router.get("/jobs/{job_id}/events")
+async def stream_plan_job_events(
+    job_id: UUID,
+    request: Request,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Streams a plan job as Server-Sent Events until the job reaches a terminal
+    state or the client disconnects. `status` events report state changes and
+    `progress` events report each finished generation stage (metrics analyzed,
+    workout drafted, nutrition drafted, synthesized, validated) together with
+    the partial output of that stage while the job is still running.
+    """
+    db = request.app.database
+    job = await _find_user_job(db, job_id, current_user.id, progress_from=0)
 
-    print("\n--- DEBUG STEP 4: DUMPING PYDANTIC OBJECT TO MONGO DICT ---")
-    mongo_dict = workout_request_doc.model_dump(by_alias=True)
-    print("\n--- Dictionary to be inserted into MongoDB: ---")
-    print(mongo_dict)
-    print("----------------------------------------------------------\n")
+    async def event_stream():
+        last_status = None
+        progress_sent = 0
+        current = job
+        while True:
+            for entry in current.get("progress", []):
+                payload = PlanProgressEvent(**entry).model_dump_json()
+                yield f"event: progress\ndata: {payload}\n\n"
+                progress_sent += 1
+            if current["status"] != last_status:
+                last_status = current["status"]
+                payload = PlanJobStatus(**current).model_dump_json()
+                yield f"event: status\ndata: {payload}\n\n"
+            if last_status in JOB_TERMINAL_STATUSES or await request.is_disconnected():
+                break
+            await asyncio.sleep(settings.PLAN_JOB_EVENTS_POLL_INTERVAL_SECONDS)
+            attempts = current.get("attempts")
+            current = await _find_user_job(db, job_id, current_user.id, progress_from=progress_sent)
+            if current.get("attempts") != attempts:
+                # A retry starts with fresh progress, so replay it from the start.
+                progress_sent = 0
+                current = await _find_user_job(db, job_id, current_user.id, progress_from=0)
 
-    # Save the new workout request to the database
-    db.workout_requests.insert_one(mongo_dict)
-    print("\n--- DEBUG STEP 5: INSERTED INTO DATABASE SUCCESSFULLY ---")
-    
-    # Return the created document
-    return workout_request_doc
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
 
 @router.get(
     "/my-requests",
-    response_model=List[WorkoutRequestInDB] 
+    response_model=WorkoutRequestPage
 )
-def get_my_workout_requests(
+async def get_my_workout_requests(
     request: Request,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Retrieves all workout plan requests for the currently authenticated user.
+    Retrieves the authenticated user's workout plan requests, newest first.
+    Returns summaries only; pass `next_cursor` back as `cursor` for the next page.
     """
     db = request.app.database
-    
-    user_requests = db.workout_requests.find({"user_id": current_user.id})
 
-    return list(user_requests)
+    return page_response(WorkoutRequestPage, await fetch_page(
+        db.workout_requests,
+        {"user_id": current_user.id},
+        WORKOUT_REQUEST_SUMMARY_PROJECTION,
+        limit=limit,
+        cursor=cursor,
+    ))
 
 @router.get(
     "/{plan_id}",
     response_model=WorkoutRequestInDB
 )
-def get_single_workout_request(
+async def get_single_workout_request(
     plan_id: UUID,
     request: Request,
     current_user: User = Depends(get_current_active_user)
@@ -109,10 +166,10 @@ def get_single_workout_request(
     """
     db = request.app.database
     
-    workout_plan = db.workout_requests.find_one({
+    workout_plan = await db.workout_requests.find_one({
         "_id": plan_id,
         "user_id": current_user.id
-    })
+    }, WORKOUT_REQUEST_PROJECTION)
 
     if workout_plan is None:
         raise HTTPException(
@@ -126,4 +183,4 @@ def get_single_workout_request(
             detail="This workout plan has not been approved by a coach yet."
         )
 
-    return workout_plan
\ No newline at end of file
+    return document_response(WorkoutRequestInDB, await attach_plan_detail(db, workout_plan))
\ No newline at end of file
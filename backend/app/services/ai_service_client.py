@@ -1,24 +1,149 @@
+import asyncio
+import json
+import random
+from typing import Optional, Callable, Awaitable
+
 import httpx
+from ..core import metrics
+from ..core import tracing
 from ..core.config import settings
 
-async def generate_plan_from_ai_service(user_data: dict) -> dict:
+# Errors raised before the request reached the AI service, so retrying cannot
+# start a second crew run for the same plan.
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+async def start_ai_service_client():
+    """Creates the application-wide client used for every call to the AI service."""
+    global _client
+    _client = httpx.AsyncClient(
+        base_url=settings.AI_SERVICE_URL,
+        http2=settings.AI_SERVICE_HTTP2 and _http2_available(),
+        limits=httpx.Limits(
+            max_connections=settings.AI_SERVICE_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.AI_SERVICE_MAX_KEEPALIVE_CONNECTIONS,
+        ),
+        timeout=httpx.Timeout(
+            settings.AI_SERVICE_READ_TIMEOUT_SECONDS,
+            connect=settings.AI_SERVICE_CONNECT_TIMEOUT_SECONDS,
+            pool=settings.AI_SERVICE_CONNECT_TIMEOUT_SECONDS,
+        ),
+    )
+
+async def close_ai_service_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+class AIServiceError(Exception):
+    """The AI service answered, but could not produce a plan."""
+
+
+class AIServiceBusy(AIServiceError):
+    """The AI service is saturated (503); the request may be retried after `retry_after` seconds."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"The AI service is busy; retry in {retry_after:.0f}s.")
+        self.retry_after = retry_after
+
+
+def _retry_after_seconds(response: httpx.Response) -> float:
+    try:
+        seconds = float(response.headers.get("Retry-After", ""))
+    except ValueError:
+        seconds = settings.AI_SERVICE_BUSY_RETRY_SECONDS
+    return min(max(seconds, 0.0), settings.AI_SERVICE_BUSY_MAX_RETRY_SECONDS)
+
+
+async def _open_plan_stream(user_data: dict) -> httpx.Response:
     """
-    Makes an asynchronous POST request to the crew_ai_service to generate a workout plan.
+    Starts a streamed plan generation. Connection failures are retried with
+    jittered exponential backoff; a busy AI service raises AIServiceBusy, so
+    the caller can back off for longer. The current trace is passed on to the AI service.
     """
-    service_url = f"{settings.AI_SERVICE_URL}/generate-plan"
-    
-    async with httpx.AsyncClient(timeout=240.0) as client:
+    headers = {}
+    traceparent = tracing.current_traceparent()
+    if traceparent is not None:
+        headers["traceparent"] = traceparent
+
+    attempt = 0
+    while True:
         try:
-            response = await client.post(service_url, json=user_data)
-            
-            response.raise_for_status()
-            
-            return response.json()
-            
+            request = _client.build_request(
+                "POST", "/generate-plan/stream", json=user_data, headers=headers
+            )
+            response = await _client.send(request, stream=True)
+            if response.status_code == 503:
+                await response.aclose()
+                raise AIServiceBusy(_retry_after_seconds(response))
+            if response.is_error:
+                await response.aread()
+                response.raise_for_status()
+            return response
+
+        except RETRYABLE_ERRORS as e:
+            if attempt >= settings.AI_SERVICE_MAX_RETRIES:
+                print(f"Giving up on {e.request.url!r} after {attempt + 1} attempts: {e!r}")
+                raise
+            backoff = random.uniform(0, settings.AI_SERVICE_RETRY_BACKOFF_SECONDS * 2 ** attempt)
+            attempt += 1
+            print(f"Could not reach the AI service ({e!r}), retry {attempt} in {backoff:.2f}s.")
+            await asyncio.sleep(backoff)
         except httpx.HTTPStatusError as e:
             print(f"Error response {e.response.status_code} while requesting {e.request.url!r}.")
             print(f"AI Service Response: {e.response.text}")
-            raise 
+            raise
         except httpx.RequestError as e:
             print(f"An error occurred while requesting {e.request.url!r}.")
-            raise
\ No newline at end of file
+            raise
+
+async def _iter_server_sent_events(response: httpx.Response):
+    event, data_lines = None, []
+    async for line in response.aiter_lines():
+        if line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].strip())
+        elif not line and event is not None:
+            yield event, json.loads("\n".join(data_lines) or "{}")
+            event, data_lines = None, []
+
+async def generate_plan_from_ai_service(
+    user_data: dict, on_event: Optional[Callable[[str, dict], Awaitable[None]]] = None
+) -> dict:
+    """
+    Asks the crew_ai_service to generate a workout plan and returns it.
+    The plan is streamed; `on_event` is awaited for every progress event
+    (metrics analyzed, workout drafted, ...) together with its partial output.
+    """
+    if _client is None:
+        raise RuntimeError("The AI service client has not been started.")
+
+    stats = metrics.latency("ai_service.generate_plan")
+    with stats.time(), tracing.span("ai_service.generate_plan") as call_span:
+        response = await _open_plan_stream(user_data)
+        call_span.set_attribute("http.status_code", response.status_code)
+        try:
+            async for event, data in _iter_server_sent_events(response):
+                if event == "validated":
+                    if "timings" in data:
+                        print(f"AI service stage timings: {data['timings']}")
+                    return data["plan"]
+                if event == "error":
+                    raise AIServiceError(data.get("detail", "The AI service failed to generate a plan."))
+                if on_event is not None:
+                    await on_event(event, data)
+        finally:
+            await response.aclose()
+
+    raise AIServiceError("The AI service closed the stream without returning a plan.")
@@ -0,0 +1,161 @@
+import hashlib
+import re
+import threading
+from typing import Optional, List, Tuple
+
+import numpy as np
+
+from ..core.cache import TTLCache
+from ..core.config import settings
+from .openai_client import get_openai_client
+
+# Messages about injuries, pain or medical conditions need an answer that
+# addresses them specifically, so they are never answered from the cache.
+SENSITIVE_PATTERN = re.compile(
+    r"\b(injur\w*|pain\w*|hurt\w*|ache\w*|sprain\w*|strain\w*|torn|tear|surgery|"
+    r"physio\w*|doctor|medical|medication|pregnan\w*|condition)\b"
+)
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def normalize_message(message: str) -> str:
+    return " ".join(_PUNCTUATION.sub(" ", message.lower()).split())
+
+
+class _VectorIndex:
+    """Unit-normalized embeddings of cached questions, searched by cosine similarity."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._keys: List[str] = []
+        self._vectors: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    def nearest(self, vector: np.ndarray) -> Tuple[Optional[str], float]:
+        with self._lock:
+            if self._vectors is None or not self._keys:
+                return None, 0.0
+            scores = self._vectors @ vector
+            best = int(np.argmax(scores))
+            return self._keys[best], float(scores[best])
+
+    def add(self, key: str, vector: np.ndarray, is_live):
+        with self._lock:
+            if key in self._keys:
+                return
+            if len(self._keys) >= self.max_size:
+                # Drop questions whose answers have left the cache, or the oldest one.
+                live = [i for i, k in enumerate(self._keys) if is_live(k)]
+                if len(live) >= self.max_size:
+                    live = live[1:]
+                self._keys = [self._keys[i] for i in live]
+                self._vectors = self._vectors[live]
+            self._keys.append(key)
+            row = vector[np.newaxis, :]
+            self._vectors = row if self._vectors is None or not len(self._vectors) \
+                else np.vstack([self._vectors, row])
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class CachedAnswerLookup:
+    """The result of a cache lookup, reused to store the answer on a miss."""
+
+    def __init__(self, key: str, embedding: Optional[np.ndarray] = None, answer: Optional[str] = None):
+        self.key = key
+        self.embedding = embedding
+        self.answer = answer
+
+
+class ChatAnswerCache:
+    """
+    Caches FitBot answers to standalone questions. Questions are matched on
+    their normalized text and the system prompt they were answered under;
+    with `semantic` enabled, a question whose embedding is close enough to a
+    cached one is answered from the cache too.
+    """
+
+    def __init__(
+        self, system_prompt: str, max_size: int, ttl_seconds: float,
+        semantic: bool = False, similarity_threshold: float = 0.92
+    ):
+        self.prompt_hash = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:16]
+        self.semantic = semantic
+        self.similarity_threshold = similarity_threshold
+        self._answers = TTLCache(max_size, ttl_seconds)
+        self._index = _VectorIndex(max_size) if semantic else None
+        self.lookups = 0
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.skipped_sensitive = 0
+        self.seconds_saved = 0.0
+
+    def cacheable(self, message: str) -> bool:
+        if SENSITIVE_PATTERN.search(message.lower()):
+            self.skipped_sensitive += 1
+            return False
+        return True
+
+    def _key(self, message: str) -> str:
+        raw = f"{self.prompt_hash}|{normalize_message(message)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def _embed(self, message: str) -> Optional[np.ndarray]:
+        try:
+            response = await get_openai_client().embeddings.create(
+                model=settings.CHAT_EMBEDDING_MODEL, input=normalize_message(message)
+            )
+        except Exception as e:
+            print(f"Could not embed chat message for the answer cache: {e}")
+            return None
+        vector = np.asarray(response.data[0].embedding, dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def _hit(self, entry: tuple) -> str:
+        answer, completion_seconds = entry
+        self.seconds_saved += completion_seconds
+        return answer
+
+    async def lookup(self, message: str) -> CachedAnswerLookup:
+        self.lookups += 1
+        lookup = CachedAnswerLookup(self._key(message))
+        entry = self._answers.get(lookup.key)
+        if entry is not None:
+            self.exact_hits += 1
+            lookup.answer = self._hit(entry)
+            return lookup
+
+        if self._index is not None and len(self._index):
+            lookup.embedding = await self._embed(message)
+            if lookup.embedding is not None:
+                key, score = self._index.nearest(lookup.embedding)
+                entry = self._answers.get(key) if score >= self.similarity_threshold else None
+                if entry is not None:
+                    self.semantic_hits += 1
+                    lookup.answer = self._hit(entry)
+        return lookup
+
+    async def store(self, lookup: CachedAnswerLookup, message: str, answer: str, completion_seconds: float):
+        self._answers.set(lookup.key, (answer, completion_seconds))
+        if self._index is not None:
+            embedding = lookup.embedding if lookup.embedding is not None else await self._embed(message)
+            if embedding is not None:
+                self._index.add(lookup.key, embedding, lambda key: key in self._answers)
+
+    def stats(self) -> dict:
+        answers = self._answers.stats()
+        hits = self.exact_hits + self.semantic_hits
+        return {
+            "size": answers["size"],
+            "max_size": answers["max_size"],
+            "evictions": answers["evictions"],
+            "semantic": self.semantic,
+            "lookups": self.lookups,
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "indexed_questions": len(self._index) if self._index is not None else 0,
+            "skipped_sensitive": self.skipped_sensitive,
+            "hit_ratio": hits / self.lookups if self.lookups else 0.0,
+            "seconds_saved": round(self.seconds_saved, 3),
+        }
@@ -0,0 +1,155 @@
+from datetime import datetime
+from typing import List, Dict, Optional
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from pymongo import DESCENDING, ReturnDocument
+
+from ..core.config import settings
+from ..models.chat import ChatSessionCreate, ChatSessionInDB, ChatMessageInDB, ROLE_USER, ROLE_ASSISTANT
+from ..models.workout import STATUS_APPROVED
+from .plan_store import attach_plan_detail
+
+# Rough token count without a tokenizer: ~4 characters per token for English
+# text, plus the per-message framing the chat API adds.
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN) + MESSAGE_OVERHEAD_TOKENS
+
+async def create_session(db, user_id: UUID, session_data: ChatSessionCreate) -> dict:
+    session = ChatSessionInDB(user_id=user_id, **session_data.model_dump())
+    session_dict = session.model_dump(by_alias=True)
+    await db.chat_sessions.insert_one(session_dict)
+    return session_dict
+
+async def get_user_session(db, session_id: UUID, user_id: UUID) -> dict:
+    session = await db.chat_sessions.find_one({"_id": session_id, "user_id": user_id})
+    if session is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chat session not found."
+        )
+    return session
+
+async def append_message(db, session: dict, role: str, content: str) -> dict:
+    """Appends a message to the session log, numbering it after the last one."""
+    updated = await db.chat_sessions.find_one_and_update(
+        {"_id": session["_id"]},
+        {"$inc": {"last_seq": 1}, "$set": {"updated_at": datetime.utcnow()}},
+        projection={"last_seq": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    message = ChatMessageInDB(
+        session_id=session["_id"],
+        user_id=session["user_id"],
+        seq=updated["last_seq"],
+        role=role,
+        content=content,
+        tokens=estimate_tokens(content),
+    )
+    message_dict = message.model_dump(by_alias=True)
+    await db.chat_messages.insert_one(message_dict)
+    return message_dict
+
+async def append_turn(db, session: dict, user_content: str, reply: str) -> dict:
+    """
+    Stores a user message and FitBot's reply to it, once the reply exists, so
+    a failed turn leaves nothing behind to be replayed into later prompts.
+    Returns the stored reply.
+    """
+    user_message = await append_message(db, session, ROLE_USER, user_content)
+    try:
+        return await append_message(db, session, ROLE_ASSISTANT, reply)
+    except BaseException:
+        await db.chat_messages.delete_one({"_id": user_message["_id"]})
+        raise
+
+async def fetch_messages_page(
+    db, session_id: UUID, limit: int, before_seq: Optional[int] = None
+) -> dict:
+    """
+    One page of a session's messages, newest first. Pages are addressed by
+    sequence number, so each page is a single range read on the index.
+    """
+    query = {"session_id": session_id}
+    if before_seq is not None:
+        query["seq"] = {"$lt": before_seq}
+
+    messages = await db.chat_messages.find(query) \
+        .sort("seq", DESCENDING) \
+        .limit(limit + 1) \
+        .to_list(length=limit + 1)
+
+    next_before_seq = None
+    if len(messages) > limit:
+        messages = messages[:limit]
+        next_before_seq = messages[-1]["seq"]
+    return {"items": messages, "next_before_seq": next_before_seq}
+
+
+def _plan_context(plan_doc: dict) -> str:
+    """A compact text rendering of an approved plan for the system prompt."""
+    lines = ["The user's current coach-approved plan:"]
+    summary = plan_doc.get("user_summary") or {}
+    if summary:
+        lines.append(f"Goal: {summary.get('fitness_goal')}, {summary.get('days_per_week')} days per week.")
+
+    workout_plan = plan_doc.get("workout_plan") or {}
+    for item in workout_plan.get("weekly_schedule", []):
+        lines.append(f"Day {item['day']}: {item['activity']}")
+    for name, workout in (workout_plan.get("workouts") or {}).items():
+        exercises = ", ".join(
+            f"{exercise['name']} {exercise['sets']}x{exercise['reps']}"
+            for exercise in workout.get("exercises", [])
+        )
+        lines.append(f"{name}: {exercises}")
+
+    nutrition = plan_doc.get("nutrition_guidelines") or {}
+    if nutrition.get("macronutrient_focus"):
+        lines.append(f"Nutrition focus: {nutrition['macronutrient_focus']}")
+    if plan_doc.get("coach_notes"):
+        lines.append(f"Coach notes: {plan_doc['coach_notes']}")
+    return "\n".join(lines)
+
+async def _approved_plan_context(db, user_id: UUID) -> Optional[str]:
+    plan_doc = await db.workout_requests.find_one(
+        {"user_id": user_id, "status": STATUS_APPROVED},
+        {"user_summary": 1, "workout_plan": 1, "nutrition_guidelines": 1, "coach_notes": 1},
+        sort=[("created_at", DESCENDING), ("_id", DESCENDING)],
+    )
+    if plan_doc is None:
+        return None
+    return _plan_context(await attach_plan_detail(db, plan_doc))
+
+async def build_prompt(db, session: dict, system_prompt: str, user_content: str) -> List[Dict[str, str]]:
+    """
+    The messages sent to the model for the reply to `user_content`, which is
+    not stored yet: the system prompt, the approved plan if the session asked
+    for it, as much recent history as fits in CHAT_HISTORY_TOKEN_BUDGET, then
+    `user_content`. Older messages are dropped first.
+    """
+    prompt = [{"role": "system", "content": system_prompt}]
+    budget = settings.CHAT_HISTORY_TOKEN_BUDGET
+
+    if session.get("include_plan"):
+        plan_context = await _approved_plan_context(db, session["user_id"])
+        if plan_context:
+            prompt.append({"role": "system", "content": plan_context})
+            budget -= estimate_tokens(plan_context)
+
+    history = [{"role": ROLE_USER, "content": user_content}]
+    used = estimate_tokens(user_content)
+    cursor = db.chat_messages.find(
+        {"session_id": session["_id"]}, {"_id": 0, "role": 1, "content": 1, "tokens": 1}
+    ).sort("seq", DESCENDING).limit(settings.CHAT_HISTORY_MAX_MESSAGES)
+    async for message in cursor:
+        if len(history) >= settings.CHAT_HISTORY_MAX_MESSAGES or used + message["tokens"] > budget:
+            break
+        used += message["tokens"]
+        history.append({"role": message["role"], "content": message["content"]})
+
+    prompt.extend(reversed(history))
+    return prompt
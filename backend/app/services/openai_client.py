@@ -0,0 +1,47 @@
+from typing import Optional
+
+import httpx
+from openai import AsyncOpenAI
+from ..core import metrics
+from ..core.config import settings
+from fitsync_common.llm_cassette import create_transports
+
+_client: Optional[AsyncOpenAI] = None
+
+
+async def start_openai_client():
+    """
+    Creates the application-wide OpenAI client. Its connection pool is kept
+    open between chat turns, so a turn does not pay for a new TLS handshake.
+    With LLM_CASSETTE_MODE set, calls are recorded to or replayed from cassettes.
+    """
+    global _client
+    limits = httpx.Limits(
+        max_connections=settings.OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+    )
+    # httpx ignores the client's limits when it is given a transport, so the
+    # cassette transport applies them to its own upstream connections.
+    _, transport = create_transports(
+        settings.LLM_CASSETTE_MODE, settings.LLM_CASSETTE_DIR,
+        settings.LLM_REPLAY_LATENCY_SECONDS, settings.LLM_REPLAY_LATENCY_SCALE, limits,
+    )
+    if transport is not None:
+        print(f"OpenAI calls use LLM cassettes in {settings.LLM_CASSETTE_MODE} mode ({settings.LLM_CASSETTE_DIR}).")
+        metrics.register_source("llm_cassettes", transport.store.stats)
+    _client = AsyncOpenAI(
+        api_key=settings.OPENAI_API_KEY,
+        timeout=settings.OPENAI_TIMEOUT_SECONDS,
+        http_client=httpx.AsyncClient(transport=transport, limits=limits),
+    )
+
+async def close_openai_client():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+def get_openai_client() -> AsyncOpenAI:
+    if _client is None:
+        raise RuntimeError("The OpenAI client has not been started.")
+    return _client
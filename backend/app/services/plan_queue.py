@@ -0,0 +1,323 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+from uuid import uuid4
+
+from pymongo import ReturnDocument
+
+from ..core.config import settings
+from ..core import metrics, tracing
+from ..models.workout import (
+    UserSummary, MetricsAnalysis, WorkoutPlan, NutritionAdvice,
+    STATUS_QUEUED, STATUS_GENERATING, STATUS_FAILED, STATUS_PENDING_REVIEW
+)
+from .ai_service_client import AIServiceBusy, generate_plan_from_ai_service
+from .plan_store import save_plan_detail
+
+
+class PlanJobQueue:
+    """
+    A MongoDB-backed queue of plan generation jobs.
+
+    Jobs live in the `workout_requests` collection itself, so a request moves
+    from `queued` to `generating` and finally to `pending_review` (or `failed`)
+    on the same document. A job is claimed with a lease that its worker renews
+    while the job runs; if the backend dies mid-run the lease expires and the
+    job is picked up again. Every claim stamps a new `lease_owner`, and a
+    worker only writes to a job while it still holds the lease.
+    """
+
+    def __init__(self, database, templates=None, worker_count: int = settings.PLAN_WORKER_COUNT):
+        self.database = database
+        # Approved plans offered to the AI service as a starting point (PlanTemplateIndex).
+        self.templates = templates
+        self.worker_count = worker_count
+        self._wakeup = asyncio.Event()
+        self._workers = []
+        self._loop = None
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._workers = [
+            asyncio.create_task(self._worker(n)) for n in range(self.worker_count)
+        ]
+        print(f"Plan job queue started with {self.worker_count} workers.")
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        print("Plan job queue stopped.")
+
+    def notify(self):
+        """
+        Wakes idle workers after a new job has been enqueued.
+        Safe to call from any thread, not just the event loop.
+        """
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _worker(self, worker_number: int):
+        while True:
+            try:
+                job = await self._claim_next_job()
+            except Exception as e:
+                print(f"Plan worker {worker_number} failed to claim a job: {e}")
+                job = None
+
+            if job is None:
+                try:
+                    await self._fail_abandoned_jobs()
+                except Exception as e:
+                    print(f"Plan worker {worker_number} failed to sweep abandoned jobs: {e}")
+                await self._wait_for_work()
+                continue
+
+            try:
+                await self._process(job)
+            except Exception as e:
+                print(f"Plan worker {worker_number} crashed on job {job['_id']}: {e}")
+                try:
+                    await self._record_failure(job, f"Plan worker crashed: {e}")
+                except Exception as record_error:
+                    # The lease will expire and the job is retried or failed from there.
+                    print(f"Plan worker {worker_number} could not record the crash of job {job['_id']}: {record_error}")
+
+    async def _wait_for_work(self):
+        try:
+            await asyncio.wait_for(
+                self._wakeup.wait(), timeout=settings.PLAN_JOB_POLL_INTERVAL_SECONDS
+            )
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _claim_next_job(self) -> Optional[dict]:
+        now = datetime.utcnow()
+        return await self.database.workout_requests.find_one_and_update(
+            {
+                "$or": [
+                    # Jobs put back because the AI service was busy wait until not_before.
+                    {"status": STATUS_QUEUED, "not_before": {"$not": {"$gt": now}}},
+                    # Jobs whose worker went away without finishing them, while
+                    # they have attempts left (see _fail_abandoned_jobs).
+                    {
+                        "status": STATUS_GENERATING,
+                        "lease_expires_at": {"$lt": now},
+                        "attempts": {"$lt": settings.PLAN_JOB_MAX_ATTEMPTS},
+                    },
+                ]
+            },
+            {
+                "$set": {
+                    "status": STATUS_GENERATING,
+                    "progress": [],
+                    "updated_at": now,
+                    "lease_owner": uuid4(),
+                    "lease_expires_at": now + timedelta(seconds=settings.PLAN_JOB_LEASE_SECONDS),
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _fail_abandoned_jobs(self):
+        """Fails jobs whose lease expired on their last allowed attempt."""
+        now = datetime.utcnow()
+        result = await self.database.workout_requests.update_many(
+            {
+                "status": STATUS_GENERATING,
+                "lease_expires_at": {"$lt": now},
+                "attempts": {"$gte": settings.PLAN_JOB_MAX_ATTEMPTS},
+            },
+            {"$set": {
+                "status": STATUS_FAILED,
+                "error": "The plan worker stopped before finishing the last attempt.",
+                "updated_at": now,
+                "lease_expires_at": None,
+            }}
+        )
+        if result.modified_count:
+            print(f"Failed {result.modified_count} plan jobs abandoned on their last attempt.")
+
+    async def _process(self, job: dict):
+        if job.get("attempts", 1) == 1 and not job.get("deferrals"):
+            metrics.PLAN_JOB_WAIT_SECONDS.observe((datetime.utcnow() - job["created_at"]).total_seconds())
+        started = time.perf_counter()
+        outcome = "crashed"
+        try:
+            # Continues the trace of the request that queued the job.
+            with tracing.span(
+                "plan_job.process", traceparent=job.get("trace_parent"),
+                job_id=str(job["_id"]), attempt=job.get("attempts", 1)
+            ):
+                generation = asyncio.create_task(self._generate(job))
+                lease_keeper = asyncio.create_task(self._keep_lease(job))
+                try:
+                    await asyncio.wait((generation, lease_keeper), return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    lease_keeper.cancel()
+                    if not generation.done():
+                        # The lease went to another worker, which now owns the job.
+                        generation.cancel()
+                if generation.cancelled():
+                    outcome = "lease_lost"
+                else:
+                    outcome = generation.result()
+        finally:
+            metrics.PLAN_JOB_SECONDS.labels(outcome).observe(time.perf_counter() - started)
+
+    @staticmethod
+    def _leased(job: dict) -> dict:
+        """Filter matching the job only while this claim of it holds the lease."""
+        return {"_id": job["_id"], "status": STATUS_GENERATING, "lease_owner": job.get("lease_owner")}
+
+    @staticmethod
+    def _lease_expiry() -> datetime:
+        return datetime.utcnow() + timedelta(seconds=settings.PLAN_JOB_LEASE_SECONDS)
+
+    async def _keep_lease(self, job: dict):
+        """Renews the job's lease while it runs, so a long crew run is not reclaimed."""
+        while True:
+            await asyncio.sleep(settings.PLAN_JOB_LEASE_SECONDS / 3)
+            try:
+                renewed = await self._renew_lease(job)
+            except Exception as e:
+                print(f"Plan job {job['_id']}: could not renew the lease: {e}")
+                continue
+            if not renewed:
+                print(f"Plan job {job['_id']}: lease lost, abandoning this attempt.")
+                return
+
+    async def _renew_lease(self, job: dict) -> bool:
+        """Extends the job's lease by a full term; False if this claim no longer holds it."""
+        result = await self.database.workout_requests.update_one(
+            self._leased(job), {"$set": {"lease_expires_at": self._lease_expiry()}}
+        )
+        return result.matched_count > 0
+
+    async def _generate(self, job: dict) -> str:
+        """Generates and stores the job's plan; returns "succeeded", "failed", "deferred" or "lease_lost"."""
+        job_id = job["_id"]
+        print(f"Plan job {job_id}: generating (attempt {job.get('attempts', 1)}).")
+
+        progress = []
+
+        async def record_progress(event: str, data: dict):
+            # Partial outputs are kept only while the job runs, for the events stream.
+            entry = {"event": event, "at": datetime.utcnow()}
+            progress.append(entry)
+            await self.database.workout_requests.update_one(
+                self._leased(job),
+                {
+                    "$push": {"progress": {**entry, "data": data}},
+                    "$set": {"updated_at": entry["at"], "lease_expires_at": self._lease_expiry()},
+                }
+            )
+
+        ai_request, template_request_id = self._with_template(job["request_payload"])
+        try:
+            # The AI service read timeout applies per streamed event, so the
+            # attempt as a whole gets its own deadline.
+            generated_plan_dict = await asyncio.wait_for(
+                generate_plan_from_ai_service(ai_request, on_event=record_progress),
+                timeout=settings.PLAN_JOB_TIMEOUT_SECONDS,
+            )
+            with tracing.span("plan.validate"):
+                plan_fields = {
+                    "status": generated_plan_dict.get("status", STATUS_PENDING_REVIEW),
+                    "coach_notes": generated_plan_dict.get("coach_notes", ""),
+                    "user_summary": UserSummary(**generated_plan_dict["user_summary"]).model_dump(),
+                    "body_analysis": MetricsAnalysis(**generated_plan_dict["body_analysis"]).model_dump(),
+                    "template_request_id": template_request_id,
+                }
+                workout_plan = WorkoutPlan(**generated_plan_dict["workout_plan"])
+                nutrition_guidelines = NutritionAdvice(**generated_plan_dict["nutrition_guidelines"])
+        except AIServiceBusy as e:
+            print(f"Plan job {job_id}: the AI service is busy, retrying in {e.retry_after:.0f}s.")
+            await self._defer(job, e.retry_after)
+            return "deferred"
+        except asyncio.TimeoutError:
+            print(f"Plan job {job_id}: generation timed out.")
+            await self._record_failure(job, "Plan generation timed out.")
+            return "failed"
+        except Exception as e:
+            print(f"Plan job {job_id}: generation failed: {e}")
+            await self._record_failure(job, str(e))
+            return "failed"
+
+        with tracing.span("mongo.store_plan"):
+            # workout_plans is not leased itself. Renewing the lease first means
+            # no other worker can take the job over, and overwrite the body,
+            # before _record_success has run.
+            if not await self._renew_lease(job):
+                print(f"Plan job {job_id}: lease lost before storing the plan, dropping it.")
+                return "lease_lost"
+            # The plan body goes in first, so a request is never reviewable without it.
+            await save_plan_detail(self.database, job_id, workout_plan, nutrition_guidelines)
+
+            progress.append({"event": "validated", "at": datetime.utcnow()})
+            plan_fields["progress"] = progress
+            await self._record_success(job, plan_fields)
+        print(f"Plan job {job_id}: plan stored, awaiting coach review.")
+        return "succeeded"
+
+    def _with_template(self, request_payload: dict):
+        """The AI service request for a job, with the closest approved plan if there is one."""
+        if self.templates is None:
+            return request_payload, None
+        try:
+            template = self.templates.find(request_payload)
+        except Exception as e:
+            # Templates only save tokens; a payload they cannot handle is generated from scratch.
+            print(f"Plan template lookup failed: {e}")
+            metrics.PLAN_TEMPLATE_LOOKUPS.labels("error").inc()
+            return request_payload, None
+        metrics.PLAN_TEMPLATE_LOOKUPS.labels("hit" if template is not None else "miss").inc()
+        if template is None:
+            return request_payload, None
+        template_request_id, workout_plan = template
+        return {**request_payload, "template_plan": workout_plan}, template_request_id
+
+    async def _record_success(self, job: dict, plan_fields: dict):
+        plan_fields.update({
+            "error": None,
+            "updated_at": datetime.utcnow(),
+            "lease_expires_at": None,
+        })
+        await self.database.workout_requests.update_one(
+            self._leased(job), {"$set": plan_fields, "$inc": {"version": 1}}
+        )
+
+    async def _defer(self, job: dict, delay_seconds: float):
+        """Puts the job back in the queue for `delay_seconds`, without using up an attempt."""
+        now = datetime.utcnow()
+        await self.database.workout_requests.update_one(
+            self._leased(job),
+            {
+                "$set": {
+                    "status": STATUS_QUEUED,
+                    "not_before": now + timedelta(seconds=delay_seconds),
+                    "updated_at": now,
+                    "lease_expires_at": None,
+                },
+                "$inc": {"attempts": -1, "deferrals": 1},
+            }
+        )
+
+    async def _record_failure(self, job: dict, error: str):
+        should_retry = job.get("attempts", 1) < settings.PLAN_JOB_MAX_ATTEMPTS
+        await self.database.workout_requests.update_one(
+            self._leased(job),
+            {"$set": {
+                "status": STATUS_QUEUED if should_retry else STATUS_FAILED,
+                "error": error,
+                "updated_at": datetime.utcnow(),
+                "lease_expires_at": None,
+            }}
+        )
+        if should_retry:
+            self.notify()
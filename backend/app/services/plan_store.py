@@ -0,0 +1,34 @@
+from datetime import datetime
+from uuid import UUID
+
+from pymongo import ReplaceOne
+
+from ..models.workout import WorkoutPlan, NutritionAdvice, WorkoutPlanDetail, PLAN_DETAIL_FIELDS
+
+
+def plan_detail_document(request_id: UUID, workout_plan: WorkoutPlan, nutrition_guidelines: NutritionAdvice) -> dict:
+    return WorkoutPlanDetail(
+        _id=request_id,
+        workout_plan=workout_plan,
+        nutrition_guidelines=nutrition_guidelines,
+        updated_at=datetime.utcnow(),
+    ).model_dump(by_alias=True)
+
+def plan_detail_upsert(request_id: UUID, workout_plan: WorkoutPlan, nutrition_guidelines: NutritionAdvice) -> ReplaceOne:
+    """A bulk write operation storing the plan sections of one request."""
+    document = plan_detail_document(request_id, workout_plan, nutrition_guidelines)
+    return ReplaceOne({"_id": request_id}, document, upsert=True)
+
+async def save_plan_detail(db, request_id: UUID, workout_plan: WorkoutPlan, nutrition_guidelines: NutritionAdvice):
+    document = plan_detail_document(request_id, workout_plan, nutrition_guidelines)
+    await db.workout_plans.replace_one({"_id": request_id}, document, upsert=True)
+
+async def attach_plan_detail(db, request_doc: dict) -> dict:
+    """
+    Fills in the plan sections of a workout request document. Requests that
+    have not been migrated yet keep the sections they embed.
+    """
+    detail = await db.workout_plans.find_one({"_id": request_doc["_id"]}, {field: 1 for field in PLAN_DETAIL_FIELDS})
+    if detail is not None:
+        request_doc.update({field: detail[field] for field in PLAN_DETAIL_FIELDS})
+    return request_doc
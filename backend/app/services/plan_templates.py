@@ -0,0 +1,143 @@
+import threading
+from collections import defaultdict, deque
+from typing import Dict, Any, Optional, Tuple
+from uuid import UUID
+
+from fitsync_common.text import normalize_injuries, normalize_text
+from pymongo import DESCENDING
+
+from ..core.config import settings
+from ..models.workout import STATUS_APPROVED
+
+# Distances are measured in these units, so one unit of either is a
+# comparable difference between two users.
+AGE_SCALE_YEARS = 10.0
+BMI_SCALE = 3.0
+
+
+def template_bucket(fitness_goal: str, days_per_week: int, injuries: str) -> Tuple[str, int, str]:
+    """
+    Only plans for the same goal, schedule and injuries are candidates: a plan
+    built around one injury must never be offered for another.
+    """
+    return normalize_text(fitness_goal), days_per_week, normalize_injuries(injuries)
+
+def profile_point(request_payload: dict) -> Optional[Tuple[float, float]]:
+    """The (age, BMI) point of a request, or None if its measurements are unusable."""
+    height, weight = request_payload.get("height"), request_payload.get("weight")
+    if not height or not weight or height <= 0 or weight <= 0:
+        return None
+    height_m = height / 100
+    bmi = weight / (height_m * height_m)
+    return request_payload["age"] / AGE_SCALE_YEARS, bmi / BMI_SCALE
+
+
+class PlanTemplateIndex:
+    """
+    Coach-approved workout plans, looked up by the profile of a new request so
+    the AI service can adapt the closest one instead of writing a plan from
+    scratch. Plans are grouped by goal, days per week and injuries; within a
+    group the nearest user by age and BMI wins, if within
+    PLAN_TEMPLATE_MAX_DISTANCE. Each group keeps its most recent
+    PLAN_TEMPLATE_MAX_PER_BUCKET plans.
+
+    The index lives in memory. It is loaded at startup and every approval
+    made through this backend instance is added as it happens.
+    """
+
+    def __init__(self, max_per_bucket: int, max_distance: float):
+        self.max_distance = max_distance
+        self._buckets: Dict[Tuple[str, int, str], deque] = defaultdict(lambda: deque(maxlen=max_per_bucket))
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.added = 0
+
+    def add(self, request_id: UUID, request_payload: Optional[dict], workout_plan: dict):
+        # Requests made before jobs kept their payload cannot be matched.
+        point = profile_point(request_payload) if request_payload else None
+        if point is None:
+            return
+        bucket = template_bucket(
+            request_payload["fitness_goal"], request_payload["days_per_week"], request_payload["injuries"]
+        )
+        with self._lock:
+            entries = self._buckets[bucket]
+            # A re-approved request replaces its earlier plan.
+            for entry in list(entries):
+                if entry[0] == request_id:
+                    entries.remove(entry)
+            entries.append((request_id, point, workout_plan))
+            self.added += 1
+
+    def find(self, request_payload: dict) -> Optional[Tuple[UUID, dict]]:
+        """The (request id, workout plan) of the closest approved plan, or None."""
+        bucket = template_bucket(
+            request_payload["fitness_goal"], request_payload["days_per_week"], request_payload["injuries"]
+        )
+        point = profile_point(request_payload)
+        with self._lock:
+            self.lookups += 1
+            if point is None:
+                return None
+            age, bmi = point
+            best, best_distance = None, self.max_distance
+            for request_id, (other_age, other_bmi), workout_plan in self._buckets.get(bucket, ()):
+                distance = ((age - other_age) ** 2 + (bmi - other_bmi) ** 2) ** 0.5
+                if distance <= best_distance:
+                    best, best_distance = (request_id, workout_plan), distance
+            if best is not None:
+                self.hits += 1
+            return best
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "templates": sum(len(entries) for entries in self._buckets.values()),
+                "buckets": len(self._buckets),
+                "added": self.added,
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_ratio": self.hits / self.lookups if self.lookups else 0.0,
+            }
+
+
+async def load_plan_templates(db, index: PlanTemplateIndex, limit: int = settings.PLAN_TEMPLATE_LOAD_LIMIT) -> int:
+    """Adds the most recently approved plans to `index`, oldest first. Returns how many were read."""
+    requests = await db.workout_requests.find(
+        {"status": STATUS_APPROVED},
+        {"request_payload": 1, "workout_plan": 1},
+        sort=[("created_at", DESCENDING), ("_id", DESCENDING)],
+    ).limit(limit).to_list(length=limit)
+
+    details = {
+        detail["_id"]: detail["workout_plan"]
+        async for detail in db.workout_plans.find(
+            {"_id": {"$in": [doc["_id"] for doc in requests]}}, {"workout_plan": 1}
+        )
+    }
+    for doc in reversed(requests):
+        workout_plan = details.get(doc["_id"]) or doc.get("workout_plan")
+        if workout_plan is not None:
+            index.add(doc["_id"], doc.get("request_payload"), workout_plan)
+    return len(requests)
+
+async def add_approved_plans(db, index: Optional[PlanTemplateIndex], plans: Dict[UUID, Optional[dict]]):
+    """
+    Adds just-approved requests to `index`, if templates are enabled. `plans`
+    maps each request id to its approved workout plan, or to None to read the
+    stored plan.
+    """
+    if index is None or not plans:
+        return
+    payloads = {
+        doc["_id"]: doc.get("request_payload")
+        async for doc in db.workout_requests.find({"_id": {"$in": list(plans)}}, {"request_payload": 1})
+    }
+    missing = [request_id for request_id, plan in plans.items() if plan is None]
+    if missing:
+        async for detail in db.workout_plans.find({"_id": {"$in": missing}}, {"workout_plan": 1}):
+            plans[detail["_id"]] = detail["workout_plan"]
+    for request_id, workout_plan in plans.items():
+        if workout_plan is not None:
+            index.add(request_id, payloads.get(request_id), workout_plan)
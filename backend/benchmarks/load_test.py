@@ -0,0 +1,139 @@
+"""
+A small closed-loop load generator for the backend API.
+
+Start MongoDB, the mock AI service (see mock_ai_service.py) and the backend,
+then run from the backend/ directory:
+
+    python -m benchmarks.load_test --scenario mixed --concurrency 50 --duration 30
+
+Each virtual user registers its own account, logs in and then issues requests
+back to back until the duration has elapsed. The report lists throughput and
+latency percentiles per endpoint, so runs before and after a change can be
+compared directly.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, List
+
+import httpx
+
+PLAN_REQUEST = {
+    "age": 28,
+    "gender": "male",
+    "weight": 72,
+    "height": 180,
+    "fitness_goal": "build muscle",
+    "days_per_week": 3,
+    "injuries": "none",
+}
+
+SCENARIOS = {
+    "me": [("GET", "/users/me", None)],
+    "my-requests": [("GET", "/workouts/my-requests", None)],
+    "request-plan": [("POST", "/workouts/request-plan", PLAN_REQUEST)],
+    "mixed": [
+        ("GET", "/users/me", None),
+        ("GET", "/workouts/my-requests", None),
+        ("GET", "/users/me", None),
+        ("POST", "/workouts/request-plan", PLAN_REQUEST),
+    ],
+}
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def login_new_user(client: httpx.AsyncClient) -> str:
+    suffix = uuid.uuid4().hex[:12]
+    email = f"bench-{suffix}@example.com"
+    password = "bench-password"
+    response = await client.post("/auth/register", json={
+        "full_name": "Bench User",
+        "email": email,
+        "gym_registration_number": f"BENCH-{suffix}",
+        "password": password,
+    })
+    response.raise_for_status()
+    response = await client.post("/auth/login/user", data={"username": email, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def virtual_user(
+    client: httpx.AsyncClient, steps, deadline: float,
+    latencies: Dict[str, List[float]], errors: Dict[str, int]
+):
+    token = await login_new_user(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    step = 0
+    while time.perf_counter() < deadline:
+        method, path, body = steps[step % len(steps)]
+        step += 1
+        label = f"{method} {path}"
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, json=body, headers=headers)
+            if response.status_code >= 400:
+                errors[label] += 1
+                continue
+        except httpx.HTTPError:
+            errors[label] += 1
+            continue
+        latencies[label].append(time.perf_counter() - started)
+
+
+async def run(base_url: str, scenario: str, concurrency: int, duration: float):
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        deadline = time.perf_counter() + duration
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            virtual_user(client, SCENARIOS[scenario], deadline, latencies, errors)
+            for _ in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+
+    print(f"Scenario '{scenario}', {concurrency} concurrent users, {elapsed:.1f}s")
+    print(f"{'endpoint':<32}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    total = 0
+    for label in sorted(set(latencies) | set(errors)):
+        samples = latencies[label]
+        total += len(samples)
+        print(
+            f"{label:<32}{len(samples):>10}{errors[label]:>8}{len(samples) / elapsed:>10.1f}"
+            f"{percentile(samples, 50) * 1000:>10.1f}{percentile(samples, 95) * 1000:>10.1f}"
+            f"{percentile(samples, 99) * 1000:>10.1f}"
+        )
+    all_samples = [sample for samples in latencies.values() for sample in samples]
+    if all_samples:
+        print(
+            f"{'total':<32}{total:>10}{sum(errors.values()):>8}{total / elapsed:>10.1f}"
+            f"{statistics.median(all_samples) * 1000:>10.1f}{percentile(all_samples, 95) * 1000:>10.1f}"
+            f"{percentile(all_samples, 99) * 1000:>10.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the FitSync backend.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="mixed")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run for.")
+    args = parser.parse_args()
+    asyncio.run(run(args.base_url, args.scenario, args.concurrency, args.duration))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+A stand-in for crew_ai_service that returns a canned plan, so the backend can
+be load-tested without calling any LLM.
+
+Run it in place of the real AI service:
+
+    MOCK_AI_LATENCY_SECONDS=2 uvicorn benchmarks.mock_ai_service:app --port 8001
+"""
+import asyncio
+import json
+import os
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+MOCK_AI_LATENCY_SECONDS = float(os.getenv("MOCK_AI_LATENCY_SECONDS", "0"))
+
+app = FastAPI(title="Mock FitSync AI Crew Service")
+
+
+def build_mock_plan(user_data: dict) -> dict:
+    exercise = {"name": "Goblet Squat", "sets": 3, "reps": "8-12", "rest_seconds": 90, "duration_seconds": None}
+    workout = {
+        "warm_up": "5 minutes of light cardio followed by dynamic stretches.",
+        "exercises": [exercise] * 6,
+        "cool_down": "5 minutes of walking and static stretching.",
+    }
+    days = user_data.get("days_per_week", 3)
+    return {
+        "user_summary": {
+            "fitness_goal": user_data.get("fitness_goal", "general fitness"),
+            "days_per_week": days,
+        },
+        "body_analysis": {"bmi": 23.4, "body_fat_percentage": 18.2, "body_type": "Mesomorph"},
+        "workout_plan": {
+            "weekly_schedule": [
+                {"day": day, "activity": f"Workout {day}" if day <= days else "Rest"}
+                for day in range(1, 8)
+            ],
+            "workouts": {f"Workout {day}": workout for day in range(1, days + 1)},
+            "progressive_overload_notes": "Add weight once all sets reach the top of the rep range.",
+        },
+        "nutrition_guidelines": {
+            "general_principles": "Eat mostly whole foods.",
+            "macronutrient_focus": "About 1.6 g of protein per kg of body weight.",
+            "hydration": "Drink 2-3 litres of water a day.",
+            "meal_timing_suggestion": "Have a meal with protein and carbs within two hours of training.",
+        },
+        "status": "pending_review",
+        "coach_notes": "",
+    }
+
+
+@app.post("/generate-plan")
+async def generate_plan(user_data: dict):
+    if MOCK_AI_LATENCY_SECONDS:
+        await asyncio.sleep(MOCK_AI_LATENCY_SECONDS)
+    return build_mock_plan(user_data)
+
+
+@app.post("/generate-plan/stream")
+async def generate_plan_stream(user_data: dict):
+    plan = build_mock_plan(user_data)
+    stages = [
+        ("metrics_analyzed", {"body_analysis": plan["body_analysis"]}),
+        ("workout_drafted", {"workout_plan": plan["workout_plan"]}),
+        ("nutrition_drafted", {"nutrition_guidelines": plan["nutrition_guidelines"]}),
+        ("synthesized", {}),
+        ("validated", {"plan": plan}),
+    ]
+
+    async def event_stream():
+        for event, data in stages:
+            if MOCK_AI_LATENCY_SECONDS:
+                await asyncio.sleep(MOCK_AI_LATENCY_SECONDS / len(stages))
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
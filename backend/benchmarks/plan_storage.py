@@ -0,0 +1,150 @@
+"""
+Compares the two storage layouts for workout requests on a synthetic dataset:
+
+- embedded: every request document carries its full plan (the old layout)
+- split:    request metadata in one collection, plan bodies in another
+
+Needs only MongoDB. Run from the backend/ directory:
+
+    python -m benchmarks.plan_storage --requests 100000 --iterations 200
+
+The data goes into a scratch database (dropped afterwards unless --keep is
+given). The report lists, per layout, the size of the collection the hot
+queries read, its indexes, and latency percentiles of those queries. The
+working set of the listing queries is roughly the data plus index size of
+that collection.
+"""
+import argparse
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+from pymongo import MongoClient, ASCENDING, DESCENDING
+
+from .load_test import percentile
+from .mock_ai_service import build_mock_plan
+
+STATUSES = ["pending_review"] * 2 + ["approved"] * 7 + ["failed"]
+USER_COUNT = 5000
+
+
+def synthetic_requests(count: int):
+    """Yields (request metadata, plan body) pairs with varied plans."""
+    user_ids = [uuid.uuid4() for _ in range(USER_COUNT)]
+    started = datetime.utcnow() - timedelta(days=365)
+    for i in range(count):
+        days = random.randint(2, 6)
+        plan = build_mock_plan({"fitness_goal": random.choice(["weight loss", "muscle gain", "endurance"]), "days_per_week": days})
+        request_id = uuid.uuid4()
+        metadata = {
+            "_id": request_id,
+            "user_id": random.choice(user_ids),
+            "created_at": started + timedelta(seconds=i * 300),
+            "status": random.choice(STATUSES),
+            "coach_notes": "",
+            "user_summary": plan["user_summary"],
+            "body_analysis": plan["body_analysis"],
+            "version": 1,
+        }
+        detail = {
+            "_id": request_id,
+            "workout_plan": plan["workout_plan"],
+            "nutrition_guidelines": plan["nutrition_guidelines"],
+        }
+        yield metadata, detail
+
+
+def load(database, count: int, batch_size: int = 2000):
+    embedded, split_requests, split_plans = [], [], []
+
+    def flush():
+        if embedded:
+            database.embedded_requests.insert_many(embedded, ordered=False)
+            database.split_requests.insert_many(split_requests, ordered=False)
+            database.split_plans.insert_many(split_plans, ordered=False)
+            for batch in (embedded, split_requests, split_plans):
+                batch.clear()
+
+    for metadata, detail in synthetic_requests(count):
+        embedded.append({**metadata, "workout_plan": detail["workout_plan"], "nutrition_guidelines": detail["nutrition_guidelines"]})
+        split_requests.append(metadata)
+        split_plans.append(detail)
+        if len(embedded) >= batch_size:
+            flush()
+    flush()
+
+    for name in ("embedded_requests", "split_requests"):
+        database[name].create_index([("status", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)])
+        database[name].create_index([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)])
+
+
+def hot_queries(requests, user_ids: List[uuid.UUID]) -> Dict[str, Callable[[], None]]:
+    """The listing and status queries the API runs, without any projection tricks."""
+    return {
+        "pending page": lambda: list(
+            requests.find({"status": "pending_review"}).sort([("created_at", 1), ("_id", 1)]).limit(20)
+        ),
+        "user history page": lambda: list(
+            requests.find({"user_id": random.choice(user_ids)}).sort([("created_at", -1), ("_id", -1)]).limit(20)
+        ),
+        "status count": lambda: requests.count_documents({"status": "pending_review"}),
+    }
+
+
+def measure(func: Callable[[], None], iterations: int) -> List[float]:
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def report(database, iterations: int):
+    user_ids = database.split_requests.distinct("user_id")
+    for layout in ("embedded", "split"):
+        requests = database[f"{layout}_requests"]
+        stats = database.command("collStats", requests.name)
+        print(
+            f"\n{layout}: {stats['count']} requests, data {stats['size'] / 2**20:.1f} MiB "
+            f"(avg {stats['avgObjSize']:.0f} B/doc), indexes {stats['totalIndexSize'] / 2**20:.1f} MiB"
+        )
+        if layout == "split":
+            plans = database.command("collStats", "split_plans")
+            print(f"  plan bodies (read on demand): data {plans['size'] / 2**20:.1f} MiB")
+        for name, query in hot_queries(requests, user_ids).items():
+            query()  # warm the cache
+            samples = [s * 1000 for s in measure(query, iterations)]
+            print(
+                f"  {name:<18} p50 {percentile(samples, 50):7.2f} ms  "
+                f"p95 {percentile(samples, 95):7.2f} ms  p99 {percentile(samples, 99):7.2f} ms"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedded vs split plan storage.")
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017/")
+    parser.add_argument("--database", default="fitsync_plan_storage_bench")
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch database afterwards.")
+    args = parser.parse_args()
+
+    client = MongoClient(args.mongo_url, uuidRepresentation="standard")
+    client.drop_database(args.database)
+    database = client[args.database]
+    try:
+        started = time.perf_counter()
+        load(database, args.requests)
+        print(f"Loaded {args.requests} synthetic requests in {time.perf_counter() - started:.1f}s.")
+        report(database, args.iterations)
+    finally:
+        if not args.keep:
+            client.drop_database(args.database)
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
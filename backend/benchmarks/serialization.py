@@ -0,0 +1,123 @@
+"""
+Micro-benchmark of the response serialization paths for large plans.
+
+Compares, per payload, how a raw Mongo document becomes response bytes:
+
+- fastapi:   what `response_model` does: validate, dump to Python objects in
+             JSON mode, encode with the stdlib json module
+- orjson:    the same, encoded with orjson (ORJSONResponse)
+- pydantic:  validate once and serialize to bytes in pydantic-core
+             (core/responses.py)
+- page_response: the helper the list endpoints use, which also streams
+             pages of more than STREAM_MIN_ITEMS items
+
+Needs no database or services. Run from the backend/ directory:
+
+    python -m benchmarks.serialization --exercises 12 --page-size 200 --iterations 200
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import orjson
+
+from app.core.responses import page_response
+from app.models.workout import WorkoutRequestInDB, WorkoutRequestPage
+from .load_test import percentile
+from .mock_ai_service import build_mock_plan
+
+
+def large_plan_document(exercises: int) -> dict:
+    """A stored request with a seven-day plan of `exercises` exercises per day."""
+    plan = build_mock_plan({"fitness_goal": "muscle gain", "days_per_week": 7})
+    for workout in plan["workout_plan"]["workouts"].values():
+        workout["exercises"] = [
+            {**workout["exercises"][0], "name": f"Exercise {n}"} for n in range(exercises)
+        ]
+    return {
+        "_id": uuid.uuid4(),
+        "user_id": uuid.uuid4(),
+        "created_at": datetime.utcnow(),
+        "status": plan["status"],
+        "coach_notes": "Keep the rest periods honest.",
+        "user_summary": plan["user_summary"],
+        "body_analysis": plan["body_analysis"],
+        "workout_plan": plan["workout_plan"],
+        "nutrition_guidelines": plan["nutrition_guidelines"],
+        "version": 1,
+    }
+
+def summary_page(size: int) -> dict:
+    items = []
+    for _ in range(size):
+        document = large_plan_document(1)
+        for field in ("workout_plan", "nutrition_guidelines"):
+            document.pop(field)
+        items.append(document)
+    return {"items": items, "next_cursor": "bmV4dA=="}
+
+
+def _fastapi_path(model):
+    return lambda document: json.dumps(
+        model.model_validate(document).model_dump(mode="json", by_alias=True)
+    ).encode("utf-8")
+
+def _orjson_path(model):
+    return lambda document: orjson.dumps(model.model_validate(document).model_dump(mode="json", by_alias=True))
+
+def _pydantic_path(model):
+    return lambda document: model.model_validate(document).model_dump_json(by_alias=True).encode("utf-8")
+
+_loop = asyncio.new_event_loop()
+
+async def _read_body(response) -> bytes:
+    return b"".join([chunk async for chunk in response.body_iterator])
+
+def _page_response_path(document: dict) -> bytes:
+    response = page_response(WorkoutRequestPage, document)
+    if hasattr(response, "body_iterator"):
+        return _loop.run_until_complete(_read_body(response))
+    return response.body
+
+
+def measure(serialize: Callable[[dict], bytes], document: dict, iterations: int) -> Dict[str, float]:
+    serialize(document)  # warm up
+    samples: List[float] = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        body = serialize(document)
+        samples.append((time.perf_counter() - started) * 1000)
+    return {"p50": percentile(samples, 50), "p95": percentile(samples, 95), "bytes": len(body)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark response serialization of large plans.")
+    parser.add_argument("--exercises", type=int, default=12, help="Exercises per workout day.")
+    parser.add_argument("--page-size", type=int, default=200, help="Items in the summary page.")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    payloads = {
+        "plan": (WorkoutRequestInDB, large_plan_document(args.exercises)),
+        "summary page": (WorkoutRequestPage, summary_page(args.page_size)),
+    }
+    print(f"{'payload':<14}{'path':<15}{'p50 ms':>10}{'p95 ms':>10}{'bytes':>10}")
+    for name, (model, document) in payloads.items():
+        paths = {
+            "fastapi": _fastapi_path(model),
+            "orjson": _orjson_path(model),
+            "pydantic": _pydantic_path(model),
+        }
+        if model is WorkoutRequestPage:
+            paths["page_response"] = _page_response_path
+        for path, serialize in paths.items():
+            result = measure(serialize, document, args.iterations)
+            print(f"{name:<14}{path:<15}{result['p50']:>10.3f}{result['p95']:>10.3f}{result['bytes']:>10}")
+
+
+if __name__ == "__main__":
+    main()
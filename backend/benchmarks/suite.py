@@ -0,0 +1,354 @@
+"""
+End-to-end benchmark of the FitSync flows that runs without network access.
+
+Starts the backend and an AI service against a local MongoDB, then drives
+the main flows at a configurable concurrency:
+
+- users register, log in, request a plan, wait for it to be generated and
+  ask FitBot a few questions, over and over
+- coaches page through pending requests and approve each one
+
+Run from the backend/ directory:
+
+    python -m benchmarks.suite --users 20 --coaches 2 --duration 60
+
+The AI service is the canned mock (mock_ai_service.py) by default, or the real
+crew service with --ai-service crew. The OpenAI calls of both services are
+replayed from LLM cassettes (see shared/fitsync_common/llm_cassette.py); record them
+once, with network access and a real OPENAI_API_KEY, by running the suite
+with --llm-mode record. --llm-latency adds synthetic model latency to every
+replayed call.
+
+The report lists requests, errors, throughput and p50/p95/p99 latency per
+step, then the CPU time and peak memory of each service process. The data
+goes into a scratch database that is dropped afterwards unless --keep is given.
+"""
+import argparse
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+from prometheus_client.parser import text_string_to_metric_families
+from pymongo import MongoClient
+
+from .load_test import PLAN_REQUEST, percentile
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+CREW_SERVICE_DIR = BACKEND_DIR.parent / "crew_ai_service"
+
+CHAT_QUESTIONS = [
+    "How many rest days should I take per week?",
+    "What should I eat before a morning workout?",
+    "How do I keep good form on a deadlift?",
+    "Is it better to do cardio before or after weights?",
+]
+JOB_TERMINAL_STATUSES = {"pending_review", "approved", "failed"}
+
+
+class Recorder:
+    """Latencies and errors per flow step."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def request(self, client: httpx.AsyncClient, label: str, method: str, path: str, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+        except httpx.HTTPError:
+            self.errors[label] += 1
+            return None
+        if response.status_code >= 400:
+            self.errors[label] += 1
+            return None
+        self.latencies[label].append(time.perf_counter() - started)
+        return response
+
+
+async def register_and_login(client: httpx.AsyncClient, recorder: Recorder, coach: bool = False) -> dict:
+    suffix = uuid.uuid4().hex[:12]
+    email = f"suite-{suffix}@example.com"
+    password = "suite-password"
+    await recorder.request(client, "register", "POST", "/auth/register", json={
+        "full_name": "Suite Coach" if coach else "Suite User",
+        "email": email,
+        "gym_registration_number": f"{'COACH' if coach else 'SUITE'}-{suffix}",
+        "password": password,
+    })
+    response = await recorder.request(
+        client, "login", "POST", "/auth/login/coach" if coach else "/auth/login/user",
+        data={"username": email, "password": password},
+    )
+    if response is None:
+        raise RuntimeError("Could not register and log in a benchmark account.")
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def user_flow(
+    client: httpx.AsyncClient, recorder: Recorder, deadline: float, chat_turns: int, poll_interval: float
+):
+    headers = await register_and_login(client, recorder)
+    turn = 0
+    while time.perf_counter() < deadline:
+        requested = time.perf_counter()
+        response = await recorder.request(
+            client, "request-plan", "POST", "/workouts/request-plan", json=PLAN_REQUEST, headers=headers
+        )
+        if response is not None:
+            job_id = response.json()["job_id"]
+            while time.perf_counter() < deadline:
+                await asyncio.sleep(poll_interval)
+                job = await recorder.request(client, "job status", "GET", f"/workouts/jobs/{job_id}", headers=headers)
+                if job is not None and job.json()["status"] in JOB_TERMINAL_STATUSES:
+                    if job.json()["status"] == "failed":
+                        recorder.errors["plan ready"] += 1
+                    else:
+                        recorder.latencies["plan ready"].append(time.perf_counter() - requested)
+                    break
+
+        for _ in range(chat_turns):
+            if time.perf_counter() >= deadline:
+                break
+            await recorder.request(
+                client, "chat", "POST", "/chat/conversation",
+                json={"message": CHAT_QUESTIONS[turn % len(CHAT_QUESTIONS)]}, headers=headers,
+            )
+            turn += 1
+
+
+async def coach_flow(client: httpx.AsyncClient, recorder: Recorder, deadline: float, poll_interval: float):
+    headers = await register_and_login(client, recorder, coach=True)
+    while time.perf_counter() < deadline:
+        page = await recorder.request(
+            client, "pending page", "GET", "/coach/pending-requests", params={"limit": 20}, headers=headers
+        )
+        items = page.json()["items"] if page is not None else []
+        if not items:
+            await asyncio.sleep(poll_interval)
+            continue
+        for item in items:
+            if time.perf_counter() >= deadline:
+                break
+            detail = await recorder.request(client, "request detail", "GET", f"/coach/requests/{item['_id']}", headers=headers)
+            if detail is None:
+                continue
+            plan = detail.json()
+            # Several coaches may pick the same request; the loser gets a 409.
+            await recorder.request(client, "approve", "PUT", f"/coach/requests/{item['_id']}/approve", headers=headers, json={
+                "user_summary": plan["user_summary"],
+                "body_analysis": plan["body_analysis"],
+                "workout_plan": plan["workout_plan"],
+                "nutrition_guidelines": plan["nutrition_guidelines"],
+                "coach_notes": "Approved by the benchmark suite.",
+                "version": plan.get("version", 0),
+            })
+
+
+class Service:
+    """A service started with uvicorn in its own process."""
+
+    def __init__(self, name: str, app: str, cwd: Path, port: int, env: Dict[str, str]):
+        self.name = name
+        self.url = f"http://127.0.0.1:{port}"
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", app, "--port", str(port), "--log-level", "warning"],
+            cwd=cwd, env=env,
+        )
+        self._handle = psutil.Process(self.process.pid) if psutil is not None else None
+        self.peak_rss_bytes = 0
+        self.cpu_seconds = 0.0
+
+    async def wait_until_ready(self, timeout: float = 120.0):
+        deadline = time.perf_counter() + timeout
+        async with httpx.AsyncClient(base_url=self.url, timeout=2.0) as client:
+            while time.perf_counter() < deadline:
+                if self.process.poll() is not None:
+                    raise RuntimeError(f"{self.name} exited with code {self.process.returncode}.")
+                try:
+                    if (await client.get("/")).status_code == 200:
+                        return
+                except httpx.HTTPError:
+                    pass
+                await asyncio.sleep(0.5)
+        raise RuntimeError(f"{self.name} did not start within {timeout:.0f}s.")
+
+    def sample(self):
+        if self._handle is None or self.process.poll() is not None:
+            return
+        try:
+            self.peak_rss_bytes = max(self.peak_rss_bytes, self._handle.memory_info().rss)
+            times = self._handle.cpu_times()
+            self.cpu_seconds = times.user + times.system
+        except psutil.Error:
+            pass
+
+    def stop(self):
+        self.sample()
+        before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        if self._handle is None:
+            # Without psutil, the usage of a child is only known once it has exited.
+            after = resource.getrusage(resource.RUSAGE_CHILDREN)
+            self.cpu_seconds = (after.ru_utime + after.ru_stime) - (before.ru_utime + before.ru_stime)
+            self.peak_rss_bytes = after.ru_maxrss * 1024
+
+
+def service_env(args, database: str, ai_service_url: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": args.mongo_url,
+        "DATABASE_NAME": database,
+        "AI_SERVICE_URL": ai_service_url,
+        "LLM_CASSETTE_MODE": args.llm_mode,
+        "LLM_REPLAY_LATENCY_SECONDS": str(args.llm_latency),
+        "MOCK_AI_LATENCY_SECONDS": str(args.mock_ai_latency),
+    })
+    if args.cassette_dir:
+        env["LLM_CASSETTE_DIR"] = args.cassette_dir
+    for name, default in (("SECRET_KEY", "benchmark-secret"), ("ALGORITHM", "HS256"), ("ACCESS_TOKEN_EXPIRE_MINUTES", "60")):
+        env.setdefault(name, default)
+    if args.llm_mode == "replay":
+        # Replayed calls never reach the API, but the clients insist on a key.
+        env.setdefault("OPENAI_API_KEY", "offline-benchmark")
+    return env
+
+
+def cassette_stats(exposition: str) -> Optional[dict]:
+    """The backend's LLM cassette gauges from its /metrics exposition, if it uses cassettes."""
+    prefix = "fitsync_llm_cassettes_"
+    stats = {
+        family.name[len(prefix):]: int(family.samples[0].value)
+        for family in text_string_to_metric_families(exposition)
+        if family.name.startswith(prefix) and family.samples
+    }
+    return stats or None
+
+
+def report(recorder: Recorder, elapsed: float, services: List[Service], cassettes: Optional[dict]):
+    print(f"\n{'step':<18}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for label in sorted(set(recorder.latencies) | set(recorder.errors)):
+        samples = [s * 1000 for s in recorder.latencies[label]]
+        print(
+            f"{label:<18}{len(samples):>10}{recorder.errors[label]:>8}{len(samples) / elapsed:>10.1f}"
+            f"{percentile(samples, 50):>10.1f}{percentile(samples, 95):>10.1f}{percentile(samples, 99):>10.1f}"
+        )
+
+    if services:
+        print(f"\n{'service':<18}{'cpu s':>10}{'cpu %':>10}{'peak rss MiB':>14}")
+        for service in services:
+            print(
+                f"{service.name:<18}{service.cpu_seconds:>10.1f}{service.cpu_seconds / elapsed * 100:>10.1f}"
+                f"{service.peak_rss_bytes / 2**20:>14.1f}"
+            )
+        if psutil is None:
+            print("(Install psutil for per-process peak memory; without it peak RSS is the largest of all services so far.)")
+    if cassettes:
+        print(f"\nBackend LLM cassettes: {cassettes}")
+
+
+async def run(args):
+    services: List[Service] = []
+    database = args.database or f"fitsync_suite_{uuid.uuid4().hex[:8]}"
+    mongo = MongoClient(args.mongo_url)
+    try:
+        base_url = args.base_url
+        if base_url is None:
+            ai_port, backend_port = args.port + 1, args.port
+            env = service_env(args, database, f"http://127.0.0.1:{ai_port}")
+            if args.ai_service == "crew":
+                ai_service = Service("ai_service (crew)", "app.main:app", CREW_SERVICE_DIR, ai_port, env)
+            else:
+                ai_service = Service("ai_service (mock)", "benchmarks.mock_ai_service:app", BACKEND_DIR, ai_port, env)
+            services.append(ai_service)
+            backend = Service("backend", "app.main:app", BACKEND_DIR, backend_port, env)
+            services.append(backend)
+            for service in services:
+                await service.wait_until_ready()
+            base_url = backend.url
+
+        recorder = Recorder()
+        limits = httpx.Limits(max_connections=args.users + args.coaches)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=300.0) as client:
+            # /diagnostics needs a coach; this login is kept out of the results.
+            started = time.perf_counter()
+            deadline = started + args.duration
+
+            async def sample_resources():
+                while True:
+                    for service in services:
+                        service.sample()
+                    await asyncio.sleep(1.0)
+
+            sampler = asyncio.create_task(sample_resources())
+            try:
+                await asyncio.gather(
+                    *(user_flow(client, recorder, deadline, args.chat_turns, args.poll_interval) for _ in range(args.users)),
+                    *(coach_flow(client, recorder, deadline, args.poll_interval) for _ in range(args.coaches)),
+                )
+            finally:
+                sampler.cancel()
+            elapsed = time.perf_counter() - started
+
+            cassettes = None
+            try:
+                cassettes = cassette_stats((await client.get("/metrics")).text)
+            except (httpx.HTTPError, ValueError):
+                pass
+
+        for service in reversed(services):
+            service.stop()
+        print(
+            f"{args.users} users and {args.coaches} coaches for {elapsed:.1f}s "
+            f"(AI service: {args.ai_service}, LLM calls: {args.llm_mode})"
+        )
+        report(recorder, elapsed, services, cassettes)
+    finally:
+        for service in services:
+            if service.process.poll() is None:
+                service.stop()
+        if not args.keep and args.base_url is None:
+            mongo.drop_database(database)
+        mongo.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the FitSync user and coach flows end to end.")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent users.")
+    parser.add_argument("--coaches", type=int, default=2, help="Concurrent coaches approving plans.")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds to run for.")
+    parser.add_argument("--chat-turns", type=int, default=3, help="FitBot questions per plan request.")
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--ai-service", choices=["mock", "crew"], default="mock")
+    parser.add_argument("--mock-ai-latency", type=float, default=0.0, help="Latency of the mock AI service.")
+    parser.add_argument("--llm-mode", choices=["replay", "record", "off"], default="replay")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Synthetic latency of replayed LLM calls.")
+    parser.add_argument("--cassette-dir", help="Cassette directory shared by both services.")
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017/")
+    parser.add_argument("--database", help="Database to use; a scratch database by default.")
+    parser.add_argument("--port", type=int, default=18000, help="Backend port; the AI service uses the next one.")
+    parser.add_argument("--base-url", help="Benchmark an already running backend instead of starting one.")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch database afterwards.")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Shared fixtures of the backend tests. Run from the backend/ directory:
+
+    python -m pytest tests
+"""
+import os
+
+import bson
+import mongomock.collection
+import pytest
+from bson.binary import UuidRepresentation
+from bson.codec_options import CodecOptions
+from mongomock_motor import AsyncMongoMockClient
+
+# Settings are read when app.core.config is imported; tests never reach
+# these services.
+for name, value in {
+    "DATABASE_URL": "mongodb://localhost:27017/",
+    "DATABASE_NAME": "fitsync_test",
+    "SECRET_KEY": "test-secret-key",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+    "AI_SERVICE_URL": "http://ai-service.test",
+    "OPENAI_API_KEY": "sk-test",
+}.items():
+    os.environ.setdefault(name, value)
+
+_CODEC_OPTIONS = CodecOptions(uuid_representation=UuidRepresentation.STANDARD)
+
+
+class _StandardUuidBSON:
+    """mongomock checks documents with the default codec, which rejects UUIDs; the app stores them as standard UUIDs."""
+
+    @staticmethod
+    def encode(document, check_keys=False):
+        return bson.encode(document, check_keys, _CODEC_OPTIONS)
+
+
+mongomock.collection.BSON = _StandardUuidBSON
+
+
+def _without_sort(add):
+    """pymongo 4.11+ passes sort=None to bulk updates, which mongomock does not accept yet."""
+    def wrapper(self, *args, sort=None, **kwargs):
+        assert sort is None, "mongomock cannot sort bulk updates"
+        return add(self, *args, **kwargs)
+    return wrapper
+
+
+for _name in ("add_update", "add_replace"):
+    setattr(
+        mongomock.collection.BulkOperationBuilder, _name,
+        _without_sort(getattr(mongomock.collection.BulkOperationBuilder, _name)),
+    )
+
+
+@pytest.fixture
+def db():
+    """An empty in-memory database, like app.database with uuidRepresentation='standard'."""
+    return AsyncMongoMockClient(uuidRepresentation="standard")["fitsync_test"]
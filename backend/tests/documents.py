@@ -0,0 +1,59 @@
+"""Documents as the backend stores them, for seeding the test database."""
+from datetime import datetime
+from typing import Optional
+from uuid import UUID, uuid4
+
+from app.models.workout import (
+    WorkoutPlan, NutritionAdvice, WorkoutRequestUpdate, STATUS_PENDING_REVIEW
+)
+
+REQUEST_PAYLOAD = {
+    "age": 30, "gender": "male", "weight": 80.0, "height": 178.0, "neck": 38.0, "waist": 86.0, "hip": None,
+    "fitness_goal": "muscle gain", "days_per_week": 3, "injuries": "none",
+}
+
+
+def workout_plan(note: str = "Add weight each week.") -> WorkoutPlan:
+    return WorkoutPlan(
+        weekly_schedule=[{"day": 1, "activity": "Full body"}],
+        workouts={"Full body": {
+            "warm_up": "5 min row",
+            "exercises": [{"name": "Squat", "sets": 3, "reps": "8", "rest_seconds": 90}],
+            "cool_down": "Stretch",
+        }},
+        progressive_overload_notes=note,
+    )
+
+def nutrition_advice() -> NutritionAdvice:
+    return NutritionAdvice(
+        general_principles="Whole foods.", macronutrient_focus="Protein.",
+        hydration="3 l a day.", meal_timing_suggestion="Eat after training.",
+    )
+
+def plan_update(version: Optional[int], note: str = "Edited by the coach.") -> WorkoutRequestUpdate:
+    return WorkoutRequestUpdate(
+        user_summary={"fitness_goal": "muscle gain", "days_per_week": 3},
+        body_analysis={"bmi": 25.2, "body_fat_percentage": 17.2, "body_type": "Mesomorph"},
+        workout_plan=workout_plan(note),
+        nutrition_guidelines=nutrition_advice(),
+        coach_notes="Looks good.",
+        version=version,
+    )
+
+def workout_request(
+    status: str = STATUS_PENDING_REVIEW, version: int = 0, created_at: Optional[datetime] = None,
+    request_id: Optional[UUID] = None, **fields
+) -> dict:
+    return {
+        "_id": request_id or uuid4(),
+        "user_id": uuid4(),
+        "created_at": created_at or datetime(2024, 5, 1),
+        "status": status,
+        "coach_notes": "",
+        "user_summary": {"fitness_goal": "muscle gain", "days_per_week": 3},
+        "body_analysis": {"bmi": 25.2, "body_fat_percentage": 17.2, "body_type": "Mesomorph"},
+        "request_payload": REQUEST_PAYLOAD,
+        "attempts": 1,
+        "version": version,
+        **fields,
+    }
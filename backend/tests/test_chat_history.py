@@ -0,0 +1,71 @@
+import asyncio
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from app.models.chat import ChatSessionCreate
+from app.routes import chat
+from app.services import chat_history
+
+
+def _app_request(db):
+    return SimpleNamespace(app=SimpleNamespace(database=db))
+
+def _user():
+    return SimpleNamespace(id=uuid4())
+
+async def _messages(db, session):
+    return await db.chat_messages.find({"session_id": session["_id"]}).sort("seq", 1).to_list(None)
+
+
+def test_failed_turn_leaves_no_user_message(db, monkeypatch):
+    async def scenario():
+        user = _user()
+        session = await chat_history.create_session(db, user.id, ChatSessionCreate())
+
+        async def unavailable(messages):
+            raise HTTPException(status_code=503, detail="The chatbot service is currently unavailable.")
+        monkeypatch.setattr(chat, "_complete", unavailable)
+        with pytest.raises(HTTPException):
+            await chat.send_chat_session_message(session["_id"], chat.ChatMessage(message="Hi"), _app_request(db), user)
+        assert await _messages(db, session) == []
+
+        prompts = []
+
+        async def answer(messages):
+            prompts.append(messages)
+            return "Hello!"
+        monkeypatch.setattr(chat, "_complete", answer)
+        await chat.send_chat_session_message(session["_id"], chat.ChatMessage(message="Hi again"), _app_request(db), user)
+
+        assert [m["content"] for m in prompts[0][1:]] == ["Hi again"]
+        stored = await _messages(db, session)
+        assert [(m["role"], m["content"]) for m in stored] == [("user", "Hi again"), ("assistant", "Hello!")]
+    asyncio.run(scenario())
+
+def test_prompt_ends_with_the_new_message_after_the_history(db):
+    async def scenario():
+        session = await chat_history.create_session(db, uuid4(), ChatSessionCreate())
+        await chat_history.append_turn(db, session, "How many sets?", "Three.")
+        prompt = await chat_history.build_prompt(db, session, "system", "And reps?")
+        assert [(m["role"], m["content"]) for m in prompt] == [
+            ("system", "system"), ("user", "How many sets?"), ("assistant", "Three."), ("user", "And reps?"),
+        ]
+    asyncio.run(scenario())
+
+def test_reply_storage_failure_removes_the_user_message(db, monkeypatch):
+    async def scenario():
+        session = await chat_history.create_session(db, uuid4(), ChatSessionCreate())
+        append_message = chat_history.append_message
+
+        async def failing_for_replies(db, session, role, content):
+            if role == "assistant":
+                raise RuntimeError("write failed")
+            return await append_message(db, session, role, content)
+        monkeypatch.setattr(chat_history, "append_message", failing_for_replies)
+        with pytest.raises(RuntimeError):
+            await chat_history.append_turn(db, session, "Hi", "Hello!")
+        assert await _messages(db, session) == []
+    asyncio.run(scenario())
@@ -0,0 +1,133 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from app.models.workout import (
+    BulkApprovalRequest, STATUS_APPROVED, STATUS_GENERATING, STATUS_PENDING_REVIEW,
+)
+from app.routes import coach
+from tests.documents import plan_update, workout_plan, nutrition_advice, workout_request
+
+COACH = SimpleNamespace(id=uuid4(), role="coach")
+
+
+def _app_request(db):
+    return SimpleNamespace(app=SimpleNamespace(database=db, plan_templates=None))
+
+def _bulk_approve(db, items):
+    response = asyncio.run(coach.bulk_approve_workout_requests(
+        BulkApprovalRequest(items=items), _app_request(db), COACH
+    ))
+    body = json.loads(response.body)
+    return body["approved"], {result["request_id"]: result for result in body["results"]}
+
+def _seed(db, *documents):
+    asyncio.run(db.workout_requests.insert_many(list(documents)))
+
+def _stored(db, request_id):
+    return asyncio.run(db.workout_requests.find_one({"_id": request_id}))
+
+
+def test_bulk_approval_reports_each_outcome(db):
+    fresh = workout_request(version=2)
+    stale = workout_request(version=3)
+    generating = workout_request(status=STATUS_GENERATING)
+    unversioned = workout_request()
+    del unversioned["version"]
+    _seed(db, fresh, stale, generating, unversioned)
+    missing_id = uuid4()
+
+    approved, results = _bulk_approve(db, [
+        {"request_id": fresh["_id"], "version": 2},
+        {"request_id": stale["_id"], "version": 2},
+        {"request_id": generating["_id"], "version": 0},
+        {"request_id": unversioned["_id"], "version": 0},
+        {"request_id": missing_id, "version": 0},
+    ])
+
+    assert approved == 2
+    assert results[str(fresh["_id"])]["result"] == "approved"
+    assert results[str(fresh["_id"])]["version"] == 3
+    assert results[str(stale["_id"])]["result"] == "conflict"
+    assert results[str(stale["_id"])]["version"] == 3
+    assert results[str(generating["_id"])]["result"] == "not_reviewable"
+    assert results[str(unversioned["_id"])]["result"] == "approved"
+    assert results[str(missing_id)]["result"] == "not_found"
+
+    assert _stored(db, fresh["_id"])["status"] == STATUS_APPROVED
+    assert _stored(db, stale["_id"]) == {**stale, "_id": stale["_id"]}
+    assert _stored(db, generating["_id"])["status"] == STATUS_GENERATING
+
+def test_second_approval_of_the_same_version_conflicts(db):
+    request = workout_request(version=1)
+    _seed(db, request)
+
+    first, _ = _bulk_approve(db, [{"request_id": request["_id"], "version": 1}])
+    second, results = _bulk_approve(db, [{"request_id": request["_id"], "version": 1}])
+
+    assert (first, second) == (1, 0)
+    assert results[str(request["_id"])]["result"] == "conflict"
+    assert _stored(db, request["_id"])["version"] == 2
+
+def test_bulk_edits_are_stored_only_for_items_that_won(db):
+    won = workout_request(version=0, workout_plan=workout_plan("Embedded.").model_dump())
+    lost = workout_request(version=5)
+    _seed(db, won, lost)
+
+    _bulk_approve(db, [
+        {"request_id": won["_id"], "version": 0, "update": plan_update(None, "Won.").model_dump()},
+        {"request_id": lost["_id"], "version": 4, "update": plan_update(None, "Lost.").model_dump()},
+    ])
+
+    detail = asyncio.run(db.workout_plans.find_one({"_id": won["_id"]}))
+    assert detail["workout_plan"]["progressive_overload_notes"] == "Won."
+    assert "workout_plan" not in _stored(db, won["_id"])
+    assert asyncio.run(db.workout_plans.find_one({"_id": lost["_id"]})) is None
+
+def test_duplicate_items_are_rejected(db):
+    request = workout_request()
+    _seed(db, request)
+    with pytest.raises(HTTPException) as error:
+        _bulk_approve(db, [{"request_id": request["_id"], "version": 0}] * 2)
+    assert error.value.status_code == 400
+
+
+def _approve(db, request_id, version):
+    return asyncio.run(coach.approve_workout_request(request_id, plan_update(version), _app_request(db), COACH))
+
+def test_single_approval_checks_the_version(db):
+    request = workout_request(version=4)
+    _seed(db, request)
+
+    with pytest.raises(HTTPException) as error:
+        _approve(db, request["_id"], 3)
+    assert error.value.status_code == 409
+    assert asyncio.run(db.workout_plans.find_one({"_id": request["_id"]})) is None
+
+    body = json.loads(_approve(db, request["_id"], 4).body)
+    assert (body["status"], body["version"]) == (STATUS_APPROVED, 5)
+    detail = asyncio.run(db.workout_plans.find_one({"_id": request["_id"]}))
+    assert detail["nutrition_guidelines"] == nutrition_advice().model_dump()
+
+def test_single_approval_needs_a_generated_plan(db):
+    request = workout_request(status=STATUS_GENERATING)
+    _seed(db, request)
+    with pytest.raises(HTTPException) as error:
+        _approve(db, request["_id"], None)
+    assert error.value.status_code == 409
+    assert "has no plan to approve" in error.value.detail
+
+    with pytest.raises(HTTPException) as error:
+        _approve(db, uuid4(), None)
+    assert error.value.status_code == 404
+
+def test_approved_plans_can_be_edited_again(db):
+    request = workout_request(status=STATUS_PENDING_REVIEW, version=0)
+    _seed(db, request)
+    _approve(db, request["_id"], 0)
+    body = json.loads(_approve(db, request["_id"], 1).body)
+    assert body["version"] == 2
@@ -0,0 +1,72 @@
+import asyncio
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.pagination import fetch_page, encode_cursor
+
+
+def _seed(db, created_ats):
+    documents = [{"_id": uuid4(), "created_at": created_at, "owner": "a"} for created_at in created_ats]
+    asyncio.run(db.items.insert_many(documents))
+    return documents
+
+def _all_pages(db, limit, newest_first):
+    pages, cursor = [], None
+    while True:
+        page = asyncio.run(fetch_page(db.items, {"owner": "a"}, None, limit, cursor, newest_first))
+        pages.append([doc["_id"] for doc in page["items"]])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+def _expected_order(documents, newest_first):
+    key = lambda doc: (doc["created_at"], doc["_id"])
+    return [doc["_id"] for doc in sorted(documents, key=key, reverse=newest_first)]
+
+
+@pytest.mark.parametrize("newest_first", [True, False])
+@pytest.mark.parametrize("limit", [1, 3, 4, 12, 13])
+def test_pages_cover_every_document_once_in_order(db, limit, newest_first):
+    base = datetime(2024, 5, 1)
+    # Four documents share each timestamp, so page boundaries fall inside ties.
+    documents = _seed(db, [base + timedelta(seconds=n // 4) for n in range(12)])
+
+    pages = _all_pages(db, limit, newest_first)
+
+    assert [doc_id for page in pages for doc_id in page] == _expected_order(documents, newest_first)
+    assert all(len(page) == limit for page in pages[:-1])
+    assert 0 < len(pages[-1]) <= limit
+
+def test_a_full_last_page_has_no_next_cursor(db):
+    _seed(db, [datetime(2024, 5, 1) + timedelta(seconds=n) for n in range(5)])
+    page = asyncio.run(fetch_page(db.items, {"owner": "a"}, None, limit=5))
+    assert len(page["items"]) == 5
+    assert page["next_cursor"] is None
+
+def test_documents_added_before_the_cursor_do_not_shift_later_pages(db):
+    base = datetime(2024, 5, 1)
+    documents = _seed(db, [base + timedelta(seconds=n) for n in range(6)])
+    first = asyncio.run(fetch_page(db.items, {"owner": "a"}, None, limit=3))
+    # Newer documents land on the first page; the cursor keeps its place.
+    _seed(db, [base + timedelta(seconds=60)])
+    second = asyncio.run(fetch_page(db.items, {"owner": "a"}, None, limit=3, cursor=first["next_cursor"]))
+    assert [doc["_id"] for doc in second["items"]] == _expected_order(documents, True)[3:]
+
+def test_cursor_of_a_deleted_document_still_resumes_after_it(db):
+    base = datetime(2024, 5, 1)
+    documents = _seed(db, [base + timedelta(seconds=n) for n in range(4)])
+    newest_first = _expected_order(documents, True)
+    boundary = next(doc for doc in documents if doc["_id"] == newest_first[1])
+    asyncio.run(db.items.delete_one({"_id": boundary["_id"]}))
+    cursor = encode_cursor(boundary["created_at"], boundary["_id"])
+    page = asyncio.run(fetch_page(db.items, {"owner": "a"}, None, limit=10, cursor=cursor))
+    assert [doc["_id"] for doc in page["items"]] == newest_first[2:]
+
+@pytest.mark.parametrize("cursor", ["not base64!", "bm8tc2VwYXJhdG9y", encode_cursor(datetime(2024, 5, 1), uuid4())[:-4]])
+def test_invalid_cursor_is_rejected(db, cursor):
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(fetch_page(db.items, {"owner": "a"}, None, limit=3, cursor=cursor))
+    assert error.value.status_code == 400
@@ -0,0 +1,144 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.models.workout import STATUS_QUEUED, STATUS_GENERATING, STATUS_FAILED, STATUS_PENDING_REVIEW
+from app.services import ai_service_client
+from app.services.plan_queue import PlanJobQueue
+from tests.documents import workout_request, workout_plan, nutrition_advice
+
+GENERATED_PLAN = {
+    "status": STATUS_PENDING_REVIEW,
+    "coach_notes": "",
+    "user_summary": {"fitness_goal": "muscle gain", "days_per_week": 3},
+    "body_analysis": {"bmi": 25.2, "body_fat_percentage": 17.2, "body_type": "Mesomorph"},
+    "workout_plan": workout_plan().model_dump(),
+    "nutrition_guidelines": nutrition_advice().model_dump(),
+}
+
+
+def _plan_stream(request: httpx.Request) -> httpx.Response:
+    body = (
+        f"event: metrics_analyzed\ndata: {json.dumps({'bmi': 25.2})}\n\n"
+        f"event: validated\ndata: {json.dumps({'plan': GENERATED_PLAN})}\n\n"
+    )
+    return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=body.encode())
+
+@pytest.fixture
+def ai_service(monkeypatch):
+    """Answers plan requests with the handler in `responses[0]` (a stream of GENERATED_PLAN by default)."""
+    responses = [_plan_stream]
+    client = httpx.AsyncClient(
+        base_url="http://ai-service.test", transport=httpx.MockTransport(lambda request: responses[0](request))
+    )
+    monkeypatch.setattr(ai_service_client, "_client", client)
+    return responses
+
+def _queued_job(db, **fields):
+    job = workout_request(status=STATUS_QUEUED, attempts=0, progress=[], **fields)
+    # Filled in by the generated plan.
+    del job["body_analysis"]
+    asyncio.run(db.workout_requests.insert_one(job))
+    return job
+
+def _stored(db, job):
+    return asyncio.run(db.workout_requests.find_one({"_id": job["_id"]}))
+
+def _expire_lease(db, job):
+    asyncio.run(db.workout_requests.update_one(
+        {"_id": job["_id"]}, {"$set": {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)}}
+    ))
+
+
+def test_claim_takes_a_lease_and_counts_the_attempt(db):
+    job = _queued_job(db)
+    claimed = asyncio.run(PlanJobQueue(db)._claim_next_job())
+    assert claimed["_id"] == job["_id"]
+    assert (claimed["status"], claimed["attempts"]) == (STATUS_GENERATING, 1)
+    assert claimed["lease_owner"] is not None
+    assert claimed["lease_expires_at"] > datetime.utcnow()
+
+def test_a_held_lease_is_not_taken_over(db):
+    _queued_job(db)
+    assert asyncio.run(PlanJobQueue(db)._claim_next_job()) is not None
+    assert asyncio.run(PlanJobQueue(db)._claim_next_job()) is None
+
+def test_expired_lease_is_taken_over_and_the_old_worker_writes_nothing(db, ai_service):
+    _queued_job(db)
+    old_worker, new_worker = PlanJobQueue(db), PlanJobQueue(db)
+    old_claim = asyncio.run(old_worker._claim_next_job())
+    _expire_lease(db, old_claim)
+
+    new_claim = asyncio.run(new_worker._claim_next_job())
+    assert new_claim["_id"] == old_claim["_id"]
+    assert new_claim["attempts"] == 2
+    assert new_claim["lease_owner"] != old_claim["lease_owner"]
+
+    before = _stored(db, new_claim)
+    assert asyncio.run(old_worker._renew_lease(old_claim)) is False
+    asyncio.run(old_worker._record_failure(old_claim, "late failure"))
+    asyncio.run(old_worker._record_success(old_claim, {"status": STATUS_PENDING_REVIEW}))
+    # The old worker finishing its generation stores neither the plan nor progress.
+    assert asyncio.run(old_worker._generate(old_claim)) == "lease_lost"
+    assert _stored(db, new_claim) == before
+    assert asyncio.run(db.workout_plans.find_one({"_id": old_claim["_id"]})) is None
+
+def test_abandoned_last_attempt_is_failed_instead_of_reclaimed(db):
+    job = _queued_job(db)
+    queue = PlanJobQueue(db)
+    for _ in range(settings.PLAN_JOB_MAX_ATTEMPTS):
+        claimed = asyncio.run(queue._claim_next_job())
+        assert claimed["_id"] == job["_id"]
+        _expire_lease(db, job)
+
+    assert asyncio.run(queue._claim_next_job()) is None
+    asyncio.run(queue._fail_abandoned_jobs())
+    stored = _stored(db, job)
+    assert stored["status"] == STATUS_FAILED
+    assert stored["attempts"] == settings.PLAN_JOB_MAX_ATTEMPTS
+
+def test_generated_plan_is_stored_for_review(db, ai_service):
+    job = _queued_job(db)
+    queue = PlanJobQueue(db)
+    asyncio.run(queue._process(asyncio.run(queue._claim_next_job())))
+
+    stored = _stored(db, job)
+    assert stored["status"] == STATUS_PENDING_REVIEW
+    assert stored["lease_expires_at"] is None
+    assert stored["version"] == 1
+    assert [entry["event"] for entry in stored["progress"]] == ["metrics_analyzed", "validated"]
+    detail = asyncio.run(db.workout_plans.find_one({"_id": job["_id"]}))
+    assert detail["workout_plan"] == GENERATED_PLAN["workout_plan"]
+
+def test_failed_attempts_are_retried_until_they_run_out(db, ai_service):
+    ai_service[0] = lambda request: httpx.Response(500, json={"detail": "crew failed"})
+    job = _queued_job(db)
+    queue = PlanJobQueue(db)
+
+    asyncio.run(queue._process(asyncio.run(queue._claim_next_job())))
+    assert (_stored(db, job)["status"], _stored(db, job)["attempts"]) == (STATUS_QUEUED, 1)
+
+    for _ in range(settings.PLAN_JOB_MAX_ATTEMPTS - 1):
+        asyncio.run(queue._process(asyncio.run(queue._claim_next_job())))
+    assert _stored(db, job)["status"] == STATUS_FAILED
+
+def test_busy_ai_service_defers_the_job_without_using_an_attempt(db, ai_service):
+    ai_service[0] = lambda request: httpx.Response(503, headers={"Retry-After": "30"}, json={"detail": "busy"})
+    job = _queued_job(db)
+    queue = PlanJobQueue(db)
+
+    asyncio.run(queue._process(asyncio.run(queue._claim_next_job())))
+
+    stored = _stored(db, job)
+    assert (stored["status"], stored["attempts"], stored["deferrals"]) == (STATUS_QUEUED, 0, 1)
+    assert stored["not_before"] > datetime.utcnow() + timedelta(seconds=25)
+    assert asyncio.run(queue._claim_next_job()) is None
+
+    asyncio.run(db.workout_requests.update_one(
+        {"_id": job["_id"]}, {"$set": {"not_before": datetime.utcnow() - timedelta(seconds=1)}}
+    ))
+    assert asyncio.run(queue._claim_next_job())["_id"] == job["_id"]
@@ -0,0 +1,63 @@
+import asyncio
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from fastapi.responses import StreamingResponse
+
+from app.core.responses import STREAM_MIN_ITEMS, STREAM_CHUNK_ITEMS, document_response, page_response
+from app.models.chat import ChatMessagePage
+from app.models.workout import WorkoutRequestPage
+
+
+def _body(response) -> bytes:
+    if not isinstance(response, StreamingResponse):
+        return response.body
+
+    async def read():
+        return b"".join([chunk async for chunk in response.body_iterator])
+    return asyncio.run(read())
+
+def _workout_requests(count: int) -> list:
+    created_at = datetime(2024, 5, 1, 12, 0, 0)
+    return [{
+        "_id": uuid4(),
+        "user_id": uuid4(),
+        "created_at": created_at - timedelta(minutes=n),
+        "status": "pending_review",
+        "coach_notes": "",
+        "user_summary": {"fitness_goal": "muscle gain", "days_per_week": 4},
+        "body_analysis": {"bmi": 24.1, "body_fat_percentage": 18.2, "body_type": "Mesomorph"},
+        "version": n,
+        # Not part of the summary; must be dropped from both bodies.
+        "request_payload": {"age": 30},
+    } for n in range(count)]
+
+def _chat_messages(count: int) -> list:
+    session_id, user_id = uuid4(), uuid4()
+    return [{
+        "_id": uuid4(), "session_id": session_id, "user_id": user_id, "seq": n,
+        "role": "user" if n % 2 == 0 else "assistant", "content": f"message {n}", "tokens": 3,
+        "created_at": datetime(2024, 5, 1, 12, 0, n % 60),
+    } for n in range(count)]
+
+
+def test_small_pages_are_buffered():
+    response = page_response(WorkoutRequestPage, {"items": _workout_requests(STREAM_MIN_ITEMS), "next_cursor": None})
+    assert not isinstance(response, StreamingResponse)
+
+@pytest.mark.parametrize("count", [
+    STREAM_MIN_ITEMS + 1, STREAM_MIN_ITEMS + STREAM_CHUNK_ITEMS, STREAM_MIN_ITEMS + STREAM_CHUNK_ITEMS + 1, 100,
+])
+@pytest.mark.parametrize("next_cursor", [None, "opaque-cursor"])
+def test_streamed_workout_page_matches_buffered(count, next_cursor):
+    page = {"items": _workout_requests(count), "next_cursor": next_cursor}
+    streamed = page_response(WorkoutRequestPage, page)
+    assert isinstance(streamed, StreamingResponse)
+    assert _body(streamed) == _body(document_response(WorkoutRequestPage, page))
+
+def test_streamed_chat_page_matches_buffered():
+    page = {"items": _chat_messages(100), "next_before_seq": 7}
+    streamed = page_response(ChatMessagePage, page)
+    assert isinstance(streamed, StreamingResponse)
+    assert _body(streamed) == _body(document_response(ChatMessagePage, page))
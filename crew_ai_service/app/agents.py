@@ -1,32 +1,121 @@
-from crewai import Agent
-from langchain_openai import ChatOpenAI
+import httpx
+import litellm
+from crewai import Agent, LLM
+import json
+import logging
 import os
+import queue
+import time
+from contextlib import contextmanager
 from dotenv import load_dotenv
-from crewai_tools import CSVSearchTool
+from fitsync_common.llm_cassette import create_transports
 from pathlib import Path
-from .tools.validation_tool import validate_final_plan_json
+from . import config
+from . import metrics
+from . import tracing
+from .tools.reference_index import find_similar_profiles
 
-APP_DIR = Path(__file__).parent
-CSV_PATH = APP_DIR / "tools" / "body_assessment.csv"
+REFERENCE_DATA_PATH = Path(config.REFERENCE_DATA_PATH)
 
-if not CSV_PATH.is_file():
+if not REFERENCE_DATA_PATH.is_file():
     raise FileNotFoundError(
-        f"The body_assessment.csv file was not found at the expected path: {CSV_PATH}"
+        f"The reference body assessment data was not found at the expected path: {REFERENCE_DATA_PATH}"
     )
 
-# Tool to access the knowledge base
-knowledge_base_tool = CSVSearchTool(csv=str(CSV_PATH))
-
 load_dotenv()
 openai_api_key = os.getenv('OPENAI_API_KEY')
 
 if not openai_api_key:
     raise ValueError("No OpenAI API key found. Please set OPENAI_API_KEY in your .env file.")
 
-llm = ChatOpenAI(
+def _record_llm_call(request: httpx.Request, response: httpx.Response, seconds: float, llm_span):
+    """Records the latency and token usage of one chat completion from its HTTP exchange."""
+    try:
+        body = response.json()
+    except ValueError:
+        body = {}
+    if not isinstance(body, dict):
+        body = {}
+    model = body.get("model")
+    if model is None:
+        try:
+            model = json.loads(request.content or b"{}").get("model")
+        except (ValueError, AttributeError):
+            model = None
+    usage = body.get("usage") or {}
+    prompt_tokens = usage.get("prompt_tokens") or 0
+    completion_tokens = usage.get("completion_tokens") or 0
+    metrics.record_llm_call(model, seconds, prompt_tokens, completion_tokens)
+    llm_span.set_attribute("model", model)
+    llm_span.set_attribute("status", response.status_code)
+    llm_span.set_attribute("prompt_tokens", prompt_tokens)
+    llm_span.set_attribute("completion_tokens", completion_tokens)
+
+
+class LLMCallTransport(httpx.BaseTransport):
+    """
+    Records a span, the latency and the token usage of every LLM call. crewai
+    makes its calls through litellm on the thread running the agent, so each
+    call is attributed to the crew stage and agent that issued it.
+    """
+
+    def __init__(self, transport: httpx.BaseTransport):
+        self._transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        with tracing.span("llm.chat") as llm_span:
+            started = time.perf_counter()
+            response = self._transport.handle_request(request)
+            response.read()
+            _record_llm_call(request, response, time.perf_counter() - started, llm_span)
+            return response
+
+    def close(self):
+        self._transport.close()
+
+
+class AsyncLLMCallTransport(httpx.AsyncBaseTransport):
+    """The async counterpart of LLMCallTransport."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        with tracing.span("llm.chat") as llm_span:
+            started = time.perf_counter()
+            response = await self._transport.handle_async_request(request)
+            await response.aread()
+            _record_llm_call(request, response, time.perf_counter() - started, llm_span)
+            return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def _install_llm_http_clients():
+    """
+    Routes litellm's OpenAI calls, and so every crewai LLM call, through
+    LLMCallTransport. With LLM_CASSETTE_MODE set, calls are recorded to or
+    replayed from cassettes instead of reaching the API.
+    """
+    transport, async_transport = create_transports(
+        config.LLM_CASSETTE_MODE, config.LLM_CASSETTE_DIR,
+        config.LLM_REPLAY_LATENCY_SECONDS, config.LLM_REPLAY_LATENCY_SCALE,
+    )
+    if transport is None:
+        transport, async_transport = httpx.HTTPTransport(), httpx.AsyncHTTPTransport()
+    else:
+        logging.info(f"LLM calls use cassettes in {config.LLM_CASSETTE_MODE} mode ({config.LLM_CASSETTE_DIR}).")
+    litellm.client_session = httpx.Client(transport=LLMCallTransport(transport))
+    litellm.aclient_session = httpx.AsyncClient(transport=AsyncLLMCallTransport(async_transport))
+
+
+_install_llm_http_clients()
+
+llm = LLM(
+    model="gpt-4o",
+    temperature=0.7,
     api_key=openai_api_key,
-    model_name="gpt-4o",
-    temperature=0.7
 )
 
 
@@ -36,7 +125,7 @@ def create_body_metrics_analyst() -> Agent:
         goal='Analyze user body measurements to determine body type, BMI, and estimated body fat. Output this analysis as a structured JSON object.',
         backstory="""You are an expert in anthropometry and body composition analysis. Your task is to process raw user data (age, gender, measurements) and produce a clear, structured analysis. This data will be used by other agents to formulate a fitness plan. Focus on accuracy and a machine-readable output format.""",
         llm=llm,
-        tools=[knowledge_base_tool],
+        tools=[find_similar_profiles],
         verbose=True,
     )
 
@@ -57,16 +146,36 @@ def create_nutrition_advisor() -> Agent:
         llm=llm,
         verbose=True,
     )
-    
-def create_plan_synthesizer() -> Agent:
-    return Agent(
-        role='Head Coach Plan Synthesizer',
-        goal='Compile the analyses and drafts from other agents into a single, final JSON string. Then, validate this JSON string to ensure it is perfect.',
-        backstory="""You are the meticulous Head Coach responsible for final review. Your job is to take outputs from all specialist agents and combine them into one comprehensive JSON object, returned as a raw string.
-        After creating the JSON string, you MUST use the 'Final Plan JSON Validator Tool' to check your work.
-        If validation fails, you MUST correct the JSON string and validate it again.
-        Your final, final output must be ONLY the validated JSON string.""",
-        llm=llm,
-        tools=[validate_final_plan_json],
-        verbose=True,
-    )
\ No newline at end of file
+
+
+
+class AgentPool:
+    """
+    Reuses agents across requests. An agent is leased by one crew run at a time,
+    since agents keep per-run state while executing; idle agents are handed to
+    the next run instead of being rebuilt.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._idle = queue.SimpleQueue()
+
+    @contextmanager
+    def lease(self):
+        try:
+            agent = self._idle.get_nowait()
+        except queue.Empty:
+            agent = self._factory()
+        try:
+            yield agent
+        finally:
+            self._idle.put(agent)
+
+    def prewarm(self):
+        """Creates one idle agent ahead of the first request."""
+        self._idle.put(self._factory())
+
+
+metrics_analyst_pool = AgentPool(create_body_metrics_analyst)
+workout_architect_pool = AgentPool(create_workout_architect)
+nutrition_advisor_pool = AgentPool(create_nutrition_advisor)
@@ -0,0 +1,62 @@
+import os
+from pathlib import Path
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# How the crew runs the workout and nutrition drafts once the body metrics are
+# known: "sequential" runs them one after the other, "parallel" runs them
+# concurrently. Can be overridden per request on /generate-plan.
+CREW_EXECUTION_MODE = os.getenv("CREW_EXECUTION_MODE", "parallel")
+
+# Cache of generated plans keyed on the normalized request.
+# PLAN_CACHE_BACKEND is "memory" (per process) or "redis" (shared between replicas).
+PLAN_CACHE_ENABLED = os.getenv("PLAN_CACHE_ENABLED", "true").lower() == "true"
+PLAN_CACHE_BACKEND = os.getenv("PLAN_CACHE_BACKEND", "memory")
+PLAN_CACHE_TTL_SECONDS = int(os.getenv("PLAN_CACHE_TTL_SECONDS", "86400"))
+PLAN_CACHE_MAX_ENTRIES = int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "1000"))
+PLAN_CACHE_REDIS_URL = os.getenv("PLAN_CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+# Reference body assessments searched by the metrics analyst (CSV or Parquet).
+REFERENCE_DATA_PATH = os.getenv(
+    "REFERENCE_DATA_PATH", str(Path(__file__).resolve().parent / "tools" / "body_assessment.csv")
+)
+
+# Where the memory-mapped arrays of the reference index are stored, keyed on the
+# reference data's content hash. Mount this on a volume so new replicas reuse
+# the index instead of rebuilding it.
+KNOWLEDGE_BASE_DIR = os.getenv(
+    "KNOWLEDGE_BASE_DIR", str(Path(__file__).resolve().parent.parent / "db")
+)
+
+# Crew runs execute in a pool off the event loop. CREW_POOL_KIND is "thread" or
+# "process"; at most CREW_MAX_CONCURRENT_RUNS run at once and up to
+# CREW_MAX_QUEUED_RUNS more wait for a worker before requests get a 503.
+# Process workers need PROMETHEUS_MULTIPROC_DIR set for their metrics to show
+# up at /metrics (see metrics.py).
+CREW_POOL_KIND = os.getenv("CREW_POOL_KIND", "thread")
+CREW_MAX_CONCURRENT_RUNS = int(os.getenv("CREW_MAX_CONCURRENT_RUNS", "4"))
+CREW_MAX_QUEUED_RUNS = int(os.getenv("CREW_MAX_QUEUED_RUNS", "16"))
+CREW_RETRY_AFTER_SECONDS = int(os.getenv("CREW_RETRY_AFTER_SECONDS", "30"))
+
+# Record/replay of OpenAI calls for offline benchmarks (see fitsync_common/llm_cassette.py).
+# LLM_CASSETTE_MODE is "off", "record" or "replay".
+LLM_CASSETTE_MODE = os.getenv("LLM_CASSETTE_MODE", "off")
+LLM_CASSETTE_DIR = os.getenv(
+    "LLM_CASSETTE_DIR", str(Path(__file__).resolve().parent.parent / "cassettes")
+)
+LLM_REPLAY_LATENCY_SECONDS = float(os.getenv("LLM_REPLAY_LATENCY_SECONDS", "0"))
+LLM_REPLAY_LATENCY_SCALE = float(os.getenv("LLM_REPLAY_LATENCY_SCALE", "0"))
+
+# Tracing. Sampled spans are appended as JSON lines to TRACE_EXPORT_PATH,
+# which is rotated past TRACE_EXPORT_MAX_BYTES. Requests traced by the
+# backend keep the backend's sampling decision.
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+TRACE_SAMPLE_RATIO = float(os.getenv("TRACE_SAMPLE_RATIO", "0.01"))
+TRACE_EXPORT_PATH = os.getenv(
+    "TRACE_EXPORT_PATH", str(Path(__file__).resolve().parent.parent / "traces" / "spans.jsonl")
+)
+TRACE_EXPORT_MAX_BYTES = int(os.getenv("TRACE_EXPORT_MAX_BYTES", str(50 * 1024 * 1024)))
+TRACE_EXPORT_BACKUP_COUNT = int(os.getenv("TRACE_EXPORT_BACKUP_COUNT", "3"))
+# Fraction of requests whose full plan is written to the log, for debugging.
+DEBUG_PAYLOAD_SAMPLE_RATIO = float(os.getenv("DEBUG_PAYLOAD_SAMPLE_RATIO", "0"))
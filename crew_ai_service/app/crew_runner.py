@@ -0,0 +1,224 @@
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from typing import Dict, Any, List, Tuple, Callable, Optional
+
+from crewai import Crew, Process, Agent, Task
+from crewai.crews.crew_output import CrewOutput
+from pydantic import ValidationError
+
+from .agents import metrics_analyst_pool, workout_architect_pool, nutrition_advisor_pool
+from .tasks import (
+    create_metrics_analysis_task, create_workout_draft_task, create_nutrition_advice_task,
+    FinalPlan, MetricsAnalysis, WorkoutPlan, NutritionAdvice, UserSummary
+)
+from .metrics_engine import compute_metrics_analysis
+from . import metrics
+from . import tracing
+
+EXECUTION_SEQUENTIAL = "sequential"
+EXECUTION_PARALLEL = "parallel"
+EXECUTION_MODES = (EXECUTION_SEQUENTIAL, EXECUTION_PARALLEL)
+
+# Progress events emitted while a plan is generated, in the order they occur
+# (the two drafts may swap places in parallel mode).
+EVENT_METRICS_ANALYZED = "metrics_analyzed"
+EVENT_WORKOUT_DRAFTED = "workout_drafted"
+EVENT_NUTRITION_DRAFTED = "nutrition_drafted"
+EVENT_SYNTHESIZED = "synthesized"
+EVENT_VALIDATED = "validated"
+
+ProgressCallback = Callable[[str, Dict[str, Any]], None]
+
+
+def _clean_json_string(json_str: str) -> str:
+    """
+    Cleans a string that is supposed to be JSON but might be wrapped
+    in markdown code blocks or have leading/trailing text.
+    """
+    if not isinstance(json_str, str):
+        logging.warning(f"Attempted to clean a non-string type: {type(json_str)}")
+        return ""
+
+    start_index = json_str.find('{')
+    end_index = json_str.rfind('}')
+
+    if start_index != -1 and end_index != -1 and start_index < end_index:
+        return json_str[start_index : end_index + 1]
+
+    logging.error(f"Could not find a valid JSON object within the string: {json_str}")
+    return ""
+
+def _run_stage(agents: List[Agent], tasks: List[Task]) -> CrewOutput:
+    """Runs a group of tasks as their own small sequential crew."""
+    crew = Crew(agents=agents, tasks=tasks, process=Process.sequential, verbose=True)
+    roles = [agent.role for agent in agents]
+    with tracing.span("crew.kickoff", agents=roles, tasks=len(tasks)), metrics.agent_context(", ".join(roles)):
+        return crew.kickoff()
+
+def _task_output_data(task: Task) -> Optional[Dict[str, Any]]:
+    """The structured output of a finished task, falling back to its raw JSON."""
+    output = task.output
+    if output is None:
+        return None
+    if output.pydantic is not None:
+        return output.pydantic.model_dump()
+    try:
+        return json.loads(_clean_json_string(output.raw))
+    except json.JSONDecodeError:
+        return None
+
+def _run_stage_and_emit(
+    agents: List[Agent], tasks: List[Task], on_event: Optional[ProgressCallback],
+    event: str, field: str
+) -> CrewOutput:
+    result = _run_stage(agents, tasks)
+    if on_event is not None:
+        on_event(event, {field: _task_output_data(tasks[-1])})
+    return result
+
+def _task_model(task: Task, model_cls):
+    """
+    The typed output of a finished task. Tasks declare `output_pydantic`, so
+    this is normally already parsed; raw output is only parsed as a fallback.
+    """
+    output = task.output
+    if output is None:
+        raise ValueError(f"Task '{task.description[:40]}...' produced no output.")
+    if isinstance(output.pydantic, model_cls):
+        return output.pydantic
+    logging.warning(f"Task output was not parsed into {model_cls.__name__}, parsing the raw output.")
+    metrics.OUTPUT_FAILURES.labels(model_cls.__name__, "unparsed").inc()
+    try:
+        return model_cls(**json.loads(_clean_json_string(output.raw)))
+    except json.JSONDecodeError:
+        metrics.OUTPUT_FAILURES.labels(model_cls.__name__, "json_cleaning").inc()
+        raise
+    except ValidationError:
+        metrics.OUTPUT_FAILURES.labels(model_cls.__name__, "validation").inc()
+        raise
+
+def assemble_final_plan(
+    user_data: Dict[str, Any], body_analysis: MetricsAnalysis,
+    workout_plan: WorkoutPlan, nutrition_advice: NutritionAdvice
+) -> FinalPlan:
+    """Combines the outputs of the specialist tasks into the final plan."""
+    with tracing.span("plan.validate"):
+        try:
+            return FinalPlan(
+                user_summary=UserSummary(
+                    fitness_goal=user_data["fitness_goal"],
+                    days_per_week=user_data["days_per_week"],
+                ),
+                body_analysis=body_analysis,
+                workout_plan=workout_plan,
+                nutrition_guidelines=nutrition_advice,
+            )
+        except ValidationError:
+            metrics.OUTPUT_FAILURES.labels(FinalPlan.__name__, "validation").inc()
+            raise
+
+def _timed(timings: Dict[str, float], stage: str, func, *args):
+    started = time.perf_counter()
+    try:
+        with tracing.span(f"crew.stage.{stage}"):
+            return func(*args)
+    finally:
+        timings[stage] = time.perf_counter() - started
+
+def run_workout_crew(
+    user_data: Dict[str, Any], execution_mode: str, on_event: Optional[ProgressCallback] = None
+) -> Tuple[FinalPlan, Dict[str, float]]:
+    """
+    Runs the plan crew stage by stage and returns the assembled plan along
+    with the wall-clock duration of every stage in seconds. If `on_event` is
+    given it is called with each progress event and the partial output of the
+    stage that just finished; it may be called from worker threads.
+
+    The workout and nutrition drafts only depend on the metrics analysis, so in
+    parallel mode they are run concurrently. Their typed outputs are then
+    assembled into the FinalPlan locally, without another LLM call.
+    Tasks keep their `context` links across stages, since a finished task
+    carries its output with it.
+    """
+    if execution_mode not in EXECUTION_MODES:
+        raise ValueError(f"Unknown crew execution mode: {execution_mode}")
+
+    timings: Dict[str, float] = {}
+    started = time.perf_counter()
+    logging.info(f"Kicking off the AI Crew in {execution_mode} mode...")
+
+    # Agents are reused across requests but only by one crew run at a time.
+    with ExitStack() as leases:
+        workout_architect = leases.enter_context(workout_architect_pool.lease())
+        nutrition_advisor = leases.enter_context(nutrition_advisor_pool.lease())
+
+        # Measurements are usually complete enough to compute the analysis locally;
+        # the Body Metrics Analyst agent only estimates what the formulas cannot.
+        body_analysis = _timed(timings, "metrics_analysis", compute_metrics_analysis, user_data)
+        if body_analysis is not None:
+            logging.info(f"Computed body metrics locally: {body_analysis.model_dump()}")
+            analysis_task = None
+            if on_event is not None:
+                on_event(EVENT_METRICS_ANALYZED, {"body_analysis": body_analysis.model_dump()})
+        else:
+            logging.info("Measurements incomplete, delegating metrics analysis to the agent.")
+            metrics_analyst = leases.enter_context(metrics_analyst_pool.lease())
+            analysis_task = create_metrics_analysis_task(metrics_analyst, user_data)
+            _timed(
+                timings, "metrics_analysis", _run_stage_and_emit, [metrics_analyst], [analysis_task],
+                on_event, EVENT_METRICS_ANALYZED, "body_analysis"
+            )
+
+        workout_task = create_workout_draft_task(
+            workout_architect, user_data, analysis_task, body_analysis=body_analysis,
+            template_plan=user_data.get("template_plan")
+        )
+        nutrition_task = create_nutrition_advice_task(
+            nutrition_advisor, user_data, analysis_task, body_analysis=body_analysis
+        )
+
+        drafts_started = time.perf_counter()
+        if execution_mode == EXECUTION_PARALLEL:
+            with ThreadPoolExecutor(max_workers=2, thread_name_prefix="crew-draft") as executor:
+                # Each draft thread continues the current trace.
+                workout_future = executor.submit(
+                    tracing.bind_context(_timed), timings, "workout_draft", _run_stage_and_emit, [workout_architect], [workout_task],
+                    on_event, EVENT_WORKOUT_DRAFTED, "workout_plan"
+                )
+                nutrition_future = executor.submit(
+                    tracing.bind_context(_timed), timings, "nutrition_advice", _run_stage_and_emit, [nutrition_advisor], [nutrition_task],
+                    on_event, EVENT_NUTRITION_DRAFTED, "nutrition_guidelines"
+                )
+                workout_future.result()
+                nutrition_future.result()
+        else:
+            _timed(
+                timings, "workout_draft", _run_stage_and_emit, [workout_architect], [workout_task],
+                on_event, EVENT_WORKOUT_DRAFTED, "workout_plan"
+            )
+            _timed(
+                timings, "nutrition_advice", _run_stage_and_emit, [nutrition_advisor], [nutrition_task],
+                on_event, EVENT_NUTRITION_DRAFTED, "nutrition_guidelines"
+            )
+        timings["drafts"] = time.perf_counter() - drafts_started
+
+        final_plan = _timed(
+            timings, "synthesis", lambda: assemble_final_plan(
+                user_data,
+                body_analysis or _task_model(analysis_task, MetricsAnalysis),
+                _task_model(workout_task, WorkoutPlan),
+                _task_model(nutrition_task, NutritionAdvice),
+            )
+        )
+        if on_event is not None:
+            on_event(EVENT_SYNTHESIZED, {})
+
+    timings["total"] = time.perf_counter() - started
+    logging.info(
+        "AI Crew finished successfully. Stage timings (s): "
+        + ", ".join(f"{stage}={seconds:.2f}" for stage, seconds in timings.items())
+    )
+    return final_plan, timings
@@ -1,113 +1,221 @@
+import time
+_process_started = time.perf_counter()
+
+import asyncio
 import json
 import logging
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field, ValidationError
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Literal, Tuple
 
-from crewai import Crew, Process
-from crewai.crews.crew_output import CrewOutput
-
-from .agents import (
-    create_body_metrics_analyst, create_workout_architect,
-    create_nutrition_advisor, create_plan_synthesizer
-)
-from .tasks import (
-    create_metrics_analysis_task, create_workout_draft_task,
-    create_nutrition_advice_task, create_synthesis_task, FinalPlan
-)
+from . import config
+from . import metrics
+from .crew_runner import EVENT_VALIDATED
+from .plan_cache import create_plan_cache
+from .run_pool import CrewRunPool, CrewPoolSaturated, run_crew
+from . import tracing
+from . import warm_start
+from .tasks import FinalPlan
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 app = FastAPI(title="FitSync AI Crew Service", description="An API to generate personalized workout plan drafts using AI agents.", version="1.0.0")
+plan_cache = create_plan_cache()
+crew_pool = CrewRunPool(
+    config.CREW_POOL_KIND, config.CREW_MAX_CONCURRENT_RUNS, config.CREW_MAX_QUEUED_RUNS
+)
+
+@app.on_event("startup")
+def warm_up_crew():
+    warm_start.warm_up(_process_started)
+    crew_pool.start()
+
+@app.on_event("shutdown")
+def stop_crew_pool():
+    crew_pool.shutdown()
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    if request.url.path == "/metrics":
+        return await call_next(request)
+    # Continues the caller's trace when it sends a traceparent header.
+    with tracing.span(
+        f"{request.method} {request.url.path}", traceparent=request.headers.get("traceparent")
+    ) as server_span:
+        response = await call_next(request)
+        server_span.set_attribute("http.status_code", response.status_code)
+        response.headers["traceparent"] = server_span.traceparent
+        return response
 
 class UserData(BaseModel):
     age: int = Field(..., json_schema_extra={'example': 30})
     gender: str = Field(..., json_schema_extra={'example': "male"})
-    weight: float = Field(..., json_schema_extra={'example': 80.5})
-    height: float = Field(..., json_schema_extra={'example': 175.0})
+    weight: float = Field(..., json_schema_extra={'example': 80.5}, gt=0)
+    height: float = Field(..., json_schema_extra={'example': 175.0}, gt=0)
     neck: Optional[float] = Field(None, example=40.0)
     waist: Optional[float] = Field(None, example=90.0)
     hip: Optional[float] = Field(None, example=100.0)
     fitness_goal: str = Field(..., json_schema_extra={'example': "Weight loss"})
     days_per_week: int = Field(..., json_schema_extra={'example': 3}, ge=1, le=7)
     injuries: str = Field(..., json_schema_extra={'example': "none"})
+    # A coach-approved workout plan of a similar user, to adapt rather than
+    # writing the plan from scratch. Not part of the plan cache key.
+    template_plan: Optional[Dict[str, Any]] = None
+
+ExecutionMode = Optional[Literal["sequential", "parallel"]]
 
-def _clean_json_string(json_str: str) -> str:
+def _server_timing_header(timings: Dict[str, float]) -> str:
+    return ", ".join(f"{stage};dur={seconds * 1000:.0f}" for stage, seconds in timings.items())
+
+def _start_crew_run(user_data_dict: Dict[str, Any], execution_mode: str, progress=None) -> asyncio.Future:
+    """Hands the crew run to the pool, or rejects it with a 503 when the pool is saturated."""
+    try:
+        return crew_pool.submit(
+            run_crew, user_data_dict, execution_mode, progress, tracing.current_traceparent()
+        )
+    except CrewPoolSaturated:
+        logging.warning("Crew run pool is saturated; rejecting plan request.")
+        metrics.CREW_RUNS_REJECTED.inc()
+        raise HTTPException(
+            status_code=503,
+            detail="The AI service is busy generating other plans. Please retry shortly.",
+            headers={"Retry-After": str(config.CREW_RETRY_AFTER_SECONDS)},
+        )
+
+async def _finish_crew_run(
+    crew_run: asyncio.Future, user_data_dict: Dict[str, Any]
+) -> Tuple[FinalPlan, Dict[str, float]]:
     """
-    Cleans a string that is supposed to be JSON but might be wrapped
-    in markdown code blocks or have leading/trailing text.
+    Waits for a crew run and stores the validated FinalPlan in the plan cache.
+    Raises ValidationError when the agents' outputs do not form a valid plan.
     """
-    if not isinstance(json_str, str):
-        logging.warning(f"Attempted to clean a non-string type: {type(json_str)}")
-        return ""
-
-    start_index = json_str.find('{')
-    end_index = json_str.rfind('}')
-
-    if start_index != -1 and end_index != -1 and start_index < end_index:
-        return json_str[start_index : end_index + 1]
-    
-    logging.error(f"Could not find a valid JSON object within the string: {json_str}")
-    return ""
-
-def run_workout_crew(user_data: Dict[str, Any]) -> str:
-    metrics_analyst = create_body_metrics_analyst()
-    workout_architect = create_workout_architect()
-    nutrition_advisor = create_nutrition_advisor()
-    plan_synthesizer = create_plan_synthesizer()
-
-    analysis_task = create_metrics_analysis_task(metrics_analyst, user_data)
-    workout_task = create_workout_draft_task(workout_architect, user_data, analysis_task)
-    nutrition_task = create_nutrition_advice_task(nutrition_advisor, user_data, analysis_task)
-    synthesis_task = create_synthesis_task(
-        plan_synthesizer, user_data=user_data, workout_task=workout_task,
-        nutrition_task=nutrition_task, analysis_task=analysis_task
-    )
-
-    crew = Crew(
-        agents=[metrics_analyst, workout_architect, nutrition_advisor, plan_synthesizer],
-        tasks=[analysis_task, workout_task, nutrition_task, synthesis_task],
-        process=Process.sequential,
-        verbose=True
-    )
-    logging.info("Kicking off the AI Crew...")
-    result = crew.kickoff()
-    logging.info("AI Crew finished successfully.")
-
-    raw_output_string = ""
-    if isinstance(result, CrewOutput) and result.raw:
-        raw_output_string = result.raw
-    elif isinstance(result, str):
-        raw_output_string = result
-    else:
-        logging.error(f"Crew returned an unexpected type: {type(result)}. Full output: {result}")
-        raise TypeError("Crew did not return a string or CrewOutput with a raw attribute.")
-    
-    return _clean_json_string(raw_output_string)
+    try:
+        final_plan, timings = await crew_run
+        warm_start.record_request(timings["total"])
+    except ValidationError:
+        logging.error("AI generated output that failed validation", exc_info=True)
+        raise
+
+    if tracing.should_dump_debug_payload():
+        logging.info(f"Generated plan (sampled): {final_plan.model_dump_json(indent=2)}")
+
+    if plan_cache is not None:
+        await plan_cache.set(user_data_dict, final_plan)
+    return final_plan, timings
+
+def _observe_plan_request(endpoint: str, started: float, outcome: str):
+    metrics.GENERATE_PLAN_SECONDS.labels(endpoint, outcome).observe(time.perf_counter() - started)
+
+async def _cached_plan(user_data_dict: Dict[str, Any], bypass_cache: bool) -> Optional[FinalPlan]:
+    if plan_cache is None or bypass_cache:
+        return None
+    cached_plan = await plan_cache.get(user_data_dict)
+    if cached_plan is not None:
+        logging.info("Serving plan from cache.")
+    return cached_plan
 
 @app.post("/generate-plan", response_model=FinalPlan)
-async def generate_plan_endpoint(user_data: UserData):
-    json_string_output = None
+async def generate_plan_endpoint(
+    user_data: UserData,
+    response: Response,
+    execution_mode: ExecutionMode = Query(
+        None, description="Overrides CREW_EXECUTION_MODE for this request."
+    ),
+    bypass_cache: bool = Query(False, description="Always run the crew and refresh the cached plan.")
+):
+    started = time.perf_counter()
+    user_data_dict = user_data.model_dump()
+
+    cached_plan = await _cached_plan(user_data_dict, bypass_cache)
+    if cached_plan is not None:
+        response.headers["Server-Timing"] = 'cache;desc="hit"'
+        _observe_plan_request("/generate-plan", started, "cached")
+        return cached_plan
+
+    crew_run = _start_crew_run(user_data_dict, execution_mode or config.CREW_EXECUTION_MODE)
+    outcome = "error"
     try:
-        user_data_dict = user_data.model_dump()
-        json_string_output = run_workout_crew(user_data_dict)
-
-        logging.info(f"Cleaned JSON string from crew: {json_string_output}")
-        if not json_string_output:
-             raise ValueError("The cleaning function resulted in an empty string.")
-
-        data_dict = json.loads(json_string_output)
-        final_plan = FinalPlan(**data_dict)
+        final_plan, timings = await _finish_crew_run(crew_run, user_data_dict)
+        response.headers["Server-Timing"] = _server_timing_header(timings)
+        outcome = "ok"
         return final_plan
 
     except json.JSONDecodeError:
-        logging.error(f"Failed to decode JSON from crew output: {json_string_output}", exc_info=True)
         raise HTTPException(status_code=500, detail="AI failed to generate valid JSON.")
     except ValidationError as e:
-        logging.error(f"AI generated JSON that failed validation: {json_string_output}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"AI data failed validation: {e}")
     except Exception as e:
         logging.error("An unexpected error occurred in generate_plan_endpoint", exc_info=True)
         raise HTTPException(status_code=500, detail=f"An internal server error occurred: {e}")
+    finally:
+        _observe_plan_request("/generate-plan", started, outcome)
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/generate-plan/stream")
+async def generate_plan_stream_endpoint(
+    user_data: UserData,
+    execution_mode: ExecutionMode = Query(
+        None, description="Overrides CREW_EXECUTION_MODE for this request."
+    ),
+    bypass_cache: bool = Query(False, description="Always run the crew and refresh the cached plan.")
+):
+    """
+    Generates a plan like /generate-plan, but streams Server-Sent Events as
+    each stage finishes, carrying that stage's partial output. The stream ends
+    with a `validated` event holding the complete plan, or an `error` event.
+    """
+    started = time.perf_counter()
+    user_data_dict = user_data.model_dump()
+
+    cached_plan = await _cached_plan(user_data_dict, bypass_cache)
+    if cached_plan is not None:
+        _observe_plan_request("/generate-plan/stream", started, "cached")
+        async def cached_stream():
+            yield _sse_event(EVENT_VALIDATED, {"plan": cached_plan.model_dump(), "cached": True})
+        return StreamingResponse(cached_stream(), media_type="text/event-stream")
+
+    # Submitted before the response starts, so a saturated pool still yields a 503.
+    progress = crew_pool.progress_channel()
+    crew_run = _start_crew_run(
+        user_data_dict, execution_mode or config.CREW_EXECUTION_MODE, progress.sink
+    )
+    crew_run.add_done_callback(lambda _: progress.close())
+
+    async def event_stream():
+        while (item := await progress.get()) is not None:
+            yield _sse_event(*item)
+        try:
+            final_plan, timings = await _finish_crew_run(crew_run, user_data_dict)
+            _observe_plan_request("/generate-plan/stream", started, "ok")
+            yield _sse_event(EVENT_VALIDATED, {"plan": final_plan.model_dump(), "timings": timings})
+        except Exception as e:
+            logging.error("Plan generation failed while streaming", exc_info=True)
+            _observe_plan_request("/generate-plan/stream", started, "error")
+            yield _sse_event("error", {"detail": f"AI failed to generate a valid plan: {e}"})
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+@app.get("/cache/stats")
+async def read_cache_stats():
+    if plan_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **await plan_cache.stats()}
+
+@app.get("/warm-start/stats")
+def read_warm_start_stats():
+    return warm_start.stats()
+
+@app.get("/metrics")
+def read_metrics():
+    """Prometheus metrics: plan latency, LLM latency and token usage per agent, output failures."""
+    return Response(metrics.exposition(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/health")
+async def read_health():
+    """Answered on the event loop, so it stays responsive while crews run."""
+    return {"status": "ok", "crew_runs": crew_pool.stats()}
 
 @app.get("/")
 def read_root():
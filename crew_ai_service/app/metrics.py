@@ -0,0 +1,108 @@
+"""
+Prometheus metrics of the crew service, exposed at /metrics.
+
+Crew runs record their metrics in the pool workers. With CREW_POOL_KIND=process
+those are separate processes: set PROMETHEUS_MULTIPROC_DIR to an empty
+directory so /metrics aggregates the metrics of every worker.
+"""
+import contextvars
+import os
+import threading
+from contextlib import contextmanager
+
+from fitsync_common.metrics import LLM_LATENCY_BUCKETS, LLM_TOKEN_BUCKETS
+from prometheus_client import (
+    CollectorRegistry, Counter, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+)
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+LATENCY_BUCKETS = (0.5, 1, 2.5, 5, 10, 20, 30, 45, 60, 90, 120, 180, 240)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+
+GENERATE_PLAN_SECONDS = Histogram(
+    "fitsync_generate_plan_seconds", "Time to answer a plan generation request.",
+    ["endpoint", "outcome"], buckets=LATENCY_BUCKETS,
+)
+CREW_RUNS_REJECTED = Counter(
+    "fitsync_crew_runs_rejected", "Plan requests rejected because the crew run pool was saturated.",
+)
+LLM_CALL_SECONDS = Histogram(
+    "fitsync_llm_call_seconds", "Duration of one LLM call, by the agent that made it.",
+    ["agent", "model"], buckets=LLM_LATENCY_BUCKETS,
+)
+LLM_CALL_TOKENS = Histogram(
+    "fitsync_llm_call_tokens", "Tokens used by one LLM call, by the agent that made it.",
+    ["agent", "kind"], buckets=LLM_TOKEN_BUCKETS,
+)
+PLAN_TOKENS = Histogram(
+    "fitsync_plan_tokens",
+    "Tokens used by all LLM calls of one crew run, by whether it adapted an approved plan template.",
+    ["kind", "template"], buckets=TOKEN_BUCKETS,
+)
+TOOL_CALLS = Counter(
+    "fitsync_tool_calls", "Tool calls made by agents. Rejected calls make the agent retry.",
+    ["tool", "outcome"],
+)
+OUTPUT_FAILURES = Counter(
+    "fitsync_output_failures", "Agent outputs that had to be parsed from raw text, or failed to.",
+    ["output", "kind"],
+)
+
+_current_agent: contextvars.ContextVar = contextvars.ContextVar("current_agent", default="unknown")
+_run_usage: contextvars.ContextVar = contextvars.ContextVar("run_usage", default=None)
+
+
+class _TokenUsage:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.prompt = 0
+        self.completion = 0
+
+    def add(self, prompt: int, completion: int):
+        with self._lock:
+            self.prompt += prompt
+            self.completion += completion
+
+
+@contextmanager
+def agent_context(agent: str):
+    """Attributes the LLM calls made in the block to `agent`."""
+    token = _current_agent.set(agent)
+    try:
+        yield
+    finally:
+        _current_agent.reset(token)
+
+@contextmanager
+def run_token_usage(template: bool = False):
+    """
+    Adds up the tokens of the LLM calls made in the block into PLAN_TOKENS,
+    labelled by whether the run was given a plan template.
+    """
+    usage = _TokenUsage()
+    token = _run_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _run_usage.reset(token)
+        template_label = "hit" if template else "miss"
+        PLAN_TOKENS.labels("prompt", template_label).observe(usage.prompt)
+        PLAN_TOKENS.labels("completion", template_label).observe(usage.completion)
+
+def record_llm_call(model: str, seconds: float, prompt_tokens: int, completion_tokens: int):
+    agent = _current_agent.get()
+    LLM_CALL_SECONDS.labels(agent, model or "unknown").observe(seconds)
+    LLM_CALL_TOKENS.labels(agent, "prompt").observe(prompt_tokens)
+    LLM_CALL_TOKENS.labels(agent, "completion").observe(completion_tokens)
+    usage = _run_usage.get()
+    if usage is not None:
+        usage.add(prompt_tokens, completion_tokens)
+
+def exposition() -> bytes:
+    """The current metrics in the Prometheus text format."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
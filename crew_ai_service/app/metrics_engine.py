@@ -0,0 +1,96 @@
+import math
+from typing import Dict, Any, Optional
+
+from .tasks import MetricsAnalysis
+
+# Body type classification, evaluated top to bottom; the first matching rule wins.
+# Each rule is (body_type, gender or None for any, (min_bmi, max_bmi), (min_body_fat, max_body_fat)),
+# with lower bounds inclusive and upper bounds exclusive.
+BODY_TYPE_RULES = [
+    ("Endomorph", "male", (0.0, math.inf), (25.0, math.inf)),
+    ("Endomorph", "female", (0.0, math.inf), (32.0, math.inf)),
+    ("Endomorph", None, (30.0, math.inf), (0.0, math.inf)),
+    ("Ectomorph", "male", (0.0, 20.0), (0.0, 18.0)),
+    ("Ectomorph", "female", (0.0, 20.0), (0.0, 25.0)),
+    ("Ectomorph", None, (0.0, 18.5), (0.0, math.inf)),
+    ("Mesomorph", None, (0.0, math.inf), (0.0, math.inf)),
+]
+
+_GENDER_ALIASES = {"male": "male", "m": "male", "man": "male", "female": "female", "f": "female", "woman": "female"}
+
+
+def normalize_gender(gender: Optional[str]) -> Optional[str]:
+    if not isinstance(gender, str):
+        return None
+    return _GENDER_ALIASES.get(gender.strip().lower())
+
+def calculate_bmi(weight_kg: float, height_cm: float) -> float:
+    """Body Mass Index: weight in kilograms over height in metres squared."""
+    height_m = height_cm / 100
+    return weight_kg / (height_m ** 2)
+
+def calculate_navy_body_fat(
+    gender: str, height_cm: float, neck_cm: float, waist_cm: float, hip_cm: Optional[float] = None
+) -> float:
+    """
+    U.S. Navy circumference method, metric form.
+    Men need neck and waist, women additionally need hip.
+    """
+    if gender == "male":
+        circumference = waist_cm - neck_cm
+        if circumference <= 0:
+            raise ValueError("Waist must be larger than neck for the U.S. Navy formula.")
+        density = 1.0324 - 0.19077 * math.log10(circumference) + 0.15456 * math.log10(height_cm)
+    elif gender == "female":
+        if hip_cm is None:
+            raise ValueError("Hip measurement is required for the female U.S. Navy formula.")
+        circumference = waist_cm + hip_cm - neck_cm
+        if circumference <= 0:
+            raise ValueError("Waist plus hip must be larger than neck for the U.S. Navy formula.")
+        density = 1.29579 - 0.35004 * math.log10(circumference) + 0.22100 * math.log10(height_cm)
+    else:
+        raise ValueError(f"Unsupported gender for the U.S. Navy formula: {gender}")
+
+    return 495 / density - 450
+
+def classify_body_type(gender: str, bmi: float, body_fat_percentage: float) -> str:
+    for body_type, rule_gender, (min_bmi, max_bmi), (min_fat, max_fat) in BODY_TYPE_RULES:
+        if rule_gender is not None and rule_gender != gender:
+            continue
+        if min_bmi <= bmi < max_bmi and min_fat <= body_fat_percentage < max_fat:
+            return body_type
+    return "Mesomorph"
+
+def compute_metrics_analysis(user_data: Dict[str, Any]) -> Optional[MetricsAnalysis]:
+    """
+    Computes the body metrics analysis directly from the user's measurements.
+    Returns None when the measurements needed by the formulas are missing or
+    unusable, in which case the Body Metrics Analyst agent should estimate them.
+    """
+    gender = normalize_gender(user_data.get("gender"))
+    height = user_data.get("height")
+    weight = user_data.get("weight")
+    neck = user_data.get("neck")
+    waist = user_data.get("waist")
+    hip = user_data.get("hip")
+
+    if gender is None or not height or not weight or not neck or not waist:
+        return None
+    if gender == "female" and not hip:
+        return None
+
+    try:
+        bmi = calculate_bmi(weight, height)
+        body_fat = calculate_navy_body_fat(gender, height, neck, waist, hip)
+    except ValueError:
+        return None
+
+    if not 2.0 <= body_fat <= 70.0:
+        # Outside the range the formula is meaningful for; likely a bad measurement.
+        return None
+
+    return MetricsAnalysis(
+        bmi=round(bmi, 1),
+        body_fat_percentage=round(body_fat, 1),
+        body_type=classify_body_type(gender, bmi, body_fat),
+    )
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+from fitsync_common.text import normalize_injuries, normalize_text
+from pydantic import ValidationError
+
+from . import config
+from .metrics_engine import compute_metrics_analysis, normalize_gender
+from .tasks import FinalPlan, UserSummary
+
+# Bucket widths used when normalizing measurements, so that requests which
+# only differ by a few centimetres or kilograms share a cache entry.
+AGE_BUCKET_YEARS = 5
+WEIGHT_BUCKET_KG = 2.5
+LENGTH_BUCKET_CM = 2.5
+
+
+def _bucket(value: Optional[float], width: float) -> Optional[float]:
+    if value is None:
+        return None
+    return round(round(value / width) * width, 2)
+
+def normalize_user_data(user_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduces a request to the fields and granularity that shape the plan."""
+    return {
+        "age": _bucket(user_data.get("age"), AGE_BUCKET_YEARS),
+        "gender": normalize_gender(user_data.get("gender")) or normalize_text(user_data.get("gender")),
+        "weight": _bucket(user_data.get("weight"), WEIGHT_BUCKET_KG),
+        "height": _bucket(user_data.get("height"), LENGTH_BUCKET_CM),
+        "neck": _bucket(user_data.get("neck"), LENGTH_BUCKET_CM),
+        "waist": _bucket(user_data.get("waist"), LENGTH_BUCKET_CM),
+        "hip": _bucket(user_data.get("hip"), LENGTH_BUCKET_CM),
+        "fitness_goal": normalize_text(user_data.get("fitness_goal")),
+        "days_per_week": user_data.get("days_per_week"),
+        "injuries": normalize_injuries(user_data.get("injuries")),
+    }
+
+def plan_cache_key(user_data: Dict[str, Any]) -> str:
+    canonical = json.dumps(normalize_user_data(user_data), sort_keys=True, separators=(",", ":"))
+    return "plan:" + hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class InMemoryCacheBackend:
+    """
+    A thread-safe, per-process LRU store with per-entry expiry. Its methods
+    are coroutines only to share the interface of RedisCacheBackend.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    async def set(self, key: str, value: str, ttl_seconds: int):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    async def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    async def size(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """
+    A store shared between replicas. Expiry is handled with Redis TTLs, and
+    LRU eviction by the server's `maxmemory-policy allkeys-lru` setting.
+    """
+
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("PLAN_CACHE_BACKEND=redis requires the 'redis' package.") from e
+        self._client = redis.Redis.from_url(url)
+        self.evictions = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        value = await self._client.get(key)
+        return value.decode("utf-8") if value is not None else None
+
+    async def set(self, key: str, value: str, ttl_seconds: int):
+        await self._client.setex(key, ttl_seconds, value)
+
+    async def delete(self, key: str):
+        await self._client.delete(key)
+
+    async def size(self) -> int:
+        return await self._client.dbsize()
+
+
+class PlanCache:
+    """
+    Caches validated FinalPlan JSON keyed on the normalized user data.
+    Cached entries are validated again when read, exactly like fresh crew output.
+
+    A cache entry is shared by every user in the same measurement buckets, so
+    only the workout and nutrition sections are reused: the user summary and
+    body analysis of a hit are computed from the caller's own request. Users
+    whose body analysis needs the agent are therefore never served from cache.
+    """
+
+    def __init__(self, backend, ttl_seconds: int):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, user_data: Dict[str, Any]) -> Optional[FinalPlan]:
+        body_analysis = compute_metrics_analysis(user_data)
+        if body_analysis is None:
+            self.misses += 1
+            return None
+
+        key = plan_cache_key(user_data)
+        try:
+            cached = await self.backend.get(key)
+        except Exception:
+            logging.warning("Plan cache lookup failed, treating as a miss.", exc_info=True)
+            cached = None
+
+        if cached is None:
+            self.misses += 1
+            return None
+
+        try:
+            plan = FinalPlan(**json.loads(cached))
+        except (json.JSONDecodeError, ValidationError):
+            logging.warning(f"Discarding cached plan {key} that no longer validates.")
+            try:
+                await self.backend.delete(key)
+            except Exception:
+                logging.warning("Failed to delete invalid cached plan.", exc_info=True)
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return plan.model_copy(update={
+            "user_summary": UserSummary(
+                fitness_goal=user_data["fitness_goal"], days_per_week=user_data["days_per_week"]
+            ),
+            "body_analysis": body_analysis,
+        })
+
+    async def set(self, user_data: Dict[str, Any], plan: FinalPlan):
+        if compute_metrics_analysis(user_data) is None:
+            # Could never be served; see the class docstring.
+            return
+        try:
+            await self.backend.set(plan_cache_key(user_data), plan.model_dump_json(), self.ttl_seconds)
+        except Exception:
+            logging.warning("Failed to store plan in cache.", exc_info=True)
+
+    async def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": await self.backend.size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.backend.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def create_plan_cache() -> Optional[PlanCache]:
+    if not config.PLAN_CACHE_ENABLED:
+        return None
+    if config.PLAN_CACHE_BACKEND == "redis":
+        backend = RedisCacheBackend(config.PLAN_CACHE_REDIS_URL)
+    else:
+        backend = InMemoryCacheBackend(config.PLAN_CACHE_MAX_ENTRIES)
+    return PlanCache(backend, config.PLAN_CACHE_TTL_SECONDS)
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Dict, Any, Optional, Tuple
+
+from . import metrics
+from . import tracing
+from .crew_runner import run_workout_crew
+from .tasks import FinalPlan
+
+POOL_THREAD = "thread"
+POOL_PROCESS = "process"
+
+
+class CrewPoolSaturated(Exception):
+    """Every worker is busy and the queue of waiting runs is full."""
+
+
+def run_crew(
+    user_data: Dict[str, Any], execution_mode: str, progress=None, traceparent: Optional[str] = None
+) -> Tuple[FinalPlan, Dict[str, float]]:
+    """
+    Entry point of a crew run inside a pool worker. Progress events are put on
+    `progress` as (event, data) pairs; the run is traced under `traceparent`
+    and its token usage recorded in the plan token metrics.
+    """
+    on_event = None
+    if progress is not None:
+        on_event = lambda event, data: progress.put((event, data))
+    with tracing.span("crew.run", traceparent=traceparent, execution_mode=execution_mode), \
+            metrics.run_token_usage(template=bool(user_data.get("template_plan"))):
+        return run_workout_crew(user_data, execution_mode, on_event)
+
+def _init_process_worker():
+    from . import warm_start
+    warm_start.warm_up(time.perf_counter())
+
+
+class _ThreadProgressChannel:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self.sink = self
+
+    def put(self, item):
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+
+    async def get(self):
+        return await self._queue.get()
+
+    def close(self):
+        self.put(None)
+
+class _ProcessProgressChannel:
+    def __init__(self, manager):
+        self.sink = manager.Queue()
+
+    async def get(self):
+        return await asyncio.to_thread(self.sink.get)
+
+    def close(self):
+        self.sink.put(None)
+
+
+class CrewRunPool:
+    """
+    Runs crews off the event loop, in a thread or process pool of
+    `max_concurrent` workers. At most `max_queued` further runs wait for a
+    worker; beyond that, submit() raises CrewPoolSaturated.
+    """
+
+    def __init__(self, kind: str, max_concurrent: int, max_queued: int):
+        if kind not in (POOL_THREAD, POOL_PROCESS):
+            raise ValueError(f"Unknown crew pool kind {kind!r}; use 'thread' or 'process'.")
+        self.kind = kind
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self._executor: Optional[Executor] = None
+        self._manager = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+
+    def start(self):
+        if self.kind == POOL_PROCESS:
+            # Spawned rather than forked: the server process already runs threads.
+            context = multiprocessing.get_context("spawn")
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_concurrent, mp_context=context, initializer=_init_process_worker
+            )
+            self._manager = context.Manager()
+        else:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrent, thread_name_prefix="crew-run"
+            )
+        logging.info(
+            f"Crew run pool started: {self.max_concurrent} {self.kind} workers, "
+            f"up to {self.max_queued} queued runs."
+        )
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+
+    def progress_channel(self):
+        """
+        A channel for progress events of one run: pass `channel.sink` to
+        run_crew and await `channel.get()` on the event loop. None marks the end.
+        """
+        if self.kind == POOL_PROCESS:
+            return _ProcessProgressChannel(self._manager)
+        return _ThreadProgressChannel(asyncio.get_running_loop())
+
+    def submit(self, fn, *args) -> asyncio.Future:
+        with self._lock:
+            if self._in_flight >= self.max_concurrent + self.max_queued:
+                self._rejected += 1
+                raise CrewPoolSaturated()
+            self._in_flight += 1
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return asyncio.wrap_future(future)
+
+    def _release(self, future):
+        with self._lock:
+            self._in_flight -= 1
+            if future is not None and not future.cancelled() and future.exception() is None:
+                self._completed += 1
+            else:
+                self._failed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            in_flight = self._in_flight
+            active = min(in_flight, self.max_concurrent)
+            return {
+                "kind": self.kind,
+                "max_concurrent": self.max_concurrent,
+                "max_queued": self.max_queued,
+                "active": active,
+                "queued": in_flight - active,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+            }
@@ -1,3 +1,4 @@
+import json
 from crewai import Task
 from pydantic import BaseModel, Field
 from typing import Dict, Any, List, Optional
@@ -55,6 +56,7 @@ def create_metrics_analysis_task(agent, user_data: Dict[str, Any]) -> Task:
     
     description = f"""Analyze the user's data to determine key fitness metrics.
     If some body measurements are not provided (N/A), make your best estimates based on the available data (age, gender, height, weight).
+    Use the Similar Reference Profiles Tool with the known measurements to find comparable people and use their measurements as reference points for your estimates.
 
     User Data:
     - Age: {user_data['age']}
@@ -76,7 +78,26 @@ def create_metrics_analysis_task(agent, user_data: Dict[str, Any]) -> Task:
     )
     
 
-def create_workout_draft_task(agent, user_data: Dict[str, Any], context_task: Task) -> Task:
+def _analysis_context(context_task: Optional[Task], body_analysis: Optional[MetricsAnalysis]):
+    """
+    Returns the task context and an extra description block for a task that
+    builds on the body metrics. A precomputed analysis is written into the
+    description instead of being passed along as a context task.
+    """
+    if body_analysis is not None:
+        return [], f"""
+        Body Analysis (computed from the user's measurements):
+        {body_analysis.model_dump_json()}
+        """
+    return [context_task], ""
+
+def create_workout_draft_task(
+    agent, user_data: Dict[str, Any], context_task: Optional[Task] = None,
+    body_analysis: Optional[MetricsAnalysis] = None, template_plan: Optional[Dict[str, Any]] = None
+) -> Task:
+    context, analysis_block = _analysis_context(context_task, body_analysis)
+    if template_plan:
+        return _adapt_workout_template_task(agent, user_data, context, analysis_block, template_plan)
     return Task(
         description=f"""Create a detailed, 7-day workout plan draft based on the user's goals and the provided body analysis.
         
@@ -90,43 +111,50 @@ def create_workout_draft_task(agent, user_data: Dict[str, Any], context_task: Ta
         - Injuries: {user_data['injuries']}
 
         Design a weekly schedule for a beginner, and provide detailed workout plans.
-        """,
+        {analysis_block}""",
         expected_output="A JSON object that strictly adheres to the `WorkoutPlan` Pydantic model schema, ensuring the `equipment` field is filled for every exercise.",
         agent=agent,
-        context=[context_task],
+        context=context,
         output_pydantic=WorkoutPlan
     )
 
-def create_nutrition_advice_task(agent, user_data: Dict[str, Any], context_task: Task) -> Task:
+def _adapt_workout_template_task(
+    agent, user_data: Dict[str, Any], context, analysis_block: str, template_plan: Dict[str, Any]
+) -> Task:
     return Task(
-        description=f"""Provide foundational nutrition advice tailored to the user's primary goal of {user_data['fitness_goal']}.
-        Consider the body analysis provided in the context. Keep the advice simple and actionable for a beginner.
-        """,
-        expected_output="A JSON object that strictly adheres to the `NutritionAdvice` Pydantic model schema.",
-        agent=agent,
-        context=[context_task],
-        output_pydantic=NutritionAdvice
-    )
-
-def create_synthesis_task(agent, user_data: Dict[str, Any], workout_task: Task, nutrition_task: Task, analysis_task: Task) -> Task:
-    user_summary_data = {k: user_data[k] for k in ['fitness_goal', 'days_per_week']}
+        description=f"""Adapt the coach-approved workout plan below to this user. It was approved for a user with
+        the same goal, days per week and injuries and a similar age and build.
 
-    return Task(
-        description=f"""
-        Your mission is to act as the final compiler. You will receive structured data from three other agents.
-        You MUST combine them into a single, final JSON object that strictly follows the `FinalPlan` schema.
-        The output of this task MUST be a raw JSON string.
+        **Crucial Instructions:**
+        - Keep the plan's weekly structure and exercises wherever they suit this user; only change what the body analysis calls for, such as sets, reps, rest and exercise choices.
+        - For EVERY exercise, you MUST specify the required equipment in the 'equipment' field of the JSON schema. If no equipment is needed, specify 'Bodyweight'.
 
-        1.  **Body Analysis**: This will be the result from the 'Body Metrics Analyst'.
-        2.  **Workout Plan**: This will be the result from the 'Workout Plan Architect'.
-        3.  **Nutrition Guidelines**: This will be the result from the 'Nutrition Advisor'.
-        4.  **User Summary**: Create this part using this data: {user_summary_data}.
+        User Goals:
+        - Primary Goal: "{user_data['fitness_goal']}"
+        - Days per week: {user_data['days_per_week']}
+        - Injuries: {user_data['injuries']}
 
-        **Crucial Final Step**: After you have constructed the complete JSON string, you MUST use the `Final Plan JSON Validator Tool` to verify it. If it reports errors, you MUST fix your JSON string and re-validate until it is perfect.
+        Approved plan:
+        {json.dumps(template_plan)}
+        {analysis_block}""",
+        expected_output="A JSON object that strictly adheres to the `WorkoutPlan` Pydantic model schema, ensuring the `equipment` field is filled for every exercise.",
+        agent=agent,
+        context=context,
+        output_pydantic=WorkoutPlan
+    )
 
-        Your final answer MUST be ONLY the validated JSON string itself. No extra text, no apologies, no "Here is the JSON:". Just the raw, validated string.
-        """,
-        expected_output="A single, raw JSON string that has been successfully validated against the `FinalPlan` schema.",
+def create_nutrition_advice_task(
+    agent, user_data: Dict[str, Any], context_task: Optional[Task] = None,
+    body_analysis: Optional[MetricsAnalysis] = None
+) -> Task:
+    context, analysis_block = _analysis_context(context_task, body_analysis)
+    analysis_source = "below" if analysis_block else "in the context"
+    return Task(
+        description=f"""Provide foundational nutrition advice tailored to the user's primary goal of {user_data['fitness_goal']}.
+        Consider the body analysis provided {analysis_source}. Keep the advice simple and actionable for a beginner.
+        {analysis_block}""",
+        expected_output="A JSON object that strictly adheres to the `NutritionAdvice` Pydantic model schema.",
         agent=agent,
-        context=[analysis_task, workout_task, nutrition_task],
-    )
\ No newline at end of file
+        context=context,
+        output_pydantic=NutritionAdvice
+    )
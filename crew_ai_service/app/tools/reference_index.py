@@ -0,0 +1,240 @@
+import csv
+import hashlib
+import json
+import logging
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from crewai.tools import tool
+from fitsync_common.text import NORMALIZATION_VERSION, normalize_injuries, normalize_text
+
+from .. import config
+from .. import metrics
+from .. import tracing
+
+# Query name -> column of the reference dataset. The numeric columns are the
+# dimensions of the k-NN search; a query may use any subset of them.
+NUMERIC_COLUMNS = {
+    "age": "Age",
+    "weight": "Weight(kg)",
+    "height": "Height(cm)",
+    "neck": "Neck(cm)",
+    "abs": "Abs(cm)",
+    "waist": "Waist (cm)",
+    "hip": "Hip (cm)",
+    "days_per_week": "No_of_days_for_a_week",
+}
+# Columns that are matched exactly rather than by distance.
+LABEL_COLUMNS = {
+    "fitness_goal": "Fitness Goal",
+    "injuries": "Injuries",
+}
+
+
+def normalize_label(name: str, value: Optional[str]) -> str:
+    return normalize_injuries(value) if name == "injuries" else normalize_text(value)
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _read_columns(source: Path) -> Dict[str, list]:
+    """Reads the reference columns from a CSV or Parquet file."""
+    columns = list(NUMERIC_COLUMNS.values()) + list(LABEL_COLUMNS.values())
+    if source.suffix.lower() == ".parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("pyarrow is required to load Parquet reference data.")
+        return pq.read_table(source, columns=columns).to_pydict()
+
+    data: Dict[str, list] = {column: [] for column in columns}
+    with source.open(newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            for column in columns:
+                data[column].append(row[column])
+    return data
+
+
+class ReferenceIndex:
+    """
+    Exact k-nearest-neighbour search over the reference body assessments.
+
+    The numeric columns are standardized (zero mean, unit variance) so that no
+    single measurement dominates the Euclidean distance. Goal and injuries are
+    stored as integer codes and used as exact-match filters before the search.
+    """
+
+    def __init__(
+        self, standardized: np.ndarray, mean: np.ndarray, std: np.ndarray,
+        label_codes: Dict[str, np.ndarray], label_values: Dict[str, List[str]],
+    ):
+        self.standardized = standardized
+        self.mean = mean
+        self.std = std
+        self.label_codes = label_codes
+        self.label_values = label_values
+        self._code_lookup = {
+            name: {value: code for code, value in enumerate(values)}
+            for name, values in label_values.items()
+        }
+        self.feature_names = list(NUMERIC_COLUMNS)
+
+    def __len__(self) -> int:
+        return self.standardized.shape[0]
+
+    @classmethod
+    def build(cls, columns: Dict[str, list]) -> "ReferenceIndex":
+        features = np.column_stack([
+            np.asarray(columns[column], dtype=np.float64) for column in NUMERIC_COLUMNS.values()
+        ])
+        mean = features.mean(axis=0)
+        std = features.std(axis=0)
+        std[std == 0] = 1.0
+
+        label_codes, label_values = {}, {}
+        for name, column in LABEL_COLUMNS.items():
+            normalized = [normalize_label(name, value) for value in columns[column]]
+            values, codes = np.unique(np.asarray(normalized, dtype=str), return_inverse=True)
+            label_values[name] = values.tolist()
+            label_codes[name] = codes.astype(np.int32)
+
+        standardized = ((features - mean) / std).astype(np.float32)
+        return cls(standardized, mean, std, label_codes, label_values)
+
+    @classmethod
+    def load(cls, source: Path, cache_dir: Path) -> "ReferenceIndex":
+        """
+        Loads the index for `source`, building it on first use. The arrays are
+        saved in `cache_dir` under the source's content hash and the label
+        normalization version, and opened with memory mapping, so large
+        reference datasets are paged in on demand and shared between worker
+        processes instead of being parsed per process.
+        """
+        stem = f"{source.stem}_{_file_sha256(source)[:16]}_n{NORMALIZATION_VERSION}"
+        features_path = cache_dir / f"{stem}.features.npy"
+        meta_path = cache_dir / f"{stem}.meta.json"
+
+        if not (features_path.is_file() and meta_path.is_file()):
+            index = cls.build(_read_columns(source))
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            np.save(features_path, index.standardized)
+            for name, codes in index.label_codes.items():
+                np.save(cache_dir / f"{stem}.{name}.npy", codes)
+            meta_path.write_text(json.dumps({
+                "mean": index.mean.tolist(),
+                "std": index.std.tolist(),
+                "label_values": index.label_values,
+            }))
+            logging.info(f"Reference index {stem} built from {len(index)} rows.")
+
+        meta = json.loads(meta_path.read_text())
+        return cls(
+            standardized=np.load(features_path, mmap_mode="r"),
+            mean=np.asarray(meta["mean"]),
+            std=np.asarray(meta["std"]),
+            label_codes={
+                name: np.load(cache_dir / f"{stem}.{name}.npy", mmap_mode="r")
+                for name in LABEL_COLUMNS
+            },
+            label_values=meta["label_values"],
+        )
+
+    def _filter_mask(self, name: str, value: Optional[str]) -> Optional[np.ndarray]:
+        """Rows whose label equals `value`; None if there is nothing to filter on."""
+        if not value:
+            return None
+        code = self._code_lookup[name].get(normalize_label(name, value))
+        if code is None:
+            return np.zeros(len(self), dtype=bool)
+        return np.asarray(self.label_codes[name]) == code
+
+    def query(
+        self, k: int = 5, fitness_goal: Optional[str] = None, injuries: Optional[str] = None,
+        **measurements: Optional[float],
+    ) -> Dict[str, object]:
+        """
+        Returns the `k` reference profiles closest to `measurements`, using only
+        the measurements that are given. A filter that matches no row is
+        dropped rather than returning nothing; `filters` lists those applied.
+        """
+        dims = [i for i, name in enumerate(self.feature_names) if measurements.get(name) is not None]
+        if not dims:
+            raise ValueError("At least one numeric measurement is required.")
+
+        mask, applied = np.ones(len(self), dtype=bool), {}
+        for name, value in (("fitness_goal", fitness_goal), ("injuries", injuries)):
+            filter_mask = self._filter_mask(name, value)
+            if filter_mask is not None and (mask & filter_mask).any():
+                mask &= filter_mask
+                applied[name] = normalize_label(name, value)
+        candidates = np.flatnonzero(mask)
+
+        point = np.array([measurements[self.feature_names[i]] for i in dims], dtype=np.float64)
+        point = ((point - self.mean[dims]) / self.std[dims]).astype(np.float32)
+        diff = self.standardized[candidates][:, dims] - point
+        distances = np.einsum("ij,ij->i", diff, diff)
+
+        k = min(k, len(candidates))
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.argsort(distances[nearest])]
+        return {
+            "filters": applied,
+            "profiles": [
+                self._profile(int(candidates[i]), float(np.sqrt(distances[i]))) for i in nearest
+            ],
+        }
+
+    def _profile(self, row: int, distance: float) -> Dict[str, object]:
+        values = np.asarray(self.standardized[row], dtype=np.float64) * self.std + self.mean
+        profile = {name: round(float(value), 1) for name, value in zip(self.feature_names, values)}
+        for name in LABEL_COLUMNS:
+            profile[name] = self.label_values[name][int(self.label_codes[name][row])]
+        profile["distance"] = round(distance, 3)
+        return profile
+
+
+@lru_cache(maxsize=1)
+def get_reference_index() -> ReferenceIndex:
+    """The reference index, loaded once per process."""
+    return ReferenceIndex.load(Path(config.REFERENCE_DATA_PATH), Path(config.KNOWLEDGE_BASE_DIR))
+
+
+@tool("Similar Reference Profiles Tool")
+def find_similar_profiles(
+    age: Optional[float] = None,
+    weight: Optional[float] = None,
+    height: Optional[float] = None,
+    neck: Optional[float] = None,
+    waist: Optional[float] = None,
+    hip: Optional[float] = None,
+    fitness_goal: Optional[str] = None,
+    injuries: Optional[str] = None,
+    k: int = 5,
+) -> str:
+    """
+    Finds the reference body assessments most similar to the user.
+    Pass the user's age (years), weight (kg), height, neck, waist and hip (cm),
+    leaving out any that are unknown, and optionally their fitness goal and
+    injuries to restrict the search to matching profiles.
+    Returns a JSON object with the closest profiles (including their abs
+    measurement) ordered by similarity; use them as reference points when a
+    measurement is missing or a value looks implausible.
+    """
+    with tracing.span("tool.find_similar_profiles", k=k) as tool_span:
+        try:
+            result = get_reference_index().query(
+                k=max(1, min(k, 20)), fitness_goal=fitness_goal, injuries=injuries,
+                age=age, weight=weight, height=height, neck=neck, waist=waist, hip=hip,
+            )
+        except ValueError as e:
+            metrics.TOOL_CALLS.labels("find_similar_profiles", "invalid_query").inc()
+            return f"Invalid query: {e}. Provide at least one measurement."
+        metrics.TOOL_CALLS.labels("find_similar_profiles", "ok").inc()
+        tool_span.set_attribute("profiles", len(result["profiles"]))
+        return json.dumps(result)
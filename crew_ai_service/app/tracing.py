@@ -0,0 +1,27 @@
+"""
+Tracing for the AI service, on the shared tracer in fitsync_common.tracing.
+A trace started by the backend is continued here through the `traceparent`
+header.
+"""
+import random
+
+from fitsync_common.tracing import (  # noqa: F401
+    Tracer, bind_context, current_span, current_traceparent, parse_traceparent,
+)
+
+from . import config
+
+tracer = Tracer(
+    "crew_ai_service",
+    enabled=config.TRACING_ENABLED,
+    sample_ratio=config.TRACE_SAMPLE_RATIO,
+    export_path=config.TRACE_EXPORT_PATH,
+    max_bytes=config.TRACE_EXPORT_MAX_BYTES,
+    backup_count=config.TRACE_EXPORT_BACKUP_COUNT,
+)
+span = tracer.span
+start_span = tracer.start_span
+
+def should_dump_debug_payload() -> bool:
+    """Whether to log a full plan payload for this request (DEBUG_PAYLOAD_SAMPLE_RATIO)."""
+    return config.DEBUG_PAYLOAD_SAMPLE_RATIO > 0 and random.random() < config.DEBUG_PAYLOAD_SAMPLE_RATIO
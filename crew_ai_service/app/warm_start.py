@@ -0,0 +1,48 @@
+import logging
+import threading
+import time
+from typing import Dict, Any, Optional
+
+from .agents import metrics_analyst_pool, workout_architect_pool, nutrition_advisor_pool
+from .tools.reference_index import get_reference_index
+
+_stats: Dict[str, Optional[float]] = {
+    "import_seconds": None,
+    "warm_up_seconds": None,
+    "reference_index_seconds": None,
+    "first_request_seconds": None,
+}
+_first_request_lock = threading.Lock()
+
+
+def warm_up(process_started: float):
+    """
+    Builds the expensive per-process objects before the first request arrives:
+    the reference profile index and one idle agent per role.
+    `process_started` is a time.perf_counter() reading taken at import.
+    """
+    started = time.perf_counter()
+    _stats["import_seconds"] = started - process_started
+
+    get_reference_index()
+    _stats["reference_index_seconds"] = time.perf_counter() - started
+
+    for pool in (metrics_analyst_pool, workout_architect_pool, nutrition_advisor_pool):
+        pool.prewarm()
+
+    _stats["warm_up_seconds"] = time.perf_counter() - started
+    logging.info(
+        f"Warm start complete: imports took {_stats['import_seconds']:.2f}s, "
+        f"warm-up took {_stats['warm_up_seconds']:.2f}s "
+        f"(reference index {_stats['reference_index_seconds']:.2f}s)."
+    )
+
+def record_request(seconds: float):
+    """Remembers the latency of the first plan generated by this process."""
+    with _first_request_lock:
+        if _stats["first_request_seconds"] is None:
+            _stats["first_request_seconds"] = seconds
+            logging.info(f"First plan request of this process took {seconds:.2f}s.")
+
+def stats() -> Dict[str, Any]:
+    return dict(_stats)
@@ -0,0 +1,138 @@
+"""
+Reference checks for the local body metrics engine. Run from the
+crew_ai_service/ directory:
+
+    python -m pytest tests
+"""
+import math
+
+import pytest
+
+from app.metrics_engine import (
+    calculate_bmi, calculate_navy_body_fat, classify_body_type, compute_metrics_analysis, normalize_gender,
+)
+
+
+def _inches(cm: float) -> float:
+    return cm / 2.54
+
+def navy_body_fat_imperial(gender: str, height_cm: float, neck_cm: float, waist_cm: float, hip_cm: float = None) -> float:
+    """Hodgdon and Beckett's original U.S. Navy equations, which take inches."""
+    if gender == "male":
+        return 86.010 * math.log10(_inches(waist_cm) - _inches(neck_cm)) - 70.041 * math.log10(_inches(height_cm)) + 36.76
+    return (
+        163.205 * math.log10(_inches(waist_cm) + _inches(hip_cm) - _inches(neck_cm))
+        - 97.684 * math.log10(_inches(height_cm)) - 78.387
+    )
+
+
+MALE = {"gender": "male", "age": 30, "height": 178.0, "weight": 80.0, "neck": 38.0, "waist": 86.0, "hip": None}
+FEMALE = {"gender": "female", "age": 30, "height": 165.0, "weight": 60.0, "neck": 32.0, "waist": 70.0, "hip": 95.0}
+
+
+@pytest.mark.parametrize("weight, height, expected", [
+    (80.0, 178.0, 25.25),
+    (60.0, 165.0, 22.04),
+    (70.0, 175.0, 22.86),
+])
+def test_bmi_matches_reference(weight, height, expected):
+    assert calculate_bmi(weight, height) == pytest.approx(expected, abs=0.01)
+
+
+@pytest.mark.parametrize("profile, expected", [
+    (MALE, 17.20),
+    (FEMALE, 24.86),
+])
+def test_navy_body_fat_matches_reference(profile, expected):
+    body_fat = calculate_navy_body_fat(
+        profile["gender"], profile["height"], profile["neck"], profile["waist"], profile["hip"]
+    )
+    assert body_fat == pytest.approx(expected, abs=0.01)
+
+@pytest.mark.parametrize("profile", [MALE, FEMALE])
+def test_navy_body_fat_agrees_with_imperial_equations(profile):
+    args = (profile["gender"], profile["height"], profile["neck"], profile["waist"], profile["hip"])
+    assert calculate_navy_body_fat(*args) == pytest.approx(navy_body_fat_imperial(*args), abs=0.5)
+
+@pytest.mark.parametrize("gender, neck, waist, hip", [
+    ("male", 40.0, 40.0, None),
+    ("male", 42.0, 38.0, None),
+    ("female", 90.0, 40.0, 45.0),
+])
+def test_navy_body_fat_rejects_impossible_circumferences(gender, neck, waist, hip):
+    with pytest.raises(ValueError):
+        calculate_navy_body_fat(gender, 175.0, neck, waist, hip)
+
+def test_navy_body_fat_requires_hip_for_women():
+    with pytest.raises(ValueError):
+        calculate_navy_body_fat("female", 165.0, 32.0, 70.0)
+
+def test_navy_body_fat_rejects_unknown_gender():
+    with pytest.raises(ValueError):
+        calculate_navy_body_fat("other", 175.0, 38.0, 86.0, 95.0)
+
+
+@pytest.mark.parametrize("gender, bmi, body_fat, expected", [
+    ("male", 25.2, 17.2, "Mesomorph"),
+    ("female", 22.0, 24.9, "Mesomorph"),
+    ("male", 24.0, 26.0, "Endomorph"),
+    ("female", 24.0, 33.0, "Endomorph"),
+    ("male", 31.0, 20.0, "Endomorph"),
+    ("male", 19.0, 12.0, "Ectomorph"),
+    ("female", 19.0, 22.0, "Ectomorph"),
+    ("female", 18.0, 28.0, "Ectomorph"),
+    ("male", 21.0, 12.0, "Mesomorph"),
+])
+def test_classify_body_type(gender, bmi, body_fat, expected):
+    assert classify_body_type(gender, bmi, body_fat) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("Male", "male"), (" m ", "male"), ("WOMAN", "female"), ("f", "female"), ("other", None), (None, None),
+])
+def test_normalize_gender(value, expected):
+    assert normalize_gender(value) == expected
+
+
+@pytest.mark.parametrize("profile, expected", [
+    (MALE, (25.2, 17.2, "Mesomorph")),
+    (FEMALE, (22.0, 24.9, "Mesomorph")),
+    ({**MALE, "height": 180.0, "weight": 100.0, "neck": 40.0, "waist": 110.0}, (30.9, 31.1, "Endomorph")),
+    ({**MALE, "height": 185.0, "weight": 62.0, "neck": 40.0, "waist": 75.0}, (18.1, 4.9, "Ectomorph")),
+    ({**FEMALE, "height": 175.0, "weight": 58.0, "neck": 34.0, "waist": 64.0, "hip": 88.0}, (18.9, 14.2, "Ectomorph")),
+])
+def test_compute_metrics_analysis(profile, expected):
+    analysis = compute_metrics_analysis(profile)
+    assert (analysis.bmi, analysis.body_fat_percentage, analysis.body_type) == expected
+
+def test_compute_metrics_analysis_accepts_gender_aliases():
+    assert compute_metrics_analysis({**MALE, "gender": "M"}) == compute_metrics_analysis(MALE)
+
+def test_men_do_not_need_a_hip_measurement():
+    assert compute_metrics_analysis({**MALE, "hip": None}) is not None
+
+
+@pytest.mark.parametrize("profile", [
+    {**MALE, "neck": None},
+    {**MALE, "waist": None},
+    {**FEMALE, "hip": None},
+    {**FEMALE, "neck": 0},
+    {**MALE, "gender": "other"},
+    {**MALE, "gender": None},
+    {**MALE, "height": None},
+    {**MALE, "weight": 0},
+], ids=[
+    "no neck", "no waist", "female without hip", "zero neck", "unknown gender", "no gender", "no height", "zero weight",
+])
+def test_missing_measurements_fall_back_to_the_agent(profile):
+    assert compute_metrics_analysis(profile) is None
+
+@pytest.mark.parametrize("profile", [
+    {**MALE, "neck": 40.0, "waist": 40.0},
+    {**MALE, "neck": 45.0, "waist": 38.0},
+    {**FEMALE, "neck": 200.0, "waist": 60.0, "hip": 80.0},
+    # Valid circumferences but a body fat outside 2-70%.
+    {**MALE, "neck": 40.0, "waist": 62.0},
+], ids=["waist equals neck", "waist below neck", "neck above waist plus hip", "implausible body fat"])
+def test_invalid_measurements_fall_back_to_the_agent(profile):
+    assert compute_metrics_analysis(profile) is None
@@ -0,0 +1,22 @@
+"""
+The plan cache, the reference index and the backend's plan templates bucket
+requests by the same normalized goal and injuries.
+"""
+import pytest
+
+from app.plan_cache import normalize_user_data
+from app.tools.reference_index import normalize_label
+
+
+@pytest.mark.parametrize("injuries", [None, "", "None", " no ", "N/A", "nothing.", "No injuries!"])
+def test_no_injuries_is_none_everywhere(injuries):
+    assert normalize_user_data({"injuries": injuries})["injuries"] == "none"
+    assert normalize_label("injuries", injuries) == "none"
+
+@pytest.mark.parametrize("field, value, expected", [
+    ("injuries", "  Left  KNEE pain. ", "left knee pain"),
+    ("fitness_goal", "Muscle   Gain!", "muscle gain"),
+])
+def test_cache_and_reference_labels_agree(field, value, expected):
+    assert normalize_user_data({field: value})[field] == expected
+    assert normalize_label(field, value) == expected
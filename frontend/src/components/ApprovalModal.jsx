@@ -101,13 +101,18 @@ function ApprovalModal({ plan, onClose, onSuccess }) {
       workout_plan: editablePlan.workout_plan,
       nutrition_guidelines: editablePlan.nutrition_guidelines,
       coach_notes: editablePlan.coach_notes || '',
+      version: editablePlan.version ?? 0,
     };
     
     try {
       await apiClient.put(`/coach/requests/${plan._id}/approve`, updatePayload);
       onSuccess();
     } catch (err) {
-      setError('Failed to approve the plan. Please try again.');
+      if (err.response?.status === 409) {
+        setError('This plan was changed by another coach. Close it and reopen it to see the latest version.');
+      } else {
+        setError('Failed to approve the plan. Please try again.');
+      }
       console.error(err);
     } finally {
       setIsSubmitting(false);
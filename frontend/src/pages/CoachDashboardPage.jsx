@@ -8,17 +8,19 @@ function CoachDashboardPage() {
   const { logout } = useAuth();
   const navigate = useNavigate();
   const [pendingPlans, setPendingPlans] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState('');
   
   const [selectedPlan, setSelectedPlan] = useState(null);
   const [isModalOpen, setIsModalOpen] = useState(false);
 
-  const fetchPendingPlans = async () => {
-    setIsLoading(true);
+  const fetchPendingPlans = async (cursor = null) => {
+    if (!cursor) setIsLoading(true);
     try {
-      const response = await apiClient.get('/coach/pending-requests');
-      setPendingPlans(response.data);
+      const response = await apiClient.get('/coach/pending-requests', { params: cursor ? { cursor } : {} });
+      setPendingPlans(prev => cursor ? [...prev, ...response.data.items] : response.data.items);
+      setNextCursor(response.data.next_cursor);
     } catch (err) {
       setError('Failed to fetch pending plans.');
       console.error(err);
@@ -36,10 +38,16 @@ function CoachDashboardPage() {
     navigate('/login');
   };
   
-  const handleOpenModal = (plan) => {
-    console.log("Opening modal for plan:", plan);
-    setSelectedPlan(plan);
-    setIsModalOpen(true);
+  const handleOpenModal = async (planSummary) => {
+    // The pending list only carries summaries, so load the full plan for review.
+    try {
+      const response = await apiClient.get(`/coach/requests/${planSummary._id}`);
+      setSelectedPlan(response.data);
+      setIsModalOpen(true);
+    } catch (err) {
+      setError('Failed to load the plan for review.');
+      console.error(err);
+    }
   };
 
   const handleCloseModal = () => {
@@ -60,7 +68,7 @@ function CoachDashboardPage() {
     <div style={styles.dashboardContainer}>
 
       <div style={styles.planList}>
-        <h2>Pending Approval ({pendingPlans.length})</h2>
+        <h2>Pending Approval ({pendingPlans.length}{nextCursor ? '+' : ''})</h2>
         {pendingPlans.length > 0 ? (
           pendingPlans.map(plan => (
             <div key={plan._id} style={styles.planCard}>
@@ -75,6 +83,11 @@ function CoachDashboardPage() {
         ) : (
           <p>No plans are currently pending approval.</p>
         )}
+        {nextCursor && (
+          <button onClick={() => fetchPendingPlans(nextCursor)} style={styles.loadMoreButton}>
+            Load more
+          </button>
+        )}
       </div>
 
       {isModalOpen && (
@@ -94,6 +107,7 @@ const styles = {
     logoutButton: { padding: '8px 16px', background: '#dc3545', color: 'white', border: 'none', borderRadius: '4px', cursor: 'pointer' },
     planList: { marginTop: '20px' },
     planCard: { border: '1px solid #ddd', padding: '15px', borderRadius: '8px', marginBottom: '15px', background: 'white' },
+    loadMoreButton: { padding: '8px 12px', background: '#f8f9fa', border: '1px solid #ccc', borderRadius: '4px', cursor: 'pointer' },
     reviewButton: { padding: '8px 12px', background: '#ffc107', color: 'black', border: 'none', borderRadius: '4px', cursor: 'pointer' },
 };
 
@@ -24,6 +24,7 @@ function UserDashboardPage() {
   const [success, setSuccess] = useState('');
   const [isLoading, setIsLoading] = useState(false);
   const [pastPlans, setPastPlans] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
 
   const handleLogout = () => {
     logout();
@@ -47,7 +48,7 @@ function UserDashboardPage() {
 
     try {
       const response = await apiClient.post('/workouts/request-plan', formData);
-      setSuccess('Successfully requested a new workout plan! It will appear in your history below.');
+      setSuccess('Your workout plan is being generated! Track its progress in your history below.');
       fetchPastPlans(); 
     } catch (err) {
       setError(err.response?.data?.detail || 'Failed to request workout plan.');
@@ -56,10 +57,11 @@ function UserDashboardPage() {
     }
   };
 
-  const fetchPastPlans = async () => {
+  const fetchPastPlans = async (cursor = null) => {
     try {
-      const response = await apiClient.get('/workouts/my-requests');
-      setPastPlans(response.data);
+      const response = await apiClient.get('/workouts/my-requests', { params: cursor ? { cursor } : {} });
+      setPastPlans(prev => cursor ? [...prev, ...response.data.items] : response.data.items);
+      setNextCursor(response.data.next_cursor);
     } catch (error) {
       console.error("Failed to fetch past plans", error);
     }
@@ -100,7 +102,7 @@ function UserDashboardPage() {
             {success && <p style={styles.success}>{success}</p>}
             
             <button type="submit" disabled={isLoading} style={styles.submitButton}>
-              {isLoading ? 'Generating Plan...' : 'Request Plan'}
+              {isLoading ? 'Submitting Request...' : 'Request Plan'}
             </button>
           </form>
         </div>
@@ -136,6 +138,11 @@ function UserDashboardPage() {
           ) : (
             <p>You have no past workout plans.</p>
           )}
+          {nextCursor && (
+            <button onClick={() => fetchPastPlans(nextCursor)} style={styles.loadMoreButton}>
+              Load more
+            </button>
+          )}
         </div>
       </div>
     </div>
@@ -151,6 +158,7 @@ const styles = {
     input: { display: 'block', width: '95%', padding: '10px', marginBottom: '10px', borderRadius: '4px', border: '1px solid #ccc' },
     slider: { width: '100%' },
     submitButton: { width: '100%', padding: '12px', background: '#007bff', color: 'white', border: 'none', borderRadius: '4px', cursor: 'pointer', fontSize: '16px', marginTop: '10px' },
+    loadMoreButton: { width: '100%', padding: '10px', background: '#f8f9fa', border: '1px solid #ccc', borderRadius: '4px', cursor: 'pointer' },
     error: { color: 'red' },
     success: { color: 'green' },
     planCard: { 
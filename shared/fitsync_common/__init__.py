@@ -0,0 +1,5 @@
+"""
+Code shared by the FitSync backend and AI service. Each service installs this
+package from its requirements file (`-e ../shared`) and wraps it with its own
+configuration.
+"""
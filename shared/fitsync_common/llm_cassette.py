@@ -0,0 +1,263 @@
+"""
+Record and replay of LLM API calls, for benchmarks and load tests that must
+not call (or pay for) the real model.
+
+The transports plug into the httpx client underneath the OpenAI SDK (in the
+backend) or litellm (in the crew service):
+
+- record: requests go to the API and each response is saved to a cassette
+  file in the cassette directory.
+- replay: responses come from the cassettes and nothing leaves the machine.
+  A request is matched on its exact body first; failing that, on a
+  recording for the same endpoint, model and system prompt (that is, the
+  same agent), taken in turn. Unmatched requests get a 404 error response.
+
+Replayed responses are delayed by `latency_seconds` plus `latency_scale`
+times the latency measured when they were recorded. Streamed responses are
+sent event by event with the delay spread over the events, like tokens.
+"""
+import asyncio
+import hashlib
+import itertools
+import json
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+MODE_OFF = "off"
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+MODES = (MODE_OFF, MODE_RECORD, MODE_REPLAY)
+
+
+def _request_keys(request: httpx.Request):
+    """The exact key and the agent-level fallback key of a request."""
+    body = request.content or b""
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        payload = None
+    if not isinstance(payload, dict):
+        exact = hashlib.sha256(request.method.encode() + request.url.path.encode() + body).hexdigest()
+        return exact, None, {}
+
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    exact = hashlib.sha256(f"{request.method} {request.url.path} {canonical}".encode()).hexdigest()
+    messages = payload.get("messages") or []
+    first_message = messages[0].get("content") if messages and isinstance(messages[0], dict) else None
+    summary = {
+        "path": request.url.path,
+        "model": payload.get("model"),
+        "stream": bool(payload.get("stream")),
+        "first_message": first_message,
+    }
+    fallback = hashlib.sha256(json.dumps(summary, sort_keys=True).encode()).hexdigest()
+    return exact, fallback, summary
+
+
+class CassetteStore:
+    """The recorded responses in `directory`, one JSON file per request."""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+        self._exact: Dict[str, dict] = {}
+        self._by_fallback: Dict[str, List[dict]] = defaultdict(list)
+        self._turns: Dict[str, itertools.count] = defaultdict(itertools.count)
+        self.exact_hits = 0
+        self.fallback_hits = 0
+        self.misses = 0
+        self.recorded = 0
+        if self.directory.is_dir():
+            for path in sorted(self.directory.glob("*.json")):
+                self._index(json.loads(path.read_text(encoding="utf-8")))
+
+    def _index(self, cassette: dict):
+        self._exact[cassette["key"]] = cassette
+        if cassette.get("fallback_key"):
+            self._by_fallback[cassette["fallback_key"]].append(cassette)
+
+    def find(self, request: httpx.Request) -> Optional[dict]:
+        exact, fallback, _ = _request_keys(request)
+        with self._lock:
+            if exact in self._exact:
+                self.exact_hits += 1
+                return self._exact[exact]
+            candidates = self._by_fallback.get(fallback)
+            if candidates:
+                self.fallback_hits += 1
+                return candidates[next(self._turns[fallback]) % len(candidates)]
+            self.misses += 1
+            return None
+
+    def save(self, request: httpx.Request, response: httpx.Response, body: bytes, latency_seconds: float):
+        exact, fallback, summary = _request_keys(request)
+        cassette = {
+            "key": exact,
+            "fallback_key": fallback,
+            "request": summary,
+            "status_code": response.status_code,
+            "content_type": response.headers.get("content-type", "application/json"),
+            "body": body.decode("utf-8"),
+            "latency_seconds": latency_seconds,
+            "recorded_at": time.time(),
+        }
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            (self.directory / f"{exact}.json").write_text(json.dumps(cassette), encoding="utf-8")
+            self._index(cassette)
+            self.recorded += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "cassettes": len(self._exact),
+                "exact_hits": self.exact_hits,
+                "fallback_hits": self.fallback_hits,
+                "misses": self.misses,
+                "recorded": self.recorded,
+            }
+
+
+def _miss_response(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(404, request=request, json={"error": {
+        "message": f"No cassette recorded for {request.method} {request.url.path}.",
+        "type": "cassette_miss",
+    }})
+
+def _sse_events(body: str) -> List[bytes]:
+    return [f"{event}\n\n".encode() for event in body.split("\n\n") if event.strip()]
+
+
+def _pool_options(limits: Optional[httpx.Limits]) -> dict:
+    return {} if limits is None else {"limits": limits}
+
+
+class _CassetteTransportBase:
+    def __init__(self, store: CassetteStore, mode: str, latency_seconds: float, latency_scale: float):
+        self.store = store
+        self.mode = mode
+        self.latency_seconds = latency_seconds
+        self.latency_scale = latency_scale
+
+    def _recorded(self, request: httpx.Request, response: httpx.Response, body: bytes, started: float) -> httpx.Response:
+        self.store.save(request, response, body, time.perf_counter() - started)
+        return httpx.Response(
+            response.status_code, request=request, content=body,
+            headers={"content-type": response.headers.get("content-type", "application/json")},
+        )
+
+    def _replay_plan(self, cassette: dict):
+        """(headers, events or None, delay per event) of a replayed response."""
+        headers = {"content-type": cassette["content_type"]}
+        delay = self.latency_seconds + self.latency_scale * cassette.get("latency_seconds", 0.0)
+        if not cassette["content_type"].startswith("text/event-stream"):
+            return headers, None, delay
+        events = _sse_events(cassette["body"])
+        return headers, events, delay / max(len(events), 1)
+
+
+class CassetteTransport(_CassetteTransportBase, httpx.BaseTransport):
+    """Records or replays the calls of a synchronous httpx client."""
+
+    def __init__(
+        self, store: CassetteStore, mode: str, latency_seconds: float = 0.0, latency_scale: float = 0.0,
+        limits: Optional[httpx.Limits] = None
+    ):
+        super().__init__(store, mode, latency_seconds, latency_scale)
+        self._upstream = httpx.HTTPTransport(**_pool_options(limits)) if mode == MODE_RECORD else None
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if self.mode == MODE_RECORD:
+            started = time.perf_counter()
+            response = self._upstream.handle_request(request)
+            try:
+                body = response.read()
+            finally:
+                response.close()
+            return self._recorded(request, response, body, started)
+
+        cassette = self.store.find(request)
+        if cassette is None:
+            return _miss_response(request)
+        headers, events, delay = self._replay_plan(cassette)
+        if events is None:
+            time.sleep(delay)
+            return httpx.Response(cassette["status_code"], request=request, headers=headers, content=cassette["body"])
+
+        def stream():
+            for event in events:
+                time.sleep(delay)
+                yield event
+        return httpx.Response(cassette["status_code"], request=request, headers=headers, content=stream())
+
+    def close(self):
+        if self._upstream is not None:
+            self._upstream.close()
+
+
+class AsyncCassetteTransport(_CassetteTransportBase, httpx.AsyncBaseTransport):
+    """Records or replays the calls of an async httpx client."""
+
+    def __init__(
+        self, store: CassetteStore, mode: str, latency_seconds: float = 0.0, latency_scale: float = 0.0,
+        limits: Optional[httpx.Limits] = None
+    ):
+        super().__init__(store, mode, latency_seconds, latency_scale)
+        self._upstream = httpx.AsyncHTTPTransport(**_pool_options(limits)) if mode == MODE_RECORD else None
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self.mode == MODE_RECORD:
+            started = time.perf_counter()
+            response = await self._upstream.handle_async_request(request)
+            try:
+                body = await response.aread()
+            finally:
+                await response.aclose()
+            return self._recorded(request, response, body, started)
+
+        cassette = self.store.find(request)
+        if cassette is None:
+            return _miss_response(request)
+        headers, events, delay = self._replay_plan(cassette)
+        if events is None:
+            await asyncio.sleep(delay)
+            return httpx.Response(cassette["status_code"], request=request, headers=headers, content=cassette["body"])
+
+        async def stream():
+            for event in events:
+                await asyncio.sleep(delay)
+                yield event
+        return httpx.Response(cassette["status_code"], request=request, headers=headers, content=stream())
+
+    async def aclose(self):
+        if self._upstream is not None:
+            await self._upstream.aclose()
+
+
+def create_transports(
+    mode: str, directory: str, latency_seconds: float = 0.0, latency_scale: float = 0.0,
+    limits: Optional[httpx.Limits] = None
+):
+    """
+    The (sync, async) transports for `mode`, or (None, None) when the real API
+    is to be used directly. Both share one cassette store.
+
+    A client ignores its own `limits` once given a transport, so the
+    connection pool limits go here instead; they bound the upstream
+    connections of record mode. Replay mode opens no connections and
+    replays any number of calls concurrently.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown LLM cassette mode {mode!r}; use one of {', '.join(MODES)}.")
+    if mode == MODE_OFF:
+        return None, None
+    store = CassetteStore(directory)
+    return (
+        CassetteTransport(store, mode, latency_seconds, latency_scale, limits),
+        AsyncCassetteTransport(store, mode, latency_seconds, latency_scale, limits),
+    )
@@ -0,0 +1,9 @@
+"""
+Histogram buckets of the Prometheus metrics that both services export under
+the same name (fitsync_llm_call_seconds, fitsync_llm_call_tokens). Series are
+only comparable, and summable in histogram_quantile, when their buckets match.
+"""
+
+# Chat completions, from a short FitBot answer to a full plan stage.
+LLM_LATENCY_BUCKETS = (0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 45, 60, 90, 120, 180, 240)
+LLM_TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
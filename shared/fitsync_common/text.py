@@ -0,0 +1,22 @@
+"""
+Normalization of the free-text fields of a plan request. The crew service's
+plan cache and reference index and the backend's plan templates all bucket
+requests by these values, so they must agree on them.
+"""
+from typing import Any
+
+# Bump whenever the normalized form of a value changes, so indexes built
+# with the previous rules are rebuilt.
+NORMALIZATION_VERSION = 1
+
+NO_INJURY_VALUES = {"", "none", "no", "nope", "n/a", "na", "nil", "nothing", "no injuries"}
+
+
+def normalize_text(value: Any) -> str:
+    """Lower case, single spaces, no trailing punctuation."""
+    return " ".join(str(value or "").lower().split()).strip(" .!")
+
+def normalize_injuries(value: Any) -> str:
+    """Like normalize_text, with every way of saying "no injuries" mapped to "none"."""
+    injuries = normalize_text(value)
+    return "none" if injuries in NO_INJURY_VALUES else injuries
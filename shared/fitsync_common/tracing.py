@@ -0,0 +1,192 @@
+"""
+Minimal distributed tracing, compatible with W3C trace context.
+
+Each service creates one `Tracer` from its own settings. Sampled spans are
+exported as JSON lines by a background thread, so requests never wait on the
+file. The file is rotated once it grows past `max_bytes`, keeping
+`backup_count` older files next to it (spans.jsonl.1, spans.jsonl.2, ...).
+"""
+import contextvars
+import json
+import logging
+import queue
+import random
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+# One current span per task or thread, whichever tracer started it.
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+class SpanExporter:
+    """Appends spans to a JSON lines file from a background thread, rotating it by size."""
+
+    def __init__(self, path: str, max_bytes: int, backup_count: int):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def export(self, span: Dict[str, Any]):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                    self._thread.start()
+        self._queue.put(span)
+
+    def _run(self):
+        while True:
+            spans = [self._queue.get()]
+            # Write out everything already queued in one go.
+            while True:
+                try:
+                    spans.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write([json.dumps(span, default=str) + "\n" for span in spans])
+            except OSError as e:
+                logger.warning(f"Could not export {len(spans)} trace spans: {e}")
+
+    def _write(self, lines: List[str]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.max_bytes > 0 and self.path.exists():
+            size = self.path.stat().st_size
+            if size and size + sum(len(line) for line in lines) > self.max_bytes:
+                self._rotate()
+        with self.path.open("a", encoding="utf-8") as f:
+            f.writelines(lines)
+
+    def _rotate(self):
+        if self.backup_count <= 0:
+            self.path.unlink()
+            return
+        for n in range(self.backup_count - 1, 0, -1):
+            older = self.path.with_name(f"{self.path.name}.{n}")
+            if older.exists():
+                older.replace(self.path.with_name(f"{self.path.name}.{n + 1}"))
+        self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+
+
+class Span:
+    def __init__(
+        self, name: str, trace_id: str, parent_id: Optional[str], sampled: bool,
+        attributes: Dict[str, Any], tracer: "Tracer"
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        self._tracer = tracer
+        self.duration_ms: Optional[float] = None
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException):
+        self.error = f"{type(error).__name__}: {error}"
+
+    def end(self):
+        if self.duration_ms is not None:
+            return
+        self.duration_ms = (time.perf_counter() - self._started) * 1000
+        if self.sampled:
+            self._tracer.exporter.export({
+                "service": self._tracer.service_name,
+                "name": self.name,
+                "trace_id": self.trace_id,
+                "span_id": self.span_id,
+                "parent_id": self.parent_id,
+                "start_time": self.start_time,
+                "duration_ms": round(self.duration_ms, 3),
+                "attributes": self.attributes,
+                "error": self.error,
+            })
+
+
+def parse_traceparent(header: Optional[str]):
+    """Returns (trace_id, parent_span_id, sampled), or None for a missing or malformed header."""
+    match = _TRACEPARENT.match((header or "").strip().lower())
+    if match is None:
+        return None
+    trace_id, parent_id, flags = match.groups()
+    return trace_id, parent_id, bool(int(flags, 16) & 1)
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+def current_traceparent() -> Optional[str]:
+    current = _current_span.get()
+    return current.traceparent if current is not None else None
+
+def bind_context(func):
+    """Wraps `func` to run in the caller's trace context, e.g. on a pool thread."""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(func, *args, **kwargs)
+
+
+class Tracer:
+    """
+    Starts the spans of one service. New traces are sampled with probability
+    `sample_ratio`; continued traces keep the sampling decision of their
+    parent. Nothing is exported while `enabled` is false.
+    """
+
+    def __init__(
+        self, service_name: str, enabled: bool, sample_ratio: float,
+        export_path: str, max_bytes: int, backup_count: int
+    ):
+        self.service_name = service_name
+        self.enabled = enabled
+        self.sample_ratio = sample_ratio
+        self.exporter = SpanExporter(export_path, max_bytes, backup_count)
+
+    def start_span(self, name: str, traceparent: Optional[str] = None, **attributes) -> Span:
+        """
+        Starts a span under `traceparent` if given, else under the current span,
+        else as the root of a new trace. The caller must end() it.
+        """
+        parent = parse_traceparent(traceparent)
+        current = _current_span.get()
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+        elif current is not None:
+            trace_id, parent_id, sampled = current.trace_id, current.span_id, current.sampled
+        else:
+            trace_id, parent_id = secrets.token_hex(16), None
+            sampled = self.enabled and random.random() < self.sample_ratio
+        return Span(name, trace_id, parent_id, sampled and self.enabled, attributes, self)
+
+    @contextmanager
+    def span(self, name: str, traceparent: Optional[str] = None, **attributes):
+        """Runs the block inside a new span, which becomes the current span."""
+        current = self.start_span(name, traceparent, **attributes)
+        token = _current_span.set(current)
+        try:
+            yield current
+        except BaseException as e:
+            current.record_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            current.end()